@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Path, Depends, Body
-from pydantic import BaseModel
-from typing import List
+from fastapi import APIRouter, Depends, Path, Body, Header, Response, status
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from exception.errors import AIResultException
 from exception.error_response_examples import ai_result_exception_response
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from models import AIResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import ReadOnlySessionLocal
 from dependencies import get_db
+from core.result_read_cache import result_read_cache, CachedResult, AI_RESULT, make_etag, etag_matches
+from core.bulk_lookup import fetch_rows_by_product_ids, missing_product_ids
+from core.result_ingestion import upsert_ai_results, refresh_derived_results
+from core.response_format import bulk_response, bulk_media_type_response
 
 router = APIRouter()
 
@@ -25,48 +30,116 @@ class AIResponse(BaseModel):
     productId: int
     safetyScore: float
 
+class AIBulkResponse(BaseModel):
+    results: List[AISingleResponse]
+    missingProductIdList: List[int]
+
+class AIIngestItem(BaseModel):
+    productId: int
+    repaymentPrediction: bool
+    safetyScore: float = Field(..., ge=0, le=1)
+
+class AIIngestRequest(BaseModel):
+    results: List[AIIngestItem]
+
+class IngestResponse(BaseModel):
+    upserted: int
+    productIdList: List[int]
+
 @router.get("/{productId}",
             summary="상품 단건에 대한 AI 분석 결과 조회",
+            description="""
+                            응답의 ETag를 If-None-Match 헤더로 보내면 결과가 바뀌지 않은 경우 본문 없이 304를 응답합니다.
+                        """,
             response_model=AISingleResponse,
             responses={
-                **ai_result_exception_response
+                **ai_result_exception_response,
+                status.HTTP_304_NOT_MODIFIED: {"description": "결과가 바뀌지 않음"}
             })
-async def get_ai(productId: int = Path(..., description="조회할 상품 id"),
-                 db: AsyncSession = Depends(get_db)):
-    async with db as session:
+async def get_ai(response: Response,
+                 productId: int = Path(..., description="조회할 상품 id"),
+                 ifNoneMatch: Optional[str] = Header(None, alias="If-None-Match")):
+    cached = await result_read_cache.get(AI_RESULT, productId, lambda: load_ai_result(productId))
+    if cached is None:
+        raise AIResultException(productId)
+
+    if etag_matches(ifNoneMatch, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag})
+    response.headers["ETag"] = cached.etag
+    return cached.body
+
+
+async def load_ai_result(productId: int) -> Optional[CachedResult]:
+    async with ReadOnlySessionLocal() as session:
         result = await session.execute(select(AIResult).where(AIResult.product_id == productId))
         ai_result = result.scalars().first()
 
         if ai_result is None:
-            raise AIResultException(productId)
+            return None
 
-        return AISingleResponse(
+        body = AISingleResponse(
             AIResultId=ai_result.ai_result_id,
             productId=ai_result.product_id,
             repaymentPrediction=ai_result.repayment_prediction,
             safetyScore=ai_result.safety_score
         )
+        return CachedResult(body=body, etag=make_etag(body))
 
 
 @router.post("/list",
              summary="여러 상품 id에 대한 AI 분석 결과 리스트 조회",
-             response_model=List[AIResponse])
+             description="""
+                            Accept 헤더에 **application/vnd.elswhere.fast+json**을 지정하면 같은 JSON을 응답 모델 검증 없이 직렬화하고,
+                            **application/x-msgpack**을 지정하면 필드별 값 배열({"AIResultId": [...], "productId": [...], "safetyScore": [...]})을
+                            msgpack으로 응답합니다.
+                        """,
+             response_model=List[AIResponse],
+             responses=bulk_media_type_response)
 async def get_ai_list(request: ProductIdListModel = Body(..., description="조회할 상품 ID 리스트"),
-                       db: AsyncSession = Depends(get_db)):
-    async with db as session:
-        results = await session.execute(
-            select(AIResult).where(AIResult.product_id.in_(request.productIdList))
-        )
-        ai_results = results.scalars().all()
-
-        # 조회된 AI 결과를 AIResponse 형식으로 변환
-        response_list = [
-            AIResponse(
-                AIResultId=result.ai_result_id,
-                productId=result.product_id,
-                safetyScore=result.safety_score
-            )
-            for result in ai_results
-        ]
-
-        return response_list
+                      accept: Optional[str] = Header(None)):
+    rows = await fetch_rows_by_product_ids((AIResult.ai_result_id, AIResult.product_id, AIResult.safety_score),
+                                           AIResult.product_id, request.productIdList)
+
+    # 조회된 AI 결과를 AIResponse 형식으로 변환
+    return bulk_response(accept, ("AIResultId", "productId", "safetyScore"), rows)
+
+
+@router.post("/bulk",
+             summary="여러 상품 id에 대한 AI 분석 결과 일괄 조회",
+             description="""
+                            상품 단건 조회와 같은 형식의 결과 리스트와, 결과가 없는 상품 id 리스트(missingProductIdList)를 응답합니다.<br/>
+                            상품 id가 많으면 나눠서 동시에 조회합니다.
+                        """,
+             response_model=AIBulkResponse)
+async def get_ai_bulk(request: ProductIdListModel = Body(..., description="조회할 상품 ID 리스트")):
+    rows = await fetch_rows_by_product_ids((AIResult.ai_result_id, AIResult.product_id, AIResult.repayment_prediction,
+                                            AIResult.safety_score),
+                                           AIResult.product_id, request.productIdList)
+
+    return {
+        "results": [{"AIResultId": aiResultId, "productId": productId, "repaymentPrediction": repaymentPrediction,
+                     "safetyScore": safetyScore}
+                    for aiResultId, productId, repaymentPrediction, safetyScore in rows],
+        "missingProductIdList": missing_product_ids(request.productIdList, (row.product_id for row in rows))
+    }
+
+
+@router.post("/ingest",
+             summary="AI 분석 결과 일괄 저장",
+             description="""
+                            상품별 AI 분석 결과를 한 번에 저장합니다. 결과가 이미 있는 상품은 새 결과로 갱신하며,
+                            덮어쓴 결과는 ai_result_history에 남습니다.<br/>
+                            같은 상품 id가 여러 번 들어오면 마지막 결과를 저장합니다.
+                        """,
+             response_model=IngestResponse)
+async def ingest_ai(request: AIIngestRequest = Body(..., description="저장할 AI 분석 결과 리스트"),
+                    db: AsyncSession = Depends(get_db)):
+    productIdList = await upsert_ai_results(db, [{"product_id": item.productId,
+                                                  "repayment_prediction": item.repaymentPrediction,
+                                                  "safety_score": item.safetyScore}
+                                                 for item in request.results])
+    # 파생 데이터(캐시, 분류 색인)는 커밋된 결과로 갱신
+    await db.commit()
+    await refresh_derived_results(db, productIdList, [])
+
+    return IngestResponse(upserted=len(productIdList), productIdList=productIdList)
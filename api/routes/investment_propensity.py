@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Header
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from dependencies import get_db
+from sqlalchemy import func
+from dependencies import get_read_db
 from util.repayment_option import RepaymentOption
 from util.risk_propensity import RiskPropensity
 from sqlalchemy.future import select
-from models import AIResult, MonteCarloResult
-import os
+from core.config import PropensityBoundaries, get_propensity_boundaries, sum_early_repayment_probability, \
+    EARLY_REPAYMENT_REDEMPTION_COUNT, PRODUCT_ID_CHUNK_SIZE
+from core.propensity_index import propensity_index
+from core.response_format import bulk_value_response, bulk_media_type_response
+from models import AIResult, MonteCarloResult, MonteCarloEarlyRepayment
 
 router = APIRouter()
 
@@ -37,45 +40,79 @@ class ResponseProductIdList(BaseModel):
 @router.post("/list",
              summary="투자 성향에 만족하는 상품 id 리스트",
              description="riskTakingAbility(투자자 위험 감수 능력) : EXTREME_RISK(초고위험), HIGH_RISK(고위험), MEDIUM_RISK(중위험), LOW_RISK(저위험)<br/> \
-                            repaymentOption(희망 상환 기간) : EARLY_REPAYMENT(조기상환), MATURITY_REPAYMENT(만기상환), NO_PREFERENCE(상관없음)",
-             response_model=List[int])
+                            repaymentOption(희망 상환 기간) : EARLY_REPAYMENT(조기상환), MATURITY_REPAYMENT(만기상환), NO_PREFERENCE(상관없음)<br/> \
+                            Accept 헤더에 application/vnd.elswhere.fast+json을 지정하면 같은 JSON을 응답 모델 검증 없이 직렬화하고, \
+                            application/x-msgpack을 지정하면 상품 id 배열을 productId 필드에 담아 msgpack으로 응답합니다.",
+             response_model=List[int],
+             responses=bulk_media_type_response)
 async def get_satisfied_investment_propensity_products(request: RequestInvestmentPropensityInformation = Body(..., description="투자 성향을 확인할 정보"),
-                                                       db: AsyncSession = Depends(get_db)):
-    async with db as session:
-        riskPropensityQueryResult = await session.execute(get_product_ids_by_risk_propensity(
-                                                    request.productIdList,
-                                                    request.riskPropensity)
-                                                )
-        satisfiedRiskPropensityProductIdList = riskPropensityQueryResult.scalars().all()
-
-        if not satisfiedRiskPropensityProductIdList:
-            return []
-
-        if request.repaymentOption == RepaymentOption.NO_PREFERENCE:
-            return satisfiedRiskPropensityProductIdList
-
-        investmentPropensityQueryResult = await session.execute(get_product_ids_by_repayment_option(satisfiedRiskPropensityProductIdList,
-                                                                                                    request.repaymentOption))
-        satisfiedInvestmentPropensityProductIdList = investmentPropensityQueryResult.scalars().all()
-
-        return satisfiedInvestmentPropensityProductIdList
-
-
-def get_product_ids_by_risk_propensity(productIdList, risk_propensity):
-    if risk_propensity == RiskPropensity.LOW_RISK:
-        min_score = float(os.getenv('MEDIUM_AND_LOW_RISK_BOUNDARY'))
-        max_score = 1
-    elif risk_propensity == RiskPropensity.MEDIUM_RISK:
-        min_score = float(os.getenv('HIGH_AND_MEDIUM_RISK_BOUNDARY'))
-        max_score = float(os.getenv('MEDIUM_AND_LOW_RISK_BOUNDARY'))
-    elif risk_propensity == RiskPropensity.HIGH_RISK:
-        min_score = float(os.getenv('EXTREME_AND_HIGH_RISK_BOUNDARY'))
-        max_score = float(os.getenv('HIGH_AND_MEDIUM_RISK_BOUNDARY'))
-    elif risk_propensity == RiskPropensity.EXTREME_RISK:
-        min_score = 0
-        max_score = float(os.getenv('EXTREME_AND_HIGH_RISK_BOUNDARY'))
-    else:
-        return []
+                                                       db: AsyncSession = Depends(get_read_db),
+                                                       accept: Optional[str] = Header(None)):
+    productIdList = list(dict.fromkeys(request.productIdList))
+
+    # 메모리의 분류 색인이 준비되어 있으면 DB를 조회하지 않고 색인으로 응답
+    if propensity_index.ready:
+        return bulk_value_response(accept, "productId",
+                                   propensity_index.query(productIdList, request.riskPropensity, request.repaymentOption))
+
+    satisfiedInvestmentPropensityProductIdList = []
+    # 상품 id가 많으면 IN 절이 너무 커지지 않도록 나눠서 조회
+    for start in range(0, len(productIdList), PRODUCT_ID_CHUNK_SIZE):
+        satisfiedInvestmentPropensityProductIdList += await query_product_ids_by_investment_propensity(
+                                                        db,
+                                                        productIdList[start:start + PRODUCT_ID_CHUNK_SIZE],
+                                                        request.riskPropensity,
+                                                        request.repaymentOption)
+
+    return bulk_value_response(accept, "productId", satisfiedInvestmentPropensityProductIdList)
+
+
+@router.get("/index/stats",
+            summary="투자 성향 분류 색인 상태 조회",
+            description="색인 준비 여부(ready), 색인된 상품 수, 테이블별 마지막으로 반영한 수정 시각(watermarks) 등을 조회합니다.")
+async def get_propensity_index_stats():
+    return propensity_index.stats()
+
+
+# 위험 성향과 상환 성향을 모두 만족하는 상품 id 조회
+# 조기상환 성향은 평가일별 행으로 판단하고, 평가일별 행이 없는 결과(일괄 계산, 결과 저장 api 외의 경로로 저장된 결과)는
+# monte_carlo_result.early_repayment_probability 값으로 판단
+async def query_product_ids_by_investment_propensity(db: AsyncSession, productIdList, risk_propensity, repayment_option,
+                                                     boundaries: Optional[PropensityBoundaries] = None) -> List[int]:
+    boundaries = boundaries or get_propensity_boundaries()
+    result = await db.execute(get_product_ids_by_investment_propensity(productIdList, risk_propensity, repayment_option,
+                                                                       boundaries))
+    productIds = list(result.scalars().all())
+
+    if repayment_option == RepaymentOption.EARLY_REPAYMENT:
+        fallbackResult = await db.execute(get_early_repayment_fallback_rows(productIdList, risk_propensity, boundaries))
+        productIds += [productId for productId, earlyRepaymentProbability in fallbackResult.all()
+                       if sum_early_repayment_probability(earlyRepaymentProbability) >= boundaries.earlyRepayment]
+    return list(dict.fromkeys(productIds))
+
+
+# 위험 성향과 상환 성향을 모두 만족하는 상품 id 조회 쿼리
+# ai_result의 (product_id, safety_score) 인덱스로 위험 성향을 거르고, 상환 성향 조건은 product_id로 조인해서 한 번에 조회
+def get_product_ids_by_investment_propensity(productIdList, risk_propensity, repayment_option,
+                                             boundaries: Optional[PropensityBoundaries] = None):
+    boundaries = boundaries or get_propensity_boundaries()
+    query = get_product_ids_by_risk_propensity(productIdList, risk_propensity, boundaries)
+
+    if repayment_option == RepaymentOption.EARLY_REPAYMENT:
+        earlyRepayment = get_product_ids_by_repayment_option(productIdList, repayment_option, boundaries).subquery()
+        query = query.join(earlyRepayment, earlyRepayment.c.product_id == AIResult.product_id)
+
+    elif repayment_option == RepaymentOption.MATURITY_REPAYMENT:
+        query = (
+            query.join(MonteCarloResult, MonteCarloResult.product_id == AIResult.product_id)
+            .where(MonteCarloResult.loss_probability <= boundaries.maturityRepayment)
+        )
+
+    return query.distinct()
+
+
+def get_product_ids_by_risk_propensity(productIdList, risk_propensity, boundaries: Optional[PropensityBoundaries] = None):
+    min_score, max_score = (boundaries or get_propensity_boundaries()).safety_score_range(risk_propensity)
 
     # 쿼리 작성
     query = (
@@ -89,18 +126,19 @@ def get_product_ids_by_risk_propensity(productIdList, risk_propensity):
 
     return query
 
-def get_product_ids_by_repayment_option(productIdList, repayment_option):
+def get_product_ids_by_repayment_option(productIdList, repayment_option, boundaries: Optional[PropensityBoundaries] = None):
+    boundaries = boundaries or get_propensity_boundaries()
     if repayment_option == RepaymentOption.EARLY_REPAYMENT:
-        boundary_value = int(os.getenv('EARLY_REPAYMENT_BOUNDARY'))
+        # 첫 두 평가일의 조기상환 확률 합이 기준 이상인 상품 (평가일별 행 테이블의 (product_id, redemption_index) 인덱스 범위 조회)
         query = (
-            select(MonteCarloResult.product_id)
+            select(MonteCarloEarlyRepayment.product_id)
+            .distinct()
             .where(
-                MonteCarloResult.product_id.in_(productIdList),
-                text(
-                    "CAST(SUBSTRING_INDEX(early_repayment_probability, ',', 1) AS DECIMAL(8, 4)) + "
-                    "CAST(SUBSTRING_INDEX(SUBSTRING_INDEX(early_repayment_probability, ',', 2), ',', -1) AS DECIMAL(8, 4)) >= :boundary"
-                ).bindparams(boundary=boundary_value)
+                MonteCarloEarlyRepayment.product_id.in_(productIdList),
+                MonteCarloEarlyRepayment.redemption_index < EARLY_REPAYMENT_REDEMPTION_COUNT
             )
+            .group_by(MonteCarloEarlyRepayment.monte_carlo_result_id, MonteCarloEarlyRepayment.product_id)
+            .having(func.sum(MonteCarloEarlyRepayment.probability) >= boundaries.earlyRepayment)
         )
 
     elif repayment_option == RepaymentOption.MATURITY_REPAYMENT:
@@ -108,8 +146,23 @@ def get_product_ids_by_repayment_option(productIdList, repayment_option):
             select(MonteCarloResult.product_id)
             .where(
                 MonteCarloResult.product_id.in_(productIdList),
-                MonteCarloResult.loss_probability <= int(os.getenv('MATURITY_REPAYMENT_BOUNDARY'))
+                MonteCarloResult.loss_probability <= boundaries.maturityRepayment
             )
         )
 
-    return query
\ No newline at end of file
+    return query
+
+
+# 위험 성향을 만족하는 상품 중 평가일별 조기상환 확률 행이 없는 결과의 (상품 id, 쉼표로 구분된 조기상환 확률)
+def get_early_repayment_fallback_rows(productIdList, risk_propensity, boundaries: Optional[PropensityBoundaries] = None):
+    hasEarlyRepayments = (
+        select(MonteCarloEarlyRepayment.monte_carlo_early_repayment_id)
+        .where(MonteCarloEarlyRepayment.monte_carlo_result_id == MonteCarloResult.monte_carlo_result_id)
+        .exists()
+    )
+    return (
+        get_product_ids_by_risk_propensity(productIdList, risk_propensity, boundaries)
+        .join(MonteCarloResult, MonteCarloResult.product_id == AIResult.product_id)
+        .where(~hasEarlyRepayments)
+        .add_columns(MonteCarloResult.early_repayment_probability)
+    )
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Path, Depends
-from pydantic import BaseModel
-from exception.errors import MonteCarloResultException
-from exception.error_response_examples import monte_carlo_result_exception_response
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Path, Request, Header, Response, Body, status
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional
+from datetime import datetime
+from exception.errors import MonteCarloResultException, MonteCarloBatchJobException
+from exception.error_response_examples import monte_carlo_result_exception_response, \
+    monte_carlo_batch_job_exception_response
+from simulation.batch_job import start_batch_job, get_batch_job, BatchJob
+from simulation.result_cache import result_cache
 from sqlalchemy.future import select
 from models import MonteCarloResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import ReadOnlySessionLocal
 from dependencies import get_db
+from core.result_read_cache import result_read_cache, CachedResult, MONTE_CARLO_RESULT, make_etag, etag_matches
+from core.bulk_lookup import fetch_rows_by_product_ids, missing_product_ids
+from core.result_ingestion import upsert_monte_carlo_results, refresh_derived_results
+import math
 
 router = APIRouter()
 
@@ -16,27 +26,239 @@ class MonteCarloResponse(BaseModel):
     maturityRepaymentProbability: float
     lossProbability: float
     underKnockInBarrierProbability: float
+    earlyRepaymentStandardError: Optional[str] = None
+    maturityRepaymentStandardError: Optional[float] = None
+    lossStandardError: Optional[float] = None
+    underKnockInBarrierStandardError: Optional[float] = None
+
+class ProductIdListModel(BaseModel):
+    productIdList: List[int]
+
+class MonteCarloBulkResponse(BaseModel):
+    results: List[MonteCarloResponse]
+    missingProductIdList: List[int]
+
+class MonteCarloIngestItem(BaseModel):
+    productId: int
+    earlyRepaymentProbability: str
+    maturityRepaymentProbability: float = Field(..., ge=0, le=100, allow_inf_nan=False)
+    lossProbability: float = Field(..., ge=0, le=100, allow_inf_nan=False)
+    underKnockInBarrierProbability: float = Field(..., ge=0, le=100, allow_inf_nan=False)
+    earlyRepaymentStandardError: Optional[str] = None
+    maturityRepaymentStandardError: Optional[float] = Field(None, ge=0, allow_inf_nan=False)
+    lossStandardError: Optional[float] = Field(None, ge=0, allow_inf_nan=False)
+    underKnockInBarrierStandardError: Optional[float] = Field(None, ge=0, allow_inf_nan=False)
+
+    # 평가일별 조기상환 확률(%)은 0~100, 표준오차는 0 이상의 유한한 숫자 (nan, inf는 DB에 저장할 수 없음)
+    @field_validator('earlyRepaymentProbability')
+    def validate_early_repayment_probability(cls, v):
+        probabilities = parse_finite_numbers(v)
+        if probabilities is None or not all(0 <= probability <= 100 for probability in probabilities):
+            raise ValueError(f"earlyRepaymentProbability는 쉼표로 구분된 0~100 사이의 숫자여야 합니다: {v}")
+        return v
+
+    @field_validator('earlyRepaymentStandardError')
+    def validate_early_repayment_standard_error(cls, v):
+        if v is None:
+            return v
+        standardErrors = parse_finite_numbers(v)
+        if standardErrors is None or not all(standardError >= 0 for standardError in standardErrors):
+            raise ValueError(f"earlyRepaymentStandardError는 쉼표로 구분된 0 이상의 숫자여야 합니다: {v}")
+        return v
+
+# 쉼표로 구분된 숫자 목록 (숫자가 아니거나 nan, inf가 있으면 None)
+def parse_finite_numbers(value: str) -> Optional[List[float]]:
+    try:
+        numbers = [float(item) for item in value.split(",")]
+    except ValueError:
+        return None
+    return numbers if all(math.isfinite(number) for number in numbers) else None
+
+class MonteCarloIngestRequest(BaseModel):
+    results: List[MonteCarloIngestItem]
+
+class IngestResponse(BaseModel):
+    upserted: int
+    productIdList: List[int]
+
+class BatchJobRequest(BaseModel):
+    productIdList: Optional[List[int]] = None
+
+class BatchJobResponse(BaseModel):
+    jobId: str
+    status: str
+    total: int
+    completed: int
+    succeeded: int
+    failedProductIds: List[int]
+    cacheHits: int
+    warmStarts: int
+    warmStartDeltas: Dict[int, Dict[str, float]]
+    createdAt: datetime
+    finishedAt: Optional[datetime]
 
 @router.get("/{productId}",
             summary="상품 단건에 대한 몬테카를로 분석 결과 조회",
+            description="""
+                            응답의 ETag를 If-None-Match 헤더로 보내면 결과가 바뀌지 않은 경우 본문 없이 304를 응답합니다.
+                        """,
             response_model=MonteCarloResponse,
             responses={
-                **monte_carlo_result_exception_response
+                **monte_carlo_result_exception_response,
+                status.HTTP_304_NOT_MODIFIED: {"description": "결과가 바뀌지 않음"}
             })
-async def get_monte_carlo(productId: int = Path(..., description="조회할 상품 id"),
-                          db: AsyncSession = Depends(get_db)):
-    async with db as session:
+async def get_monte_carlo(response: Response,
+                          productId: int = Path(..., description="조회할 상품 id"),
+                          ifNoneMatch: Optional[str] = Header(None, alias="If-None-Match")):
+    cached = await result_read_cache.get(MONTE_CARLO_RESULT, productId, lambda: load_monte_carlo_result(productId))
+    if cached is None:
+        raise MonteCarloResultException(productId)
+
+    if etag_matches(ifNoneMatch, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": cached.etag})
+    response.headers["ETag"] = cached.etag
+    return cached.body
+
+
+async def load_monte_carlo_result(productId: int) -> Optional[CachedResult]:
+    async with ReadOnlySessionLocal() as session:
         result = await session.execute(select(MonteCarloResult).where(MonteCarloResult.product_id == productId))
         monte_carlo_result = result.scalars().first()
 
         if monte_carlo_result is None:
-            raise MonteCarloResultException(productId)
+            return None
 
-        return MonteCarloResponse(
+        body = MonteCarloResponse(
             monteCarloResultId=monte_carlo_result.monte_carlo_result_id,
             productId=monte_carlo_result.product_id,
             earlyRepaymentProbability=monte_carlo_result.early_repayment_probability,
             maturityRepaymentProbability=monte_carlo_result.maturity_repayment_probability,
             lossProbability=monte_carlo_result.loss_probability,
-            underKnockInBarrierProbability=monte_carlo_result.under_knockin_barrier_probability
-        )
\ No newline at end of file
+            underKnockInBarrierProbability=monte_carlo_result.under_knockin_barrier_probability,
+            earlyRepaymentStandardError=monte_carlo_result.early_repayment_standard_error,
+            maturityRepaymentStandardError=monte_carlo_result.maturity_repayment_standard_error,
+            lossStandardError=monte_carlo_result.loss_standard_error,
+            underKnockInBarrierStandardError=monte_carlo_result.under_knockin_barrier_standard_error
+        )
+        return CachedResult(body=body, etag=make_etag(body))
+
+
+# 일괄 조회 응답 필드 → monte_carlo_result 컬럼
+MONTE_CARLO_RESPONSE_COLUMNS = {
+    "monteCarloResultId": MonteCarloResult.monte_carlo_result_id,
+    "productId": MonteCarloResult.product_id,
+    "earlyRepaymentProbability": MonteCarloResult.early_repayment_probability,
+    "maturityRepaymentProbability": MonteCarloResult.maturity_repayment_probability,
+    "lossProbability": MonteCarloResult.loss_probability,
+    "underKnockInBarrierProbability": MonteCarloResult.under_knockin_barrier_probability,
+    "earlyRepaymentStandardError": MonteCarloResult.early_repayment_standard_error,
+    "maturityRepaymentStandardError": MonteCarloResult.maturity_repayment_standard_error,
+    "lossStandardError": MonteCarloResult.loss_standard_error,
+    "underKnockInBarrierStandardError": MonteCarloResult.under_knockin_barrier_standard_error,
+}
+
+
+@router.post("/bulk",
+             summary="여러 상품 id에 대한 몬테카를로 분석 결과 일괄 조회",
+             description="""
+                            상품 단건 조회와 같은 형식의 결과 리스트와, 결과가 없는 상품 id 리스트(missingProductIdList)를 응답합니다.<br/>
+                            상품 id가 많으면 나눠서 동시에 조회합니다.
+                        """,
+             response_model=MonteCarloBulkResponse)
+async def get_monte_carlo_bulk(request: ProductIdListModel = Body(..., description="조회할 상품 ID 리스트")):
+    rows = await fetch_rows_by_product_ids(list(MONTE_CARLO_RESPONSE_COLUMNS.values()), MonteCarloResult.product_id,
+                                           request.productIdList)
+
+    return {
+        "results": [dict(zip(MONTE_CARLO_RESPONSE_COLUMNS, row)) for row in rows],
+        "missingProductIdList": missing_product_ids(request.productIdList, (row.product_id for row in rows))
+    }
+
+
+@router.post("/ingest",
+             summary="몬테카를로 분석 결과 일괄 저장",
+             description="""
+                            상품별 몬테카를로 분석 결과를 한 번에 저장합니다. 결과가 이미 있는 상품은 새 결과로 갱신하며,
+                            덮어쓴 결과는 monte_carlo_result_history에 남습니다.<br/>
+                            같은 상품 id가 여러 번 들어오면 마지막 결과를 저장합니다.
+                        """,
+             response_model=IngestResponse)
+async def ingest_monte_carlo(request: MonteCarloIngestRequest = Body(..., description="저장할 몬테카를로 분석 결과 리스트"),
+                             db: AsyncSession = Depends(get_db)):
+    # 계산 입력 컬럼(입력 해시, 시장 데이터, 난수 시드)은 NULL로 저장되어 다음 일괄 계산에서 다시 계산
+    productIdList = await upsert_monte_carlo_results(db, [{
+        "product_id": item.productId,
+        "early_repayment_probability": item.earlyRepaymentProbability,
+        "maturity_repayment_probability": item.maturityRepaymentProbability,
+        "loss_probability": item.lossProbability,
+        "under_knockin_barrier_probability": item.underKnockInBarrierProbability,
+        "early_repayment_standard_error": item.earlyRepaymentStandardError,
+        "maturity_repayment_standard_error": item.maturityRepaymentStandardError,
+        "loss_standard_error": item.lossStandardError,
+        "under_knockin_barrier_standard_error": item.underKnockInBarrierStandardError
+    } for item in request.results])
+    # 파생 데이터(캐시, 분류 색인)는 커밋된 결과로 갱신
+    await db.commit()
+    await refresh_derived_results(db, [], productIdList)
+
+    return IngestResponse(upserted=len(productIdList), productIdList=productIdList)
+
+
+@router.post("/batch",
+             summary="몬테카를로 분석 결과 일괄 계산",
+             description="""
+                            여러 상품의 몬테카를로 분석 결과를 프로세스 풀에서 일괄 계산해서 저장하는 작업을 등록합니다.<br/>
+                            productIdList를 생략하면 몬테카를로 분석 결과가 있는 모든 상품을 다시 계산합니다.<br/>
+                            계산에 실패한 상품은 monte_carlo_result_error에 기록되며, 진행 상황은 작업 조회 API로 확인할 수 있습니다.
+                        """,
+             status_code=status.HTTP_202_ACCEPTED,
+             response_model=BatchJobResponse)
+async def create_monte_carlo_batch(request: Request, data: BatchJobRequest):
+    job = await start_batch_job(data.productIdList, request.headers.get("requestId"))
+    return to_batch_job_response(job)
+
+
+@router.get("/batch/{jobId}",
+            summary="몬테카를로 분석 결과 일괄 계산 작업 조회",
+            description="""
+                            **status**: PENDING(대기), RUNNING(실행 중), COMPLETED(완료), FAILED(실패)<br/>
+                            **completed**: 계산이 끝난(실패 포함) 상품 수<br/>
+                            **cacheHits**: 입력(상품 조건, 시장 데이터, 계산 설정)이 같아 저장된 결과를 그대로 사용한 상품 수<br/>
+                            **warmStarts**: 시장 데이터(현재가, 변동성, 상관계수)만 조금 바뀌어 이전 난수 시드로 다시 계산한 상품 수 (상품별 이전 결과 대비 변화량은 warmStartDeltas)
+                        """,
+            response_model=BatchJobResponse,
+            responses={
+                **monte_carlo_batch_job_exception_response
+            })
+async def get_monte_carlo_batch(jobId: str = Path(..., description="조회할 작업 id")):
+    job = await get_batch_job(jobId)
+    if job is None:
+        raise MonteCarloBatchJobException(jobId)
+    return to_batch_job_response(job)
+
+
+@router.get("/cache/stats",
+            summary="몬테카를로 분석 결과 재사용 통계 조회",
+            description="""
+                            일괄 계산에서 저장된 결과를 그대로 사용한(hits), 이전 난수 시드로 다시 계산한(warmStarts),
+                            새로 계산한(misses) 상품 수와 적중률(hitRate)을 조회합니다.<br/>
+                            readCache: 상품 단건 조회 API의 결과 캐시 통계
+                        """)
+async def get_monte_carlo_cache_stats():
+    return {**result_cache.stats(), "readCache": result_read_cache.stats()}
+
+
+def to_batch_job_response(job: BatchJob) -> BatchJobResponse:
+    return BatchJobResponse(
+        jobId=job.jobId,
+        status=str(job.status),
+        total=job.total,
+        completed=job.completed,
+        succeeded=job.succeeded,
+        failedProductIds=job.failedProductIds,
+        cacheHits=job.cacheHits,
+        warmStarts=job.warmStarts,
+        warmStartDeltas=job.warmStartDeltas,
+        createdAt=job.createdAt,
+        finishedAt=job.finishedAt
+    )
@@ -1,19 +1,37 @@
 from fastapi import APIRouter, Path, Request
+from fastapi.responses import StreamingResponse
 from typing import Dict, List
 from pydantic import BaseModel, RootModel
-from exception.errors import ProductServiceServerException, ValidateInitialBasePriceEvaluationDateException
-from exception.error_response_examples import product_service_exception_response, validate_initial_price_exception_response
+from exception.errors import ProductServiceServerException, ValidateInitialBasePriceEvaluationDateException, \
+    MarketDataTimeoutException
+from exception.error_response_examples import product_service_exception_response, validate_initial_price_exception_response, \
+    market_data_timeout_exception_response
+from core.market_data import get_closes
+from core.price_ratio import get_close_keys, build_price_matrix, compute_price_ratios, to_price_ratio_records, \
+    to_price_ratio_rows, PRICE_RATIO_FIELDS
+from core.response_format import bulk_response, FAST_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from core.price_cache import price_cache
+from core.price_store import price_store
+from core.product_client import product_client
+from core.single_flight import SingleFlight
+from core.barrier_monitor import barrier_monitor, monitor_products, get_knocked_in_products
+from dotenv import load_dotenv
 from datetime import datetime
 from typing import Optional
-import py_eureka_client.eureka_client as eureka_client
-import pandas as pd
-import json
-import urllib.error
-import yfinance as yf
 import asyncio
+import json
+import time
+import os
+
+load_dotenv()
 
 router = APIRouter()
 
+PRICE_RATIO_COALESCE_WINDOW = float(os.getenv('PRICE_RATIO_COALESCE_WINDOW', 1))
+price_ratio_flight = SingleFlight()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 class PriceData(RootModel[Dict[str, float]]):
     pass
 class PriceRatioResponse(BaseModel):
@@ -26,6 +44,11 @@ class ProductIdListModel(BaseModel):
 class PriceRatio(BaseModel):
     id: int
     recentAndInitialPriceRatio: Optional[float]
+class KnockInProduct(BaseModel):
+    id: int
+    recentAndInitialPriceRatio: Optional[float]
+    knockInBarrier: float
+    knockedInAt: datetime
 
 @router.get("/price/ratio/{productId}",
             summary="상품 단건에 대한 최초기준가격 대비 현재 기초자산가격 비율 조회",
@@ -37,18 +60,20 @@ class PriceRatio(BaseModel):
             response_model=PriceRatioResponse,
             responses={
                 **product_service_exception_response,
-                **validate_initial_price_exception_response
+                **validate_initial_price_exception_response,
+                **market_data_timeout_exception_response
             })
 async def get_price_ratio(request: Request, productId: int = Path(..., description="조회할 상품 id")):
     requestId = request.headers.get("requestId")
 
-    # 특정 상품 단건 조회 API 통신
-    try:
-        headers = {"requestId": requestId}
-        responseProduct = await eureka_client.do_service_async("product-service", f"/v1/product/{productId}", headers=headers)
-        product = json.loads(responseProduct)
-    except urllib.error.URLError as e:
-        raise ProductServiceServerException(productId)
+    # 같은 시세 구간(PRICE_RATIO_COALESCE_WINDOW초) 안에 동시에 들어온 같은 상품 요청들은 하나의 계산 결과를 함께 사용
+    quoteWindow = int(time.time() // PRICE_RATIO_COALESCE_WINDOW)
+    return await price_ratio_flight.do((productId, quoteWindow), lambda: compute_price_ratio(productId, requestId))
+
+
+async def compute_price_ratio(productId: int, requestId: Optional[str]) -> dict:
+    # 특정 상품 단건 조회 API 통신 (발행된 상품의 조건은 변하지 않으므로 캐시된 값 사용)
+    product = await product_client.get_product(productId, requestId)
 
     # product-service로 부터 받은 값 변수 초기화
     initialBasePriceEvaluationDate = product["initialBasePriceEvaluationDate"]
@@ -58,52 +83,41 @@ async def get_price_ratio(request: Request, productId: int = Path(..., descripti
     if datetime.strptime(initialBasePriceEvaluationDate, "%Y-%m-%d").date() > datetime.now().date():
         raise ValidateInitialBasePriceEvaluationDateException(productId)
 
-    # yfinance에 최초기준가격평가일에 대한 각 기초자산들의 종가 데이터들 가져오기
+    # 최초기준가격평가일에 대한 각 기초자산들의 종가와 오늘 날짜에 대한 각 기초자산들의 종가를 함께 가져오기
+    # (캐시, 로컬 저장소에 없는 경우에만 yfinance에서 조회하며, 현재 기초자산이 속한 장이 열려 있다면 최근 종가는 실시간 값이 됨)
     result = {}
-    initial_tmp = {}
-    for equity in equities:
-        stock_data = yf.Ticker(equityTickerSymbols[equity])
-        initial_data = stock_data.history(start=initialBasePriceEvaluationDate,
-                                          end=pd.Timestamp(initialBasePriceEvaluationDate) + pd.Timedelta(days=1))
+    closeKeys = [(equityTickerSymbols[equity], initialBasePriceEvaluationDate) for equity in equities]
+    initialCloses, recentCloses = await get_closes(closeKeys, [tickerSymbol for tickerSymbol, _ in closeKeys])
 
-        try:
-            initial_close_price = initial_data.loc[initialBasePriceEvaluationDate, "Close"]
-        except:
-            raise ValidateInitialBasePriceEvaluationDateException(productId)
-
-        initial_tmp[equity] = initial_close_price
-    result["initial"] = initial_tmp
-
-    # yfinace에 오늘 날짜에 대한 각 기초자산들의 종가 데이터 가져오기 (현재 기초자산이 속한 장이 열려 있다면 실시간 값을 가져오게 됨)
-    recent_tmp = {}
-    for equity in equities:
-        stock_data = yf.Ticker(equityTickerSymbols[equity])
-        recent_data = stock_data.history(period="1d")
-
-        recent_close_price = recent_data['Close'].iloc[-1]
-        recent_tmp[equity] = recent_close_price
-    result["recent"] = recent_tmp
+    initialClosePrices = [initialCloses.get(closeKey) for closeKey in closeKeys]
+    if any(initialClosePrice is None for initialClosePrice in initialClosePrices):
+        raise ValidateInitialBasePriceEvaluationDateException(productId)
+    result["initial"] = dict(zip(equities, initialClosePrices))
+    result["recent"] = {equity: recentCloses[equityTickerSymbols[equity]] for equity in equities}
 
     # 최초기준가격 대비 최근 기초자산가격
-    minComparedValue = float('inf')
-    ratio_tmp = {}
-    for equity in equities:
-        x = result["initial"][equity]
-        y = result["recent"][equity]
-        ratio_tmp[equity] = round((y / x) * 100, 2)
-        minComparedValue = min(minComparedValue, round((y / x) * 100, 2))
-    result["ratio"] = ratio_tmp
-    result["recentAndInitialPriceRatio"] = round((minComparedValue - 100), 2)
+    matrix = build_price_matrix([product], initialCloses, recentCloses)
+    ratio, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+    result["ratio"] = dict(zip(equities, ratio[0, :len(equities)].tolist()))
+    result["recentAndInitialPriceRatio"] = float(recentAndInitialPriceRatio[0])
+
+    # 조회된 상품은 낙인 배리어 감시 대상으로 등록
+    await monitor_products([{**product, "id": productId}], initialCloses)
 
     return result
 
 @router.post("/price/ratio/list",
             summary="여러 상품 id에 대한 최초기준가격 대비 현재 기초자산가격 비율 리스트 조회",
             description="""
-                            **recentAndInitialPriceRatio**: 각 기초자산들의 최초기준가격 대비 현재 기초자산가격 비율들 중에 가장 낮은 비율(종가 데이터를 못 가져오는 경우 null 값 반환)
+                            **recentAndInitialPriceRatio**: 각 기초자산들의 최초기준가격 대비 현재 기초자산가격 비율들 중에 가장 낮은 비율(종가 데이터를 못 가져오는 경우 null 값 반환)<br/><br/>
+                            Accept 헤더에 **application/x-ndjson**을 지정하면 전체 결과를 기다리지 않고 상품별 결과를 계산이 끝나는 순서대로 한 줄씩 스트리밍합니다.<br/>
+                            (스트리밍 중 상품 정보를 가져오지 못한 상품은 recentAndInitialPriceRatio가 null이고 error 필드에 에러 코드가 담깁니다.)<br/><br/>
+                            Accept 헤더에 **application/vnd.elswhere.fast+json**을 지정하면 같은 JSON을 응답 모델 검증 없이 직렬화하고,
+                            **application/x-msgpack**을 지정하면 필드별 값 배열({"id": [...], "recentAndInitialPriceRatio": [...]})을 msgpack으로 응답합니다.
                         """,
             response_model=List[PriceRatio],
             responses={
+                200: {"content": {"application/x-ndjson": {}, FAST_JSON_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}},
                 **product_service_exception_response,
                 **validate_initial_price_exception_response
             })
@@ -111,68 +125,102 @@ async def get_price_ratio_list(request: Request, data: ProductIdListModel):
     productIdList = data.productIdList
     requestId = request.headers.get("requestId")
 
-    async def fetch_product_info(productId):
-        try:
-            headers = {"requestId": requestId}
-            responseProduct = await eureka_client.do_service_async("product-service", f"/v1/product/{productId}", headers=headers)
-            return json.loads(responseProduct)
-        except urllib.error.URLError as e:
-            raise ProductServiceServerException(productId)
-
-    async def fetch_initial_prices(stock_data, initialBasePriceEvaluationDate):
-        return stock_data.history(start=initialBasePriceEvaluationDate,
-                                  end=pd.Timestamp(initialBasePriceEvaluationDate) + pd.Timedelta(days=1))
-
-    async def fetch_recent_prices(stock_data):
-        return stock_data.history(period="1d")
-
-    result = []
-
-    productResults = await asyncio.gather(*[fetch_product_info(productId) for productId in productIdList])
-
-    for productResult in productResults:
-        tmp = {}
-        productId = productResult["id"]
-        initialBasePriceEvaluationDate = productResult["initialBasePriceEvaluationDate"]
-        equities = productResult["equities"].split(" / ")
-        equityTickerSymbols = productResult["equityTickerSymbols"]
-
-        tmp["id"] = productId
-
-        if datetime.strptime(initialBasePriceEvaluationDate, "%Y-%m-%d").date() > datetime.now().date():
-            tmp["recentAndInitialPriceRatio"] = None
-            result.append(tmp)
-            continue
-
-        # 각각의 종목에 대해 초기 및 최근 가격을 비동기적으로 가져옴
-        tasks = []
-        for equity in equities:
-            stock_data = yf.Ticker(equityTickerSymbols[equity])
-            tasks.append(asyncio.gather(
-                fetch_initial_prices(stock_data, initialBasePriceEvaluationDate),
-                fetch_recent_prices(stock_data)
-            ))
-
-        price_data = await asyncio.gather(*tasks)
-
-        # 최초기준가격 대비 최근 기초자산가격
-        minComparedValue = float('inf')
-        initialBasePriceEvaluationDateFlag = False
-        for (initial_data, recent_data), equity in zip(price_data, equities):
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(stream_price_ratio_list(productIdList, requestId), media_type=NDJSON_MEDIA_TYPE)
+
+    productResults = await product_client.get_products(productIdList, requestId)
+
+    # 상품들이 공유하는 (기초자산, 최초기준가격평가일)을 모아 캐시에 없는 종가만 중복 없이 한 번에 조회
+    closeKeys = {closeKey for productResult in productResults for closeKey in get_close_keys(productResult)}
+    try:
+        initialCloses, recentCloses = await get_closes(closeKeys, {tickerSymbol for tickerSymbol, _ in closeKeys})
+    except MarketDataTimeoutException:
+        initialCloses, recentCloses = {}, {}
+
+    # 모든 상품 × 기초자산의 비율을 한 번에 계산
+    matrix = build_price_matrix(productResults, initialCloses, recentCloses)
+    _, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+
+    await monitor_products(productResults, initialCloses)
+
+    return bulk_response(request.headers.get("accept"), PRICE_RATIO_FIELDS,
+                         to_price_ratio_rows(matrix, recentAndInitialPriceRatio))
+
+
+# 상품별 결과를 계산이 끝나는 순서대로 NDJSON 한 줄씩 전송 (상품별 종가 데이터는 전송 직후 해제됨)
+async def stream_price_ratio_list(productIdList: List[int], requestId: Optional[str]):
+    semaphore = asyncio.Semaphore(product_client.maxConcurrency)
+
+    async def compute(productId):
+        async with semaphore:
             try:
-                initial_close_price = initial_data.loc[initialBasePriceEvaluationDate, "Close"]
-            except:
-                tmp["recentAndInitialPriceRatio"] = None
-                initialBasePriceEvaluationDateFlag = True
-                break
+                productResult = await product_client.get_product(productId, requestId)
+            except ProductServiceServerException:
+                return {"id": productId, "recentAndInitialPriceRatio": None, "error": "ProductServiceServerException"}
 
-            recent_close_price = recent_data['Close'].iloc[-1]
-            minComparedValue = min(minComparedValue, round((recent_close_price / initial_close_price) * 100, 2))
+        closeKeys = get_close_keys(productResult)
+        try:
+            initialCloses, recentCloses = await get_closes(closeKeys, {tickerSymbol for tickerSymbol, _ in closeKeys})
+        except MarketDataTimeoutException:
+            initialCloses, recentCloses = {}, {}
+        matrix = build_price_matrix([productResult], initialCloses, recentCloses)
+        _, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+        return to_price_ratio_records(matrix, recentAndInitialPriceRatio)[0]
+
+    tasks = [asyncio.ensure_future(compute(productId)) for productId in productIdList]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield json.dumps(await task) + "\n"
+    finally:
+        # 클라이언트 연결이 끊긴 경우 남은 계산은 취소
+        for task in tasks:
+            task.cancel()
 
-        if not initialBasePriceEvaluationDateFlag:
-            tmp["recentAndInitialPriceRatio"] = round((minComparedValue - 100), 2)
 
-        result.append(tmp)
+@router.post("/knock-in/monitor",
+            summary="낙인 배리어 감시 상품 등록",
+            description="""
+                            여러 상품 id를 낙인 배리어 감시 대상으로 등록합니다.<br/>
+                            등록된 상품은 기초자산 가격이 바뀔 때마다 해당 기초자산을 가진 상품들만 다시 계산되며, 낙인 배리어(knockIn) 아래로 내려간 적이 있는 상품은 낙인 상품으로 표시됩니다.<br/>
+                            (발행되지 않았거나 최초기준가격을 가져오지 못한 상품은 등록되지 않습니다.)<br/>
+                            몬테카를로 분석 결과가 있는 상품은 서비스가 시작될 때 감시 대상으로 등록됩니다.<br/><br/>
+                            **registered**: 감시 대상으로 등록된 상품 id 리스트
+                        """,
+            responses={
+                **product_service_exception_response,
+                **market_data_timeout_exception_response
+            })
+async def register_knock_in_monitor(request: Request, data: ProductIdListModel):
+    productResults = await product_client.get_products(data.productIdList, request.headers.get("requestId"))
+
+    closeKeys = {closeKey for productResult in productResults for closeKey in get_close_keys(productResult)}
+    initialCloses, recentCloses = await get_closes(closeKeys, {tickerSymbol for tickerSymbol, _ in closeKeys})
+
+    return {"registered": await monitor_products(productResults, initialCloses, recentCloses)}
 
-    return result
 
+@router.get("/knock-in",
+            summary="낙인 상품 리스트 조회",
+            description="""
+                            낙인 배리어 감시 중인 상품들 중 기초자산 가격이 낙인 배리어 아래로 내려간 적이 있는 상품 리스트를 제공합니다.<br/><br/>
+                            **recentAndInitialPriceRatio**: 가장 최근에 계산된 기초자산들의 최초기준가격 대비 현재 기초자산가격 비율들 중에 가장 낮은 비율<br/>
+                            **knockedInAt**: 낙인이 처음 감지된 시각
+                        """,
+            response_model=List[KnockInProduct])
+async def get_knock_in_products():
+    return await get_knocked_in_products()
+
+
+@router.get("/price/stats",
+            summary="기초자산 가격 캐시 및 저장소 통계 조회",
+            description="""
+                            기초자산 종가 캐시의 적중/미스/제거 횟수, 로컬 종가 저장소의 적중/미스 횟수, 상품 정보 캐시의 적중/미스/병합 횟수를 제공합니다.<br/>
+                            **memoryHitRatio**: 전체 조회 중 메모리 캐시로 응답한 비율<br/>
+                            **priceRatioCoalescing.coalesced**: 진행 중인 같은 상품의 비율 계산 결과를 함께 사용한 요청 수
+                        """)
+async def get_price_stats():
+    return {"cache": price_cache.stats(),
+            "store": price_store.stats(),
+            "productCache": product_client.stats(),
+            "priceRatioCoalescing": price_ratio_flight.stats(),
+            "barrierMonitor": barrier_monitor.stats()}
@@ -0,0 +1,84 @@
+from decimal import Decimal
+from typing import Callable, List
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from core.response_format import bulk_response, bulk_value_response, FAST_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from core.price_ratio import PRICE_RATIO_FIELDS
+from api.routes.ai import AIResponse
+from api.routes.product import PriceRatio
+import statistics
+import argparse
+import asyncio
+import json
+import time
+
+ROW_COUNTS = (1000, 10000, 100000)
+AI_FIELDS = ("AIResultId", "productId", "safetyScore")
+
+
+# 엔드포인트별 응답 데이터 (DB, 계산 결과와 같은 타입: safety_score는 DECIMAL 컬럼이므로 Decimal)
+def ai_rows(count: int):
+    return [(index * 10, index, Decimal(f"0.{index % 10000:04d}")) for index in range(count)]
+
+
+def price_ratio_rows(count: int):
+    return [(index, None if index % 50 == 0 else round(-(index % 10000) / 100, 2)) for index in range(count)]
+
+
+def product_ids(count: int):
+    return list(range(count))
+
+
+# 라우트와 같은 방식으로 응답 본문(bytes)을 만드는 함수
+# json: FastAPI 기본 경로 (응답 모델 검증 후 JSONResponse로 직렬화)
+def default_json(responseModel, build: Callable):
+    field = create_model_field("Response", responseModel, mode="serialization")
+
+    def encode(data):
+        content = asyncio.run(serialize_response(field=field, response_content=build(None, data)))
+        return JSONResponse(content).body
+    return encode
+
+
+def negotiated(mediaType: str, build: Callable):
+    return lambda data: build(mediaType, data).body
+
+
+ENDPOINTS = {
+    "/v1/ai/list": (ai_rows, List[AIResponse], lambda accept, rows: bulk_response(accept, AI_FIELDS, rows)),
+    "/v1/product/price/ratio/list": (price_ratio_rows, List[PriceRatio],
+                                     lambda accept, rows: bulk_response(accept, PRICE_RATIO_FIELDS, rows)),
+    "/v1/investment-propensity/list": (product_ids, List[int],
+                                       lambda accept, values: bulk_value_response(accept, "productId", values)),
+}
+
+
+def measure(encode: Callable, data, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(data)
+        timings.append(time.perf_counter() - start)
+    return {"ms": round(statistics.median(timings) * 1000, 2), "bytes": len(body)}
+
+
+# 여러 상품 조회 응답 형식별 직렬화 시간 비교 (행 수별 중앙값, 결과를 JSON으로 출력)
+# python -m benchmarks.response_format [--repeat 5]
+def main():
+    parser = argparse.ArgumentParser(description="여러 상품 조회 응답 형식(json, fast json, msgpack)별 직렬화 시간 측정")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for path, (generate, responseModel, build) in ENDPOINTS.items():
+        encoders = {"json": default_json(responseModel, build),
+                    FAST_JSON_MEDIA_TYPE: negotiated(FAST_JSON_MEDIA_TYPE, build),
+                    MSGPACK_MEDIA_TYPE: negotiated(MSGPACK_MEDIA_TYPE, build)}
+        results[path] = {count: {name: measure(encode, generate(count), args.repeat) for name, encode in encoders.items()}
+                         for count in ROW_COUNTS}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from typing import List, Optional
+import urllib.error
+import urllib.request
+import statistics
+import subprocess
+import argparse
+import socket
+import json
+import time
+import sys
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 새 프로세스에서 main 모듈 import에 걸린 시간 (초)
+def measure_import() -> float:
+    result = subprocess.run([sys.executable, "-c",
+                             "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"],
+                            capture_output=True, text=True, cwd=ROOT_DIR, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_status(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+# uvicorn 프로세스를 띄운 시각부터 liveness가 처음 200을 응답하기까지 걸린 시간과 readiness가 200을 응답하기까지 걸린 시간 (초)
+# readiness는 readyTimeout 안에 준비되지 않으면 None (DB, Eureka에 연결할 수 없는 환경 등)
+def measure_first_response(readyTimeout: float, timeout: float = 60) -> dict:
+    port = free_port()
+    baseUrl = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                                "--log-level", "warning"],
+                               cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        live = _wait_for_200(f"{baseUrl}/health/live", start, timeout)
+        ready = _wait_for_200(f"{baseUrl}/health/ready", start, live + readyTimeout) if live is not None else None
+        return {"live": live, "ready": ready}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _wait_for_200(url: str, start: float, timeout: float) -> Optional[float]:
+    while time.perf_counter() - start < timeout:
+        if get_status(url) == 200:
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    return None
+
+
+def summarize(values: List[Optional[float]]) -> Optional[dict]:
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"min": round(min(values), 3), "median": round(statistics.median(values), 3), "max": round(max(values), 3)}
+
+
+# 서비스 시작 시간 측정 (결과를 JSON으로 출력해서 배포 간에 비교)
+# python -m benchmarks.startup [--runs 5] [--ready-timeout 10]
+def main():
+    parser = argparse.ArgumentParser(description="서비스 시작 시간(main import 시간, 첫 200 응답까지 걸린 시간) 측정")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    responses = [measure_first_response(args.ready_timeout) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "importSeconds": summarize(imports),
+        "firstLiveSeconds": summarize([response["live"] for response in responses]),
+        "firstReadySeconds": summarize([response["ready"] for response in responses])
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
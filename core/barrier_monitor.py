@@ -0,0 +1,390 @@
+from collections import defaultdict
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from core.price_ratio import get_close_keys, build_price_matrix, compute_price_ratios, to_price_ratio_records
+from core.market_data import get_closes
+from core.database import ReadOnlySessionLocal
+from core.product_client import product_client
+from core.shared_cache import create_cache_backend, MISSING
+from exception.errors import MarketDataTimeoutException
+from sqlalchemy.future import select
+from models import MonteCarloResult
+import asyncio
+import logging
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 감시 중인 기초자산들의 최근 가격을 확인하는 주기 (초)
+BARRIER_MONITOR_INTERVAL = float(os.getenv('BARRIER_MONITOR_INTERVAL', 10))
+# 감시할 수 있는 최대 상품 수 (넘으면 가장 먼저 등록된 상품부터 감시 대상에서 제외)
+BARRIER_MONITOR_MAX_PRODUCTS = int(os.getenv('BARRIER_MONITOR_MAX_PRODUCTS', 10000))
+
+
+# 낙인(knock-in) 배리어 감시
+# 감시 중인 상품들의 가장 낮은 비율을 메모리에 유지하고, 기초자산 티커 → 상품 id 역색인을 통해
+# 가격이 바뀐 기초자산을 가진 상품들만 다시 계산함
+# 낙인 배리어(product-service 상품 정보의 knockIn, 최초기준가격 대비 %)보다 낮아진 적이 있는 상품은 낙인 상품으로 표시
+# 만기 평가일(earlyRepaymentEvaluationDates의 마지막 날짜)이 지났거나 조기상환된 상품은 감시 대상에서 제외하고,
+# 최대 상품 수(maxProducts)를 넘으면 가장 먼저 등록된 상품부터 제외함
+# 워커가 여러 개이면 한 워커(leader)만 감시를 실행하고(active), 다른 워커는 등록 요청과 낙인 상품 조회를 공유 메모리 캐시로 처리
+class BarrierMonitor:
+    def __init__(self, maxProducts: int = BARRIER_MONITOR_MAX_PRODUCTS):
+        self.maxProducts = maxProducts
+        self.active = True
+        self._products: Dict[int, dict] = {}
+        self._closeKeys: Dict[int, List[Tuple[str, str]]] = {}
+        # 아직 조기상환 여부를 확인하지 않은 조기상환 평가일과 상환 배리어 (만기 평가일 제외), 만기 평가일
+        self._redemptionSchedules: Dict[int, List[Tuple[str, float]]] = {}
+        self._maturityDates: Dict[int, Optional[str]] = {}
+        self._knockInBarriers: Dict[int, Optional[float]] = {}
+        self._tickerIndex: Dict[str, Set[int]] = defaultdict(set)
+        self._initialCloses: Dict[Tuple[str, str], Optional[float]] = {}
+        self._quotes: Dict[str, float] = {}
+        self._recentAndInitialPriceRatios: Dict[int, float] = {}
+        self._knockedIn: Dict[int, datetime] = {}
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "quoteUpdates": 0,
+            "evaluations": 0,
+            "matured": 0,
+            "redeemed": 0,
+            "evictions": 0,
+        }
+
+    # 감시할 수 있는 상품인지 (발행되지 않았거나 최초기준가격을 알 수 없거나 만기 평가일이 지난 상품은 감시하지 않음)
+    @staticmethod
+    def can_register(productResult: dict, initialCloses: Dict[Tuple[str, str], Optional[float]]) -> bool:
+        closeKeys = get_close_keys(productResult)
+        if not closeKeys or any(initialCloses.get(closeKey) is None for closeKey in closeKeys):
+            return False
+        evaluationDates = _split(productResult.get("earlyRepaymentEvaluationDates"))
+        return not evaluationDates or evaluationDates[-1] >= _format_date(datetime.now())
+
+    # 감시할 상품 등록
+    def register(self, productResult: dict, initialCloses: Dict[Tuple[str, str], Optional[float]]) -> bool:
+        if not self.can_register(productResult, initialCloses):
+            return False
+
+        productId = productResult["id"]
+        if productId in self._products:
+            return True
+
+        closeKeys = get_close_keys(productResult)
+        evaluationDates = _split(productResult.get("earlyRepaymentEvaluationDates"))
+        maturityDate = evaluationDates[-1] if evaluationDates else None
+        redemptionBarriers = [float(barrier) for barrier in _split(productResult.get("redemptionBarriers"))]
+        # 상환 배리어 정보가 없는 상품은 만기까지 감시 (이미 지난 평가일은 감시하면서 종가를 가져와 확인)
+        schedule = list(zip(evaluationDates[:-1], redemptionBarriers)) \
+            if len(evaluationDates) == len(redemptionBarriers) else []
+
+        while len(self._products) >= self.maxProducts:
+            self.remove(next(iter(self._products)))
+            self._stats["evictions"] += 1
+
+        self._products[productId] = productResult
+        self._closeKeys[productId] = closeKeys
+        self._redemptionSchedules[productId] = schedule
+        self._maturityDates[productId] = maturityDate
+        knockIn = productResult.get("knockIn")
+        self._knockInBarriers[productId] = float(knockIn) if knockIn is not None else None
+        for closeKey in closeKeys:
+            self._initialCloses[closeKey] = initialCloses[closeKey]
+            self._tickerIndex[closeKey[0]].add(productId)
+        self._evaluate([productId])
+        return True
+
+    # 감시 대상에서 상품 제외 (다른 상품이 사용하지 않는 기초자산의 역색인, 최초기준가격, 최근 가격도 함께 제거)
+    def remove(self, productId: int) -> bool:
+        if productId not in self._products:
+            return False
+        del self._products[productId]
+        for closeKey in self._closeKeys.pop(productId):
+            tickerSymbol = closeKey[0]
+            productIds = self._tickerIndex[tickerSymbol]
+            productIds.discard(productId)
+            if not any(closeKey in self._closeKeys[otherProductId] for otherProductId in productIds):
+                self._initialCloses.pop(closeKey, None)
+            if not productIds:
+                del self._tickerIndex[tickerSymbol]
+                self._quotes.pop(tickerSymbol, None)
+        self._redemptionSchedules.pop(productId, None)
+        self._maturityDates.pop(productId, None)
+        self._knockInBarriers.pop(productId, None)
+        self._recentAndInitialPriceRatios.pop(productId, None)
+        self._knockedIn.pop(productId, None)
+        return True
+
+    # 만기 평가일이 지난 상품을 감시 대상에서 제외
+    def expire(self, today: str) -> List[int]:
+        maturedProductIds = [productId for productId, maturityDate in self._maturityDates.items()
+                             if maturityDate is not None and maturityDate < today]
+        for productId in maturedProductIds:
+            self.remove(productId)
+        self._stats["matured"] += len(maturedProductIds)
+        return maturedProductIds
+
+    # 지난 조기상환 평가일의 종가로 조기상환 여부를 확인해야 하는 상품별 (평가일, 상환 배리어) 리스트
+    def due_redemption_checks(self, today: str) -> Dict[int, List[Tuple[str, float]]]:
+        checks = {productId: [(date, barrier) for date, barrier in schedule if date < today]
+                  for productId, schedule in self._redemptionSchedules.items()}
+        return {productId: dueSchedule for productId, dueSchedule in checks.items() if dueSchedule}
+
+    # 조기상환 여부 확인에 필요한 (기초자산 티커, 평가일) 목록
+    def redemption_close_keys(self, checks: Dict[int, List[Tuple[str, float]]]) -> Set[Tuple[str, str]]:
+        return {(closeKey[0], date) for productId, dueSchedule in checks.items()
+                for date, _ in dueSchedule for closeKey in self._closeKeys[productId]}
+
+    # 평가일 순서대로 평가일 종가가 모두 상환 배리어 이상인지 확인해서, 조기상환된 상품은 감시 대상에서 제외하고
+    # 조기상환되지 않은 평가일(휴장일로 종가가 없는 평가일 포함)은 일정에서 제거
+    # (평가일 종가를 아직 가져오지 못한 평가일부터는 다음 확인 때 다시 확인)
+    def settle_redemption_checks(self, checks: Dict[int, List[Tuple[str, float]]],
+                                 closes: Dict[Tuple[str, str], Optional[float]]) -> List[int]:
+        redeemedProductIds = []
+        for productId, dueSchedule in checks.items():
+            if productId not in self._products:
+                continue
+            closeKeys = self._closeKeys[productId]
+            for date, barrier in dueSchedule:
+                evaluationCloseKeys = [(tickerSymbol, date) for tickerSymbol, _ in closeKeys]
+                if any(closeKey not in closes for closeKey in evaluationCloseKeys):
+                    break
+                evaluationCloses = [closes[closeKey] for closeKey in evaluationCloseKeys]
+                redeemed = all(close is not None for close in evaluationCloses) and \
+                    min(close / self._initialCloses[closeKey] * 100
+                        for close, closeKey in zip(evaluationCloses, closeKeys)) >= barrier
+                if redeemed:
+                    self.remove(productId)
+                    redeemedProductIds.append(productId)
+                    break
+                self._redemptionSchedules[productId].pop(0)
+        self._stats["redeemed"] += len(redeemedProductIds)
+        return redeemedProductIds
+
+    def tickers(self) -> List[str]:
+        return list(self._tickerIndex)
+
+    def is_registered(self, productId: int) -> bool:
+        return productId in self._products
+
+    # 최대 상품 수까지 더 등록할 수 있는 상품 수
+    def available(self) -> int:
+        return max(0, self.maxProducts - len(self._products))
+
+    # 새로운 기초자산 가격 반영 (가격이 바뀐 기초자산을 가진 상품들만 다시 계산)
+    def update_quotes(self, quotes: Dict[str, float]) -> Set[int]:
+        changedTickerSymbols = [tickerSymbol for tickerSymbol, quote in quotes.items()
+                                if self._quotes.get(tickerSymbol) != quote]
+        self._quotes.update(quotes)
+        self._stats["quoteUpdates"] += len(changedTickerSymbols)
+
+        affectedProductIds: Set[int] = set()
+        for tickerSymbol in changedTickerSymbols:
+            affectedProductIds |= self._tickerIndex.get(tickerSymbol, set())
+        self._evaluate(affectedProductIds)
+        return affectedProductIds
+
+    def _evaluate(self, productIds: Iterable[int]):
+        products = [self._products[productId] for productId in productIds]
+        if not products:
+            return
+
+        matrix = build_price_matrix(products, self._initialCloses, self._quotes)
+        _, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+        self._stats["evaluations"] += len(products)
+
+        now = datetime.now()
+        for record in to_price_ratio_records(matrix, recentAndInitialPriceRatio):
+            productId, ratio = record["id"], record["recentAndInitialPriceRatio"]
+            if ratio is None:
+                continue
+            self._recentAndInitialPriceRatios[productId] = ratio
+            knockInBarrier = self._knockInBarriers[productId]
+            # 한 번 낙인이 발생한 상품은 가격이 회복되어도 낙인 상품으로 유지
+            if knockInBarrier is not None and ratio + 100 < knockInBarrier and productId not in self._knockedIn:
+                self._knockedIn[productId] = now
+
+    def knocked_in_products(self) -> List[dict]:
+        return [{
+            "id": productId,
+            "recentAndInitialPriceRatio": self._recentAndInitialPriceRatios.get(productId),
+            "knockInBarrier": self._knockInBarriers[productId],
+            "knockedInAt": knockedInAt
+        } for productId, knockedInAt in sorted(self._knockedIn.items())]
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["products"] = len(self._products)
+        stats["tickers"] = len(self._tickerIndex)
+        stats["knockedIn"] = len(self._knockedIn)
+        stats["active"] = self.active
+        return stats
+
+    def clear(self):
+        self._products.clear()
+        self._closeKeys.clear()
+        self._redemptionSchedules.clear()
+        self._maturityDates.clear()
+        self._knockInBarriers.clear()
+        self._tickerIndex.clear()
+        self._initialCloses.clear()
+        self._quotes.clear()
+        self._recentAndInitialPriceRatios.clear()
+        self._knockedIn.clear()
+        self._reset_stats()
+
+
+def _split(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
+
+
+def _format_date(date) -> str:
+    return date.strftime("%Y-%m-%d")
+
+
+# 공유 메모리 캐시에 저장할 때의 낙인 상품 리스트 (낙인 시각은 ISO 형식 문자열로 저장)
+def _encode_knocked_in_products(products: List[dict]) -> List[dict]:
+    return [{**product, "knockedInAt": product["knockedInAt"].isoformat()} for product in products]
+
+
+def _decode_knocked_in_products(products: List[dict]) -> List[dict]:
+    return [{**product, "knockedInAt": datetime.fromisoformat(product["knockedInAt"])} for product in products]
+
+
+barrier_monitor = BarrierMonitor()
+# 감시 대상으로 등록 요청된 상품 id (감시를 실행하는 워커가 주기적으로 가져가서 등록하고, 등록할 수 없거나 감시가 끝난 상품은 제거)
+monitored_products = create_cache_backend("barrierMonitorProduct", BARRIER_MONITOR_MAX_PRODUCTS)
+# 감시를 실행하는 워커가 계산한 낙인 상품 리스트 (다른 워커는 이 리스트로 응답)
+knock_in_store = create_cache_backend("barrierMonitorKnockIn", 1, encode=_encode_knocked_in_products,
+                                      decode=_decode_knocked_in_products)
+KNOCKED_IN = "knockedIn"
+# 마지막으로 저장한 낙인 상품 리스트 (바뀌었을 때만 저장)
+_publishedKnockedIn: Optional[List[dict]] = None
+
+
+# 상품들을 감시 대상으로 등록 요청 (감시를 실행하는 워커이면 바로 등록하고, 다른 워커이면 감시를 실행하는 워커가 다음 주기에 등록)
+# quotes: 함께 조회한 기초자산 최근 가격, 감시할 수 있는 상품 id 리스트 반환
+async def monitor_products(productResults: List[dict], initialCloses: Dict[Tuple[str, str], Optional[float]],
+                           quotes: Optional[Dict[str, float]] = None) -> List[int]:
+    productIds = [productResult["id"] for productResult in productResults
+                  if BarrierMonitor.can_register(productResult, initialCloses)]
+    requested = await monitored_products.get_many_async(productIds)
+    newProductIds = [productId for productId in productIds if requested[productId] is MISSING]
+    if newProductIds:
+        await monitored_products.put_many_async(dict.fromkeys(newProductIds, True))
+
+    if barrier_monitor.active:
+        if quotes:
+            barrier_monitor.update_quotes(quotes)
+        for productResult in productResults:
+            barrier_monitor.register(productResult, initialCloses)
+        await publish_knocked_in_products()
+    return productIds
+
+
+async def get_knocked_in_products() -> List[dict]:
+    if barrier_monitor.active:
+        return barrier_monitor.knocked_in_products()
+    products = await knock_in_store.get_async(KNOCKED_IN)
+    return [] if products is MISSING else products
+
+
+async def publish_knocked_in_products():
+    global _publishedKnockedIn
+    products = barrier_monitor.knocked_in_products()
+    if products != _publishedKnockedIn:
+        await knock_in_store.put_async(KNOCKED_IN, products)
+        _publishedKnockedIn = products
+
+
+# 몬테카를로 분석 결과가 있는 상품(운용 중인 상품 목록)을 감시 대상 등록 요청에 추가 (감시를 시작할 때 한 번 실행)
+async def seed_monitored_products():
+    async with ReadOnlySessionLocal() as session:
+        result = await session.execute(select(MonteCarloResult.product_id).distinct())
+        productIds = result.scalars().all()
+    await monitored_products.put_many_async(dict.fromkeys(productIds, True))
+
+
+# 등록 요청된 상품 중 아직 감시하지 않는 상품 등록 (최대 상품 수를 넘지 않는 만큼만 등록해서 감시 중인 상품을 밀어내지 않음)
+# 등록할 수 없는 상품은 요청 목록에서 제거하고, 상품 정보를 가져오지 못한 상품은 다음 주기에 다시 시도
+async def register_requested_products():
+    productIds = [productId for productId in await monitored_products.items_async()
+                  if not barrier_monitor.is_registered(productId)][:barrier_monitor.available()]
+    if not productIds:
+        return
+
+    semaphore = asyncio.Semaphore(product_client.maxConcurrency)
+
+    async def get_product(productId):
+        async with semaphore:
+            return {**await product_client.get_product(productId), "id": productId}
+
+    results = await asyncio.gather(*[get_product(productId) for productId in productIds], return_exceptions=True)
+    productResults = [result for result in results if not isinstance(result, Exception)]
+    closeKeys = {closeKey for productResult in productResults for closeKey in get_close_keys(productResult)}
+    initialCloses, _ = await get_closes(closeKeys, [])
+    rejectedProductIds = [productResult["id"] for productResult in productResults
+                          if not barrier_monitor.register(productResult, initialCloses)]
+    await monitored_products.delete_many_async(rejectedProductIds)
+
+
+# 만기가 지났거나 조기상환된 상품을 감시 대상과 등록 요청에서 제외
+async def retire_finished_products(today: str):
+    retiredProductIds = barrier_monitor.expire(today)
+    checks = barrier_monitor.due_redemption_checks(today)
+    if checks:
+        closes, _ = await get_closes(barrier_monitor.redemption_close_keys(checks), [])
+        retiredProductIds += barrier_monitor.settle_redemption_checks(checks, closes)
+    await monitored_products.delete_many_async(retiredProductIds)
+
+
+# 감시를 실행하는 워커(leader)에서 실행
+# 시작할 때 운용 중인 상품을 등록 요청에 추가하고, 주기적으로 등록 요청된 상품을 등록한 뒤 감시 중인 기초자산들의 최근 가격을 반영
+# (최근 가격 캐시의 TTL에 따라 yfinance 호출 여부가 결정됨)
+async def run_barrier_monitor(interval: float = BARRIER_MONITOR_INTERVAL):
+    seeded = False
+    while True:
+        if not seeded:
+            try:
+                await seed_monitored_products()
+                seeded = True
+            except Exception:
+                logger.exception("낙인 배리어 감시 대상을 불러오지 못하였습니다. 다음 주기에 다시 시도합니다.")
+        try:
+            await register_requested_products()
+        except MarketDataTimeoutException:
+            pass
+        except Exception:
+            logger.exception("등록 요청된 상품을 낙인 배리어 감시 대상으로 등록하지 못하였습니다.")
+        try:
+            await retire_finished_products(_format_date(datetime.now()))
+        except MarketDataTimeoutException:
+            pass
+        except Exception:
+            logger.exception("만기, 조기상환된 상품을 낙인 배리어 감시 대상에서 제외하지 못하였습니다.")
+        await update_monitored_quotes()
+        await publish_knocked_in_products()
+        await asyncio.sleep(interval)
+
+
+async def update_monitored_quotes():
+    tickerSymbols = barrier_monitor.tickers()
+    if not tickerSymbols:
+        return
+    try:
+        _, recentCloses = await get_closes([], tickerSymbols)
+    except MarketDataTimeoutException:
+        return
+    except Exception:
+        logger.exception("낙인 배리어 감시를 위한 기초자산 가격 조회에 실패하였습니다.")
+        return
+    barrier_monitor.update_quotes(recentCloses)
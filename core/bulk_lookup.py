@@ -0,0 +1,35 @@
+from dotenv import load_dotenv
+from typing import List, Sequence
+from sqlalchemy.engine import Row
+from sqlalchemy.future import select
+from core.config import PRODUCT_ID_CHUNK_SIZE
+from core.database import ReadOnlySessionLocal
+import asyncio
+import os
+
+load_dotenv()
+
+# 여러 상품 조회에서 동시에 실행하는 쿼리 수 (커넥션 풀 크기 이하로 설정)
+BULK_LOOKUP_MAX_CONCURRENCY = int(os.getenv('BULK_LOOKUP_MAX_CONCURRENCY', 4))
+
+
+# 상품 id 리스트에 해당하는 행의 지정한 컬럼만 조회 (ORM 객체를 만들지 않음)
+# 상품 id가 많으면 PRODUCT_ID_CHUNK_SIZE개씩 나눠서 각각의 조회 전용 세션(커넥션)으로 동시에 조회
+async def fetch_rows_by_product_ids(columns: Sequence, productIdColumn, productIdList: List[int]) -> List[Row]:
+    productIdList = list(dict.fromkeys(productIdList))
+    semaphore = asyncio.Semaphore(BULK_LOOKUP_MAX_CONCURRENCY)
+
+    async def fetch_chunk(chunk: List[int]) -> List[Row]:
+        async with semaphore:
+            async with ReadOnlySessionLocal() as session:
+                result = await session.execute(select(*columns).where(productIdColumn.in_(chunk)))
+                return result.all()
+
+    chunks = [productIdList[start:start + PRODUCT_ID_CHUNK_SIZE] for start in range(0, len(productIdList), PRODUCT_ID_CHUNK_SIZE)]
+    return [row for rows in await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunks]) for row in rows]
+
+
+# 요청한 상품 id 중 조회된 행이 없는 상품 id (요청 순서 유지)
+def missing_product_ids(productIdList: List[int], foundProductIds) -> List[int]:
+    found = set(foundProductIds)
+    return [productId for productId in dict.fromkeys(productIdList) if productId not in found]
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Optional, Tuple
+from util.risk_propensity import RiskPropensity
+import os
+
+load_dotenv()
+
+# 조기상환 성향 판단에 사용하는 앞쪽 조기상환 평가일 수
+EARLY_REPAYMENT_REDEMPTION_COUNT = 2
+# 한 번의 쿼리 IN 절에 넣는 최대 상품 id 수
+PRODUCT_ID_CHUNK_SIZE = int(os.getenv('PRODUCT_ID_CHUNK_SIZE', 1000))
+# uvicorn 워커 프로세스 수
+UVICORN_WORKERS = int(os.getenv('UVICORN_WORKERS', 1))
+
+
+# 투자 성향 판단 기준값 (요청마다 환경 변수를 읽지 않도록 처음 사용할 때 한 번만 읽음)
+# - 위험 성향: ai_result.safety_score 구간 경계 (초고위험 < EXTREME_AND_HIGH ≤ 고위험 < HIGH_AND_MEDIUM ≤ 중위험 < MEDIUM_AND_LOW ≤ 저위험 < 1)
+# - 조기상환: 첫 두 평가일의 조기상환 확률 합(%)이 EARLY_REPAYMENT 이상
+# - 만기상환: 손실 확률(%)이 MATURITY_REPAYMENT 이하
+@dataclass(frozen=True)
+class PropensityBoundaries:
+    extremeAndHighRisk: float
+    highAndMediumRisk: float
+    mediumAndLowRisk: float
+    earlyRepayment: int
+    maturityRepayment: int
+
+    # 위험 성향별 안전 점수 범위 [최솟값, 최댓값)
+    def safety_score_range(self, riskPropensity: RiskPropensity) -> Tuple[float, float]:
+        if riskPropensity == RiskPropensity.LOW_RISK:
+            return self.mediumAndLowRisk, 1
+        elif riskPropensity == RiskPropensity.MEDIUM_RISK:
+            return self.highAndMediumRisk, self.mediumAndLowRisk
+        elif riskPropensity == RiskPropensity.HIGH_RISK:
+            return self.extremeAndHighRisk, self.highAndMediumRisk
+        elif riskPropensity == RiskPropensity.EXTREME_RISK:
+            return 0, self.extremeAndHighRisk
+        raise ValueError(f"유효하지 않은 riskPropensity 값입니다: {riskPropensity}")
+
+
+@lru_cache(maxsize=None)
+def get_propensity_boundaries() -> PropensityBoundaries:
+    return PropensityBoundaries(extremeAndHighRisk=float(os.getenv('EXTREME_AND_HIGH_RISK_BOUNDARY')),
+                                highAndMediumRisk=float(os.getenv('HIGH_AND_MEDIUM_RISK_BOUNDARY')),
+                                mediumAndLowRisk=float(os.getenv('MEDIUM_AND_LOW_RISK_BOUNDARY')),
+                                earlyRepayment=int(os.getenv('EARLY_REPAYMENT_BOUNDARY')),
+                                maturityRepayment=int(os.getenv('MATURITY_REPAYMENT_BOUNDARY')))
+
+
+# 쉼표로 구분된 평가일별 조기상환 확률(%, monte_carlo_result.early_repayment_probability)에서 앞쪽 평가일들의 확률 합
+# (평가일별 행(monte_carlo_early_repayment)이 없는 결과의 조기상환 성향 판단에 사용)
+def sum_early_repayment_probability(earlyRepaymentProbability: Optional[str]) -> float:
+    probabilities = [float(item) for item in (earlyRepaymentProbability or "").split(",") if item.strip()]
+    return sum(probabilities[:EARLY_REPAYMENT_REDEMPTION_COUNT])
@@ -2,18 +2,38 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
+from core.metrics import InstrumentedAsyncAdaptedQueuePool, instrument_engine
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
+# 모든 SQL 문을 로그로 남길지 여부 (운영에서는 끄고 /metrics와 느린 쿼리 로그로 확인)
+DATABASE_ECHO = os.getenv('DATABASE_ECHO', 'false').lower() == 'true'
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
+    echo=DATABASE_ECHO,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
     pool_size=int(os.getenv('DATABASE_POOL_SIZE')),
     max_overflow=int(os.getenv('DATABASE_MAX_OVERFLOW'))
 )
+instrument_engine(engine.sync_engine)
 
+# 조회 전용 엔진 (읽기 복제본 주소가 있으면 복제본에 별도의 커넥션 풀로 연결하고, 없으면 기본 엔진을 같이 사용)
+DATABASE_READ_REPLICA_URL = os.getenv('DATABASE_READ_REPLICA_URL')
+if DATABASE_READ_REPLICA_URL:
+    read_engine = create_async_engine(
+        DATABASE_READ_REPLICA_URL,
+        echo=DATABASE_ECHO,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=int(os.getenv('DATABASE_READ_REPLICA_POOL_SIZE', os.getenv('DATABASE_POOL_SIZE'))),
+        max_overflow=int(os.getenv('DATABASE_READ_REPLICA_MAX_OVERFLOW', os.getenv('DATABASE_MAX_OVERFLOW')))
+    )
+    instrument_engine(read_engine.sync_engine, "replica")
+else:
+    read_engine = engine
+
+# 결과 저장 등 쓰기는 항상 기본 엔진 사용
 AsyncSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -21,4 +41,12 @@ AsyncSessionLocal = sessionmaker(
     class_=AsyncSession
 )
 
+# 조회 전용 세션 (커밋하지 않고 닫을 때 트랜잭션을 롤백함)
+ReadOnlySessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
+    class_=AsyncSession
+)
+
 Base = declarative_base()
\ No newline at end of file
@@ -0,0 +1,35 @@
+from typing import Optional
+from core.config import UVICORN_WORKERS
+from core.shared_cache import SHARED_CACHE_DIR, create_private_file
+import fcntl
+import os
+
+
+# 같은 호스트의 워커들 중 한 프로세스만 실행해야 하는 작업(마이그레이션, Eureka 등록, 종가 저장소 갱신, 일괄 계산)의 잠금
+# 공유 캐시 디렉터리의 잠금 파일에 flock을 걸며, 잠금을 가진 프로세스가 끝나면 운영체제가 잠금을 풀어서 다른 워커가 얻을 수 있음
+# 워커가 하나이면(enabled=False) 잠금 파일 없이 항상 잠금을 얻음
+class HostLock:
+    def __init__(self, name: str, directory: Optional[str] = None, enabled: bool = UVICORN_WORKERS > 1):
+        self.path = os.path.join(directory or SHARED_CACHE_DIR, f"{name}.lock")
+        self.enabled = enabled
+        self._fd: Optional[int] = None
+
+    # 잠금을 기다리지 않고 시도 (이미 가지고 있으면 True, 다른 프로세스가 가지고 있으면 False)
+    def try_acquire(self) -> bool:
+        if not self.enabled or self._fd is not None:
+            return True
+        create_private_file(self.path)
+        fd = os.open(self.path, os.O_RDWR | os.O_NOFOLLOW)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
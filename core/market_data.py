@@ -0,0 +1,299 @@
+from concurrent.futures import ThreadPoolExecutor
+from exception.errors import MarketDataTimeoutException
+from core.price_cache import price_cache, MISSING
+from core.price_store import price_store
+from core.metrics import observe_upstream, UPSTREAM_ERRORS, YFINANCE
+from util.market_session import exchange_today
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+import contextlib
+import functools
+import threading
+import weakref
+import asyncio
+import logging
+import os
+
+# pandas, yfinance는 import가 오래 걸리므로 시작 시간에 포함되지 않도록 시세 데이터가 처음 필요할 때 import
+if TYPE_CHECKING:
+    import pandas as pd
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# yfinance는 동기 HTTP 통신을 하므로 이벤트 루프를 막지 않도록 시세 조회 전용 스레드 풀에서 실행
+# 워커 수를 제한해서 느린 티커가 몰려도 AI, 몬테카를로 조회 등 다른 요청 처리에 영향을 주지 않도록 함
+MARKET_DATA_MAX_WORKERS = int(os.getenv('MARKET_DATA_MAX_WORKERS', 8))
+MARKET_DATA_TIMEOUT = float(os.getenv('MARKET_DATA_TIMEOUT', 10))
+# yf.download의 HTTP 요청별 제한 시간 (초, 응답이 없는 다운로드가 직렬화 lock을 계속 잡고 있지 않도록 함)
+MARKET_DATA_DOWNLOAD_TIMEOUT = float(os.getenv('MARKET_DATA_DOWNLOAD_TIMEOUT', MARKET_DATA_TIMEOUT))
+# 로컬 저장소에 종가를 이어서 저장하는 주기 (초)
+PRICE_STORE_REFRESH_INTERVAL = float(os.getenv('PRICE_STORE_REFRESH_INTERVAL', 3600))
+
+market_data_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_MAX_WORKERS,
+                                          thread_name_prefix="market-data")
+
+
+async def run_market_data_call(tickerSymbol: str, func, *args, timeout: Optional[float] = None, **kwargs):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(market_data_executor, functools.partial(func, *args, **kwargs))
+    try:
+        # 제한 시간 초과 또는 요청 취소 시 아직 실행되지 않은 작업은 스레드 풀 큐에서 함께 취소됨
+        return await asyncio.wait_for(future, timeout=timeout or MARKET_DATA_TIMEOUT)
+    except asyncio.TimeoutError:
+        UPSTREAM_ERRORS.labels(upstream=YFINANCE, error="timeout").inc()
+        raise MarketDataTimeoutException(tickerSymbol)
+
+
+def shutdown_market_data_executor():
+    market_data_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# yfinance 시세 조회
+class YFinanceMarketDataSource:
+    def __init__(self):
+        # yf.download는 호출할 때마다 모듈 전역 결과 저장소(yfinance.shared._DFS, _ERRORS)를 비우고 다시 채우므로
+        # 동시에 실행하면 다른 호출의 결과가 섞이거나 사라짐 → 한 번에 하나씩만 실행
+        # (여러 티커는 한 번의 호출 안에서 yfinance가 병렬로 내려받음)
+        self._download_lock = threading.Lock()
+
+    # 여러 기초자산의 [start, end) 기간 종가 조회 (index: 날짜, columns: 티커)
+    def download_closes(self, tickerSymbols: List[str], start: str, end: str) -> "pd.DataFrame":
+        import pandas as pd
+        import yfinance as yf
+
+        # 앞선 다운로드를 기다리다 조회 제한 시간이 지나면 (요청은 이미 504로 응답했으므로) 시세 조회 스레드를 비워줌
+        if not self._download_lock.acquire(timeout=MARKET_DATA_TIMEOUT):
+            raise MarketDataTimeoutException(",".join(tickerSymbols))
+        try:
+            with observe_upstream(YFINANCE):
+                data = yf.download(tickers=tickerSymbols, start=start, end=end, auto_adjust=True,
+                                   group_by="column", progress=False, timeout=MARKET_DATA_DOWNLOAD_TIMEOUT)
+        finally:
+            self._download_lock.release()
+
+        closes = data["Close"]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickerSymbols[0])
+        return closes
+
+
+# 시세 조회 소스 (테스트 등에서 set_market_data_source로 교체 가능)
+market_data_source = YFinanceMarketDataSource()
+
+
+def set_market_data_source(source):
+    global market_data_source
+    market_data_source = source
+
+
+# 여러 기초자산의 start 날짜부터 오늘까지의 종가를 한 번에 조회
+# (pandas, yfinance는 처음 조회할 때 시세 조회 스레드에서 import되므로 이벤트 루프를 막지 않음)
+async def fetch_close_frame(tickerSymbols: List[str], start: str) -> "pd.DataFrame":
+    end = _format_date(datetime.now().date() + timedelta(days=1))
+    return await run_market_data_call(",".join(tickerSymbols), market_data_source.download_closes,
+                                      tickerSymbols, start, end)
+
+
+# 일괄 조회한 종가 데이터에서 특정 날짜의 종가 조회 (해당 날짜의 종가 데이터가 없는 경우 None 반환)
+def close_on(closes: "pd.DataFrame", tickerSymbol: str, date: str) -> Optional[float]:
+    import pandas as pd
+
+    try:
+        close = closes.at[pd.Timestamp(date), tickerSymbol]
+    except KeyError:
+        return None
+    return None if pd.isna(close) else float(close)
+
+
+# 일괄 조회한 종가 데이터에서 가장 최근 종가 조회
+def recent_close(closes: "pd.DataFrame", tickerSymbol: str) -> Optional[float]:
+    if tickerSymbol not in closes.columns:
+        return None
+    close = closes[tickerSymbol].dropna()
+    return None if close.empty else float(close.iloc[-1])
+
+
+def _format_date(date) -> str:
+    return date.strftime("%Y-%m-%d")
+
+
+# 티커별 시작 날짜부터 오늘까지의 종가를 조회해서 로컬 저장소에 이어서 저장
+# 저장된 기간이 있는 티커는 마지막 저장 날짜 다음 날부터만 조회하며, 시작 날짜가 같은 티커끼리 묶어서 한 번에 조회함
+# (새로 조회하는 티커 때문에 이미 저장된 티커의 전체 기간을 다시 내려받지 않도록 함)
+async def backfill(startDates: Dict[str, str]) -> "pd.DataFrame":
+    fetchStartDates = await asyncio.to_thread(_fetch_start_dates, startDates)
+    tickerSymbolsByStart: Dict[str, List[str]] = {}
+    for tickerSymbol, startDate in sorted(fetchStartDates.items()):
+        tickerSymbolsByStart.setdefault(startDate, []).append(tickerSymbol)
+
+    frames = await asyncio.gather(*[fetch_close_frame(tickerSymbols, startDate)
+                                    for startDate, tickerSymbols in sorted(tickerSymbolsByStart.items())])
+    frame = frames[0] if len(frames) == 1 else _concat_close_frames(frames)
+    await asyncio.to_thread(_append_closes, frame, fetchStartDates)
+    return frame
+
+
+def _fetch_start_dates(startDates: Dict[str, str]) -> Dict[str, str]:
+    fetchStartDates = {}
+    for tickerSymbol, startDate in startDates.items():
+        coverage = price_store.coverage(tickerSymbol)
+        if coverage is not None and coverage[0] <= startDate:
+            startDate = _format_date(datetime.strptime(coverage[1], "%Y-%m-%d") + timedelta(days=1))
+        fetchStartDates[tickerSymbol] = startDate
+    return fetchStartDates
+
+
+# 시작 날짜별로 조회한 종가 데이터를 날짜 기준으로 합침
+def _concat_close_frames(frames: List["pd.DataFrame"]) -> "pd.DataFrame":
+    import pandas as pd
+
+    return pd.concat(frames, axis=1).sort_index()
+
+
+def _append_closes(frame: "pd.DataFrame", fetchStartDates: Dict[str, str]):
+    for tickerSymbol, start in fetchStartDates.items():
+        settledEnd = _format_date(exchange_today(tickerSymbol) - timedelta(days=1))
+        closes = {}
+        if tickerSymbol in frame.columns:
+            closes = {_format_date(index): float(close) for index, close in frame[tickerSymbol].dropna().items()}
+        # 조회에 실패한 티커는 저장된 기간을 넓히지 않음
+        if closes:
+            price_store.append(tickerSymbol, closes, start, settledEnd)
+
+
+# 저장된 모든 티커의 마지막 저장 날짜 이후의 종가를 이어서 저장
+async def refresh_price_store():
+    lastDates = await asyncio.to_thread(_last_stored_dates)
+    if lastDates:
+        await backfill(lastDates)
+
+
+def _last_stored_dates() -> Dict[str, str]:
+    return {tickerSymbol: price_store.coverage(tickerSymbol)[1] for tickerSymbol in price_store.tickers()}
+
+
+async def run_price_store_refresher(interval: float = PRICE_STORE_REFRESH_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_price_store()
+        except Exception:
+            logger.exception("기초자산 종가 저장소 갱신에 실패하였습니다.")
+
+
+# 현재 이벤트 루프의 티커별 저장소 보충 lock (동시에 실행되는 조회들이 같은 티커를 중복해서 내려받지 않도록 하고,
+# 느린 티커의 다운로드가 다른 티커의 조회를 막지 않도록 함, 기다리는 조회가 없는 lock은 자동으로 제거됨)
+_backfill_locks = weakref.WeakKeyDictionary()
+
+
+def _backfill_locks_for(tickerSymbols: Iterable[str]) -> List[asyncio.Lock]:
+    loop = asyncio.get_running_loop()
+    locks = _backfill_locks.get(loop)
+    if locks is None:
+        locks = _backfill_locks[loop] = weakref.WeakValueDictionary()
+    tickerLocks = []
+    # 여러 티커의 lock을 잡을 때 교착 상태가 생기지 않도록 항상 티커 순서로 잡음
+    for tickerSymbol in sorted(set(tickerSymbols)):
+        lock = locks.get(tickerSymbol)
+        if lock is None:
+            lock = locks[tickerSymbol] = asyncio.Lock()
+        tickerLocks.append(lock)
+    return tickerLocks
+
+
+# 캐시와 로컬 저장소에서 종가 조회 (찾지 못한 (티커, 날짜)와 최근 종가가 만료된 티커를 함께 반환)
+# 캐시에 없는 값만 저장소에서 조회하며, 저장소 조회는 블로킹이므로 스레드에서 실행
+async def _lookup_closes(closeKeys: Iterable[Tuple[str, str]], recentTickerSymbols: Iterable[str], closes: dict,
+                         recentCloses: dict):
+    uncachedCloseKeys: Set[Tuple[str, str]] = set()
+    for closeKey, close in (await price_cache.get_historical_many(set(closeKeys))).items():
+        if close is MISSING:
+            uncachedCloseKeys.add(closeKey)
+        else:
+            closes[closeKey] = close
+
+    missingCloseKeys: Set[Tuple[str, str]] = set()
+    if uncachedCloseKeys:
+        storedCloses = await asyncio.to_thread(_stored_closes, uncachedCloseKeys)
+        foundCloses = {closeKey: close for closeKey, close in storedCloses.items() if close is not MISSING}
+        missingCloseKeys = uncachedCloseKeys - set(foundCloses)
+        await price_cache.put_historical_many(foundCloses)
+        closes.update(foundCloses)
+
+    staleTickerSymbols: Set[str] = set()
+    for tickerSymbol, close in (await price_cache.get_recent_many(set(recentTickerSymbols))).items():
+        if close is None:
+            staleTickerSymbols.add(tickerSymbol)
+        else:
+            recentCloses[tickerSymbol] = close
+
+    return missingCloseKeys, staleTickerSymbols
+
+
+def _stored_closes(closeKeys: Iterable[Tuple[str, str]]) -> dict:
+    return {closeKey: price_store.get_close(*closeKey) for closeKey in closeKeys}
+
+
+def _last_stored_closes(tickerSymbols: Iterable[str]) -> Dict[str, Optional[float]]:
+    return {tickerSymbol: price_store.last_close(tickerSymbol) for tickerSymbol in tickerSymbols}
+
+
+# 캐시와 로컬 저장소를 거쳐 여러 (티커, 날짜)의 종가와 여러 티커의 최근 종가를 조회
+# 둘 다에 없는 값들은 필요한 티커들만 한 번에 조회해서 저장소에 이어서 저장하며, 종가를 가져오지 못한 값은 결과에서 제외됨
+async def get_closes(closeKeys: Iterable[Tuple[str, str]],
+                     recentTickerSymbols: Iterable[str]) -> Tuple[Dict[Tuple[str, str], Optional[float]], Dict[str, float]]:
+    closes, recentCloses = {}, {}
+    missingCloseKeys, staleTickerSymbols = await _lookup_closes(closeKeys, recentTickerSymbols, closes, recentCloses)
+    if not missingCloseKeys and not staleTickerSymbols:
+        return closes, recentCloses
+
+    async with contextlib.AsyncExitStack() as stack:
+        for lock in _backfill_locks_for([tickerSymbol for tickerSymbol, _ in missingCloseKeys] + list(staleTickerSymbols)):
+            await stack.enter_async_context(lock)
+
+        # lock을 기다리는 동안 다른 조회가 채워 넣은 값은 다시 내려받지 않음
+        missingCloseKeys, staleTickerSymbols = await _lookup_closes(missingCloseKeys, staleTickerSymbols, closes, recentCloses)
+        if not missingCloseKeys and not staleTickerSymbols:
+            return closes, recentCloses
+
+        # 최근 종가만 필요한 티커도 휴장일을 고려해 일주일 전부터 조회 (저장된 기간이 있으면 그 이후부터만 조회)
+        startDates = {tickerSymbol: _format_date(datetime.now().date() - timedelta(days=7))
+                      for tickerSymbol in staleTickerSymbols}
+        for tickerSymbol, date in missingCloseKeys:
+            startDates[tickerSymbol] = min(date, startDates.get(tickerSymbol, date))
+
+        frame = await backfill(startDates)
+
+        # 조회 결과에 없는 값은 저장소에서 조회 (이미 저장된 기간이라 조회 대상에서 빠졌거나 휴장일인 경우)
+        # lock을 기다리던 조회가 캐시에서 찾을 수 있도록 lock을 잡은 채로 캐시에 저장
+        fetchedCloses = {closeKey: close_on(frame, *closeKey) for closeKey in missingCloseKeys}
+        fetchedRecentCloses = {tickerSymbol: recent_close(frame, tickerSymbol) for tickerSymbol in startDates}
+        storedCloses, lastStoredCloses = await asyncio.to_thread(
+            lambda: (_stored_closes([closeKey for closeKey, close in fetchedCloses.items() if close is None]),
+                     _last_stored_closes([tickerSymbol for tickerSymbol, close in fetchedRecentCloses.items()
+                                          if close is None])))
+
+        foundCloses = {}
+        for closeKey, close in fetchedCloses.items():
+            if close is None:
+                close = storedCloses[closeKey]
+                if close is MISSING:
+                    continue
+            foundCloses[closeKey] = close
+        closes.update(foundCloses)
+        await price_cache.put_historical_many(foundCloses)
+
+        foundRecentCloses = {}
+        for tickerSymbol, close in fetchedRecentCloses.items():
+            if close is None:
+                close = lastStoredCloses[tickerSymbol]
+            if close is not None:
+                foundRecentCloses[tickerSymbol] = close
+                if tickerSymbol in staleTickerSymbols:
+                    recentCloses[tickerSymbol] = close
+        await price_cache.put_recent_many(foundRecentCloses)
+
+    return closes, recentCloses
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from core.shared_cache import create_private_directory
+import logging
+import asyncio
+import time
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 이 시간(초) 이상 걸린 SQL 문은 경고 로그로 남김 (engine echo 대신 느린 쿼리만 기록)
+DATABASE_SLOW_QUERY_THRESHOLD = float(os.getenv('DATABASE_SLOW_QUERY_THRESHOLD', 1.0))
+# 느린 쿼리 로그에 남기는 SQL 문의 최대 길이
+DATABASE_SLOW_QUERY_LOG_LENGTH = int(os.getenv('DATABASE_SLOW_QUERY_LOG_LENGTH', 1000))
+# 워커별 지표 파일 디렉터리 (워커가 여러 개이면 메인 프로세스가 워커를 시작하기 전에 지정하며,
+# 지정되어 있으면 /metrics는 요청을 받은 워커가 아니라 모든 워커의 지표를 합쳐서 응답)
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# 외부 호출 종류 (upstream 레이블 값)
+PRODUCT_SERVICE = "product-service"
+YFINANCE = "yfinance"
+
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "라우트별 요청 처리 시간",
+                                  ["method", "route", "status"])
+DB_STATEMENT_DURATION = Histogram("db_statement_duration_seconds", "SQL 문 종류별 실행 시간", ["operation"])
+# 커넥션 풀은 워커마다 따로 있으므로 워커가 여러 개이면 살아 있는 워커들의 값을 합침
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "커넥션 풀에서 사용 중인 커넥션 수", ["engine"],
+                            multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow_connections", "pool_size를 넘어서 만든 커넥션 수 (음수이면 아직 만들지 않은 기본 커넥션 수)",
+                         ["engine"], multiprocess_mode="livesum")
+DB_POOL_WAIT_DURATION = Histogram("db_pool_wait_seconds", "커넥션 풀에서 커넥션을 얻기까지 기다린 시간")
+UPSTREAM_REQUEST_DURATION = Histogram("upstream_request_duration_seconds", "외부 호출 시간", ["upstream"])
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "외부 호출 실패 수", ["upstream", "error"])
+
+SQL_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+# 커넥션을 얻기까지 기다린 시간을 기록하는 커넥션 풀 (create_async_engine의 poolclass로 사용)
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_DURATION.observe(time.perf_counter() - start)
+
+
+# 엔진의 SQL 문 실행 시간, 커넥션 풀 사용량 기록과 느린 쿼리 로그 설정 (비동기 엔진은 sync_engine을 전달)
+# 커넥션 풀 지표는 엔진 이름(name) 레이블로 구분
+def instrument_engine(engine, name: str = "primary"):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statementStarts", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statementStarts"].pop()
+        DB_STATEMENT_DURATION.labels(operation=statement_operation(statement)).observe(elapsed)
+        if elapsed >= DATABASE_SLOW_QUERY_THRESHOLD:
+            logger.warning("느린 쿼리 (%.3f초): %s", elapsed, statement[:DATABASE_SLOW_QUERY_LOG_LENGTH])
+
+    # 실행 중 예외가 난 SQL 문은 after_cursor_execute가 호출되지 않으므로 시작 시각만 제거
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exceptionContext):
+        connection = exceptionContext.connection
+        if connection is not None and connection.info.get("statementStarts"):
+            connection.info["statementStarts"].pop()
+
+    # checkin 이벤트는 커넥션이 풀에 반환되기 전에 호출되므로 사용 중인 커넥션 수는 이벤트마다 직접 증감
+    # 초과 커넥션 수는 수집할 때 풀에서 읽음
+    # 워커가 여러 개이면 수집하는 워커가 다른 워커의 풀을 읽을 수 없으므로, 커넥션을 체크아웃할 때마다 워커별 지표 파일에 기록
+    recordOverflow = PROMETHEUS_MULTIPROC_DIR is not None and hasattr(engine.pool, "overflow")
+
+    @event.listens_for(engine.pool, "checkout")
+    def checkout(dbapiConnection, connectionRecord, connectionProxy):
+        DB_POOL_CHECKED_OUT.labels(engine=name).inc()
+        if recordOverflow:
+            DB_POOL_OVERFLOW.labels(engine=name).set(engine.pool.overflow())
+
+    @event.listens_for(engine.pool, "checkin")
+    def checkin(dbapiConnection, connectionRecord):
+        DB_POOL_CHECKED_OUT.labels(engine=name).dec()
+
+    if hasattr(engine.pool, "overflow") and not recordOverflow:
+        DB_POOL_OVERFLOW.labels(engine=name).set_function(engine.pool.overflow)
+
+
+# SQL 문 종류 (레이블 값이 늘어나지 않도록 SELECT, INSERT, UPDATE, DELETE 외에는 OTHER)
+def statement_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+# 외부 호출 시간과 실패 수 기록
+@contextmanager
+def observe_upstream(upstream: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(upstream=upstream, error=type(e).__name__).inc()
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.labels(upstream=upstream).observe(time.perf_counter() - start)
+
+
+# 워커를 시작하기 전에 메인 프로세스에서 호출 - 워커들이 import 시점에 읽도록 워커별 지표 파일 디렉터리를 환경 변수로 지정하고,
+# 이전 실행에서 남은 지표 파일 삭제
+def prepare_multiprocess_metrics(directory: str):
+    create_private_directory(directory)
+    for fileName in os.listdir(directory):
+        if fileName.endswith(".db"):
+            os.remove(os.path.join(directory, fileName))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+
+# 워커 종료 시 호출 - 종료된 워커의 커넥션 풀 지표를 합계에서 제외
+def shutdown_metrics():
+    if PROMETHEUS_MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(os.getpid(), PROMETHEUS_MULTIPROC_DIR)
+
+
+# 모든 워커의 지표 파일을 합친 수집 결과 (지표 파일을 읽으므로 스레드에서 실행)
+def generate_multiprocess_latest(directory: str) -> bytes:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    return generate_latest(registry)
+
+
+def setup_metrics(app):
+
+    # 라우트 경로 템플릿(/v1/ai/{productId} 등)별 요청 처리 시간 기록 (매칭되는 라우트가 없는 요청은 unmatched)
+    @app.middleware("http")
+    async def record_request_duration(request: Request, call_next):
+        start = time.perf_counter()
+        statusCode = 500
+        try:
+            response = await call_next(request)
+            statusCode = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.labels(method=request.method,
+                                         route=getattr(route, "path", "unmatched"),
+                                         status=str(statusCode)).observe(time.perf_counter() - start)
+
+    # Prometheus 수집 엔드포인트
+    async def metrics(request: Request):
+        if PROMETHEUS_MULTIPROC_DIR is not None:
+            return Response(await asyncio.to_thread(generate_multiprocess_latest, PROMETHEUS_MULTIPROC_DIR),
+                            media_type=CONTENT_TYPE_LATEST)
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    app.add_route("/metrics", metrics, include_in_schema=False)
@@ -1,15 +1,52 @@
+from typing import Callable, Optional
+import asyncio
 import os
-from opentelemetry import trace
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.exporter.zipkin.json import ZipkinExporter
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.propagators.b3 import B3MultiFormat
-from opentelemetry.propagate import set_global_textmap
 
+# Zipkin 트레이싱 사용 여부 (끄면 OpenTelemetry 모듈을 import하지 않으므로 시작 시간이 줄어듦)
+OPENTELEMETRY_ENABLED = os.getenv('OPENTELEMETRY_ENABLED', 'true').lower() == 'true'
+
+# 앱을 OpenTelemetry ASGI 미들웨어로 감싸는 함수 (시작 단계에서 트레이싱 설정이 끝나면 지정)
+_tracedAppFactory: Optional[Callable] = None
+
+
+# 트레이싱 설정이 끝나기 전의 요청은 그대로 처리하고, 설정이 끝난 뒤의 요청부터 OpenTelemetry 미들웨어로 추적하는 미들웨어
+# (서버가 요청을 받기 시작한 뒤에는 미들웨어를 추가할 수 없으므로 앱 생성 시 미리 추가)
+class DeferredTracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.tracedApp = None
+
+    async def __call__(self, scope, receive, send):
+        if self.tracedApp is None and _tracedAppFactory is not None:
+            self.tracedApp = _tracedAppFactory(self.app)
+        await (self.tracedApp or self.app)(scope, receive, send)
+
+
+# 앱 생성 시 호출 - OpenTelemetry 모듈은 import하지 않고 미들웨어 자리만 추가
 def setup_opentelemetry(app):
+    if OPENTELEMETRY_ENABLED:
+        app.add_middleware(DeferredTracingMiddleware)
+
+
+# 서버가 뜬 뒤 백그라운드 시작 단계에서 호출 - OpenTelemetry 모듈 import와 설정은 이벤트 루프를 막지 않도록 스레드에서 실행
+async def start_opentelemetry():
+    global _tracedAppFactory
+    _tracedAppFactory = await asyncio.to_thread(_configure_tracing)
+
+
+def _configure_tracing() -> Callable:
+    from functools import partial
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
+    from opentelemetry.instrumentation.fastapi import _get_default_span_details
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.exporter.zipkin.json import ZipkinExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.propagators.b3 import B3MultiFormat
+    from opentelemetry.propagate import set_global_textmap
+    from opentelemetry.util.http import get_excluded_urls
 
     # OpenTelemetry 설정
     resource = Resource.create({"service.name": os.getenv("APPLICATION_NAME")})
@@ -23,11 +60,12 @@ def setup_opentelemetry(app):
     # Span Processor 추가
     trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(zipkin_exporter))
 
-    # FastAPI에 OpenTelemetry Instrumentation 추가
-    FastAPIInstrumentor.instrument_app(app)
-
     # Requests 모듈에 대한 Trace 설정 (외부 API 호출 시)
     RequestsInstrumentor().instrument()
 
     # B3 전파 방식 사용
-    set_global_textmap(B3MultiFormat())
\ No newline at end of file
+    set_global_textmap(B3MultiFormat())
+
+    # FastAPI Instrumentation과 같은 설정(span 이름, OTEL_PYTHON_FASTAPI_EXCLUDED_URLS)의 ASGI 미들웨어
+    return partial(OpenTelemetryMiddleware, excluded_urls=get_excluded_urls("FASTAPI"),
+                   default_span_details=_get_default_span_details)
@@ -0,0 +1,119 @@
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, Iterable, Optional, Tuple
+from core.shared_cache import create_cache_backend, MISSING
+from util.market_session import get_market_session, exchange_today
+import threading
+import os
+
+load_dotenv()
+
+PRICE_CACHE_MAX_SIZE = int(os.getenv('PRICE_CACHE_MAX_SIZE', 100000))
+PRICE_CACHE_INTRADAY_TTL = float(os.getenv('PRICE_CACHE_INTRADAY_TTL', 5))
+# 장 마감 직후에는 종가가 확정되기 전일 수 있으므로 일정 시간 동안은 장중과 같은 TTL 적용
+PRICE_CACHE_CLOSE_GRACE = float(os.getenv('PRICE_CACHE_CLOSE_GRACE', 900))
+
+
+# 기초자산 종가 캐시
+# - 과거 날짜의 종가는 변하지 않으므로 만료 없이 LRU 방식으로 메모리에 보관 (디스크 보관은 core.price_store에서 담당)
+# - 최근 가격은 기초자산이 속한 거래소의 장 운영 여부에 따라 장중에는 수 초, 장 마감 후에는 다음 장 시작 전까지 보관
+# - 캐시 저장소는 SHARED_CACHE_BACKEND 설정에 따라 워커마다 따로 두거나 같은 호스트의 워커들이 함께 사용
+#   (종가 데이터가 없는 날짜는 None으로 캐시되며, 캐시에 없으면 MISSING)
+class PriceCache:
+    def __init__(self, maxSize: int = PRICE_CACHE_MAX_SIZE):
+        self.maxSize = maxSize
+        self._historical = create_cache_backend("historicalClose", maxSize)
+        self._recent = create_cache_backend("recentClose", maxSize)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "historicalHits": 0,
+            "historicalMisses": 0,
+            "recentHits": 0,
+            "recentMisses": 0,
+        }
+
+    # 과거 종가 조회 (캐시에 없으면 MISSING 반환)
+    def get_historical(self, tickerSymbol: str, date: str):
+        close = self._historical.get((tickerSymbol, date))
+        with self._lock:
+            self._stats["historicalMisses" if close is MISSING else "historicalHits"] += 1
+        return close
+
+    # 과거 종가 저장 (아직 확정되지 않은 당일 이후의 종가는 저장하지 않음)
+    def put_historical(self, tickerSymbol: str, date: str, close: Optional[float]):
+        if not is_settled(tickerSymbol, date):
+            return
+        self._historical.put((tickerSymbol, date), close)
+
+    # 여러 (티커, 날짜)의 과거 종가 조회 (캐시에 없는 값은 MISSING, 이벤트 루프에서 사용)
+    async def get_historical_many(self, closeKeys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[float]]:
+        closes = await self._historical.get_many_async(closeKeys)
+        misses = sum(close is MISSING for close in closes.values())
+        with self._lock:
+            self._stats["historicalMisses"] += misses
+            self._stats["historicalHits"] += len(closes) - misses
+        return closes
+
+    async def put_historical_many(self, closes: Dict[Tuple[str, str], Optional[float]]):
+        await self._historical.put_many_async({key: close for key, close in closes.items() if is_settled(*key)})
+
+    # 최근 가격 조회 (만료되었거나 캐시에 없으면 None 반환)
+    def get_recent(self, tickerSymbol: str) -> Optional[float]:
+        close = self._recent.get(tickerSymbol)
+        with self._lock:
+            self._stats["recentMisses" if close is MISSING else "recentHits"] += 1
+        return None if close is MISSING else close
+
+    def put_recent(self, tickerSymbol: str, close: float):
+        self._recent.put(tickerSymbol, close, ttl=recent_ttl(tickerSymbol))
+
+    # 여러 티커의 최근 가격 조회 (만료되었거나 캐시에 없으면 None, 이벤트 루프에서 사용)
+    async def get_recent_many(self, tickerSymbols: Iterable[str]) -> Dict[str, Optional[float]]:
+        closes = await self._recent.get_many_async(tickerSymbols)
+        misses = sum(close is MISSING for close in closes.values())
+        with self._lock:
+            self._stats["recentMisses"] += misses
+            self._stats["recentHits"] += len(closes) - misses
+        return {tickerSymbol: None if close is MISSING else close for tickerSymbol, close in closes.items()}
+
+    # 최근 가격은 티커마다 TTL이 다르므로 티커별로 저장
+    async def put_recent_many(self, closes: Dict[str, float]):
+        for tickerSymbol, close in closes.items():
+            await self._recent.put_async(tickerSymbol, close, ttl=recent_ttl(tickerSymbol))
+
+    def stats(self) -> dict:
+        historicalStats = self._historical.stats()
+        with self._lock:
+            stats = dict(self._stats)
+        stats["evictions"] = historicalStats["evictions"]
+        stats["historicalSize"] = historicalStats["size"]
+        stats["recentSize"] = self._recent.stats()["size"]
+        lookups = stats["historicalHits"] + stats["historicalMisses"] \
+                  + stats["recentHits"] + stats["recentMisses"]
+        stats["memoryHitRatio"] = round((stats["historicalHits"] + stats["recentHits"]) / lookups, 4) if lookups else None
+        return stats
+
+    def clear(self):
+        self._historical.clear()
+        self._recent.clear()
+        with self._lock:
+            self._reset_stats()
+
+
+# 기초자산이 속한 거래소 기준으로 해당 날짜의 종가가 확정되었는지 여부
+def is_settled(tickerSymbol: str, date: str) -> bool:
+    return datetime.strptime(date, "%Y-%m-%d").date() < exchange_today(tickerSymbol)
+
+
+# 장중에는 짧은 TTL, 장 마감 후에는 다음 장 시작 시각까지를 TTL로 사용 (거래소를 알 수 없는 티커는 장중과 동일하게 처리)
+def recent_ttl(tickerSymbol: str, now: Optional[datetime] = None) -> float:
+    session = get_market_session(tickerSymbol)
+    if session is None or session.is_open(now) or session.since_close(now).total_seconds() < PRICE_CACHE_CLOSE_GRACE:
+        return PRICE_CACHE_INTRADAY_TTL
+    return max((session.next_open(now) - session.now(now)).total_seconds(), PRICE_CACHE_INTRADAY_TTL)
+
+
+price_cache = PriceCache()
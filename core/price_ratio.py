@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+# 상품 × 기초자산 가격 행렬
+# 기초자산 수가 상품마다 다르므로 기초자산이 없는 칸은 padding으로 표시하고, 종가를 가져오지 못한 칸은 nan으로 채움
+@dataclass
+class PriceMatrix:
+    productIds: List[int]
+    equities: List[List[str]]
+    initial: np.ndarray
+    recent: np.ndarray
+    padding: np.ndarray
+    issued: np.ndarray
+
+
+# 최초기준가격평가일이 지난 상품의 (기초자산 티커, 최초기준가격평가일) 목록
+# 최초기준가격평가일이 지나지 않은 상품은 종가 데이터를 가져올 수 없으므로 시세 조회 대상에서 제외
+def get_close_keys(productResult: dict) -> List[Tuple[str, str]]:
+    initialBasePriceEvaluationDate = productResult["initialBasePriceEvaluationDate"]
+    if not is_issued(productResult):
+        return []
+    return [(productResult["equityTickerSymbols"][equity], initialBasePriceEvaluationDate)
+            for equity in productResult["equities"].split(" / ")]
+
+
+def is_issued(productResult: dict) -> bool:
+    return datetime.strptime(productResult["initialBasePriceEvaluationDate"], "%Y-%m-%d").date() <= datetime.now().date()
+
+
+def build_price_matrix(productResults: List[dict],
+                       initialCloses: Dict[Tuple[str, str], Optional[float]],
+                       recentCloses: Dict[str, float]) -> PriceMatrix:
+    equities = [productResult["equities"].split(" / ") for productResult in productResults]
+    productCount = len(productResults)
+    equityCount = max((len(productEquities) for productEquities in equities), default=1)
+
+    initial = np.full((productCount, equityCount), np.nan)
+    recent = np.full((productCount, equityCount), np.nan)
+    padding = np.ones((productCount, equityCount), dtype=bool)
+    issued = np.zeros(productCount, dtype=bool)
+
+    # ISO 형식(YYYY-MM-DD) 날짜는 문자열 비교로 선후 관계를 판단할 수 있으므로 상품마다 날짜를 파싱하지 않음
+    today = datetime.now().strftime("%Y-%m-%d")
+    for row, (productResult, productEquities) in enumerate(zip(productResults, equities)):
+        padding[row, :len(productEquities)] = False
+        issued[row] = productResult["initialBasePriceEvaluationDate"] <= today
+        if not issued[row]:
+            continue
+        initialBasePriceEvaluationDate = productResult["initialBasePriceEvaluationDate"]
+        tickerSymbols = [productResult["equityTickerSymbols"][equity] for equity in productEquities]
+        initial[row, :len(tickerSymbols)] = [_or_nan(initialCloses.get((tickerSymbol, initialBasePriceEvaluationDate)))
+                                             for tickerSymbol in tickerSymbols]
+        recent[row, :len(tickerSymbols)] = [_or_nan(recentCloses.get(tickerSymbol)) for tickerSymbol in tickerSymbols]
+
+    return PriceMatrix(productIds=[productResult.get("id") for productResult in productResults],
+                       equities=equities,
+                       initial=initial,
+                       recent=recent,
+                       padding=padding,
+                       issued=issued)
+
+
+def _or_nan(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+# 모든 상품, 기초자산의 최초기준가격 대비 최근 기초자산가격 비율과 상품별 가장 낮은 비율을 한 번에 계산
+# - ratio: 상품 × 기초자산 비율 (padding 칸은 mask)
+# - recentAndInitialPriceRatio: 가장 낮은 비율 - 100 (발행되지 않았거나 종가를 가져오지 못한 기초자산이 있는 상품은 mask)
+def compute_price_ratios(matrix: PriceMatrix) -> Tuple[np.ma.MaskedArray, np.ma.MaskedArray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.round((matrix.recent / matrix.initial) * 100, 2)
+
+    missing = np.isnan(ratio) & ~matrix.padding
+    incomplete = missing.any(axis=1) | ~matrix.issued
+
+    ratio = np.ma.masked_array(ratio, mask=matrix.padding | missing)
+    worstRatio = ratio.min(axis=1)
+    recentAndInitialPriceRatio = np.ma.masked_array(np.round(worstRatio.filled(np.nan) - 100, 2),
+                                                    mask=incomplete | np.ma.getmaskarray(worstRatio))
+    return ratio, recentAndInitialPriceRatio
+
+
+# PriceRatio 응답 필드 순서
+PRICE_RATIO_FIELDS = ("id", "recentAndInitialPriceRatio")
+
+
+# 상품별 가장 낮은 비율을 PriceRatio 응답 형식으로 변환 (계산할 수 없는 상품은 None)
+def to_price_ratio_records(matrix: PriceMatrix, recentAndInitialPriceRatio: np.ma.MaskedArray) -> List[dict]:
+    return [dict(zip(PRICE_RATIO_FIELDS, row)) for row in to_price_ratio_rows(matrix, recentAndInitialPriceRatio)]
+
+
+# 상품별 (상품 id, 가장 낮은 비율) 행 (PRICE_RATIO_FIELDS 순서)
+def to_price_ratio_rows(matrix: PriceMatrix, recentAndInitialPriceRatio: np.ma.MaskedArray) -> List[Tuple[int, Optional[float]]]:
+    values = recentAndInitialPriceRatio.filled(np.nan).tolist()
+    masked = np.ma.getmaskarray(recentAndInitialPriceRatio).tolist()
+    return [(productId, None if isMasked else value)
+            for productId, value, isMasked in zip(matrix.productIds, values, masked)]
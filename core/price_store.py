@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, List, Optional, Tuple
+from core.price_cache import MISSING
+import threading
+import sqlite3
+import os
+
+load_dotenv()
+
+PRICE_STORE_PATH = os.getenv('PRICE_STORE_PATH', 'price_store.sqlite3')
+# 같은 호스트의 다른 워커가 저장하는 중이면 기다리는 최대 시간 (초)
+PRICE_STORE_BUSY_TIMEOUT = float(os.getenv('PRICE_STORE_BUSY_TIMEOUT', 30))
+
+
+# 기초자산 일별 종가 로컬 저장소
+# 티커별로 저장된 기간(coverage)을 함께 관리해서, 저장된 기간 안의 날짜는 yfinance 호출 없이 응답하고 (종가가 없으면 휴장일)
+# 저장된 기간 이후의 날짜만 이어서 저장함
+# 저장소 파일은 import 시점이 아니라 처음 사용할 때 생성 (sqlite3 호출은 블로킹이므로 이벤트 루프에서는 asyncio.to_thread로 호출)
+class PriceStore:
+    def __init__(self, path: str = PRICE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._reset_stats()
+
+    # 처음 사용할 때 저장소 연결 (self._lock을 잡은 상태에서 호출)
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=PRICE_STORE_BUSY_TIMEOUT, check_same_thread=False)
+            # 워커가 여러 개이면 같은 파일을 함께 사용하므로, 한 워커가 저장하는 동안에도 다른 워커가 읽을 수 있도록 WAL 모드 사용
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS daily_close ("
+                               "ticker_symbol TEXT NOT NULL, date TEXT NOT NULL, close REAL NOT NULL, "
+                               "PRIMARY KEY (ticker_symbol, date))")
+            connection.execute("CREATE TABLE IF NOT EXISTS ticker_coverage ("
+                               "ticker_symbol TEXT PRIMARY KEY, first_date TEXT NOT NULL, last_date TEXT NOT NULL)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _reset_stats(self):
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "appendedRows": 0,
+        }
+
+    # 티커의 저장된 기간 (first_date, last_date) 조회
+    def coverage(self, tickerSymbol: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._coverage(tickerSymbol)
+
+    def _coverage(self, tickerSymbol: str) -> Optional[Tuple[str, str]]:
+        row = self._connect().execute("SELECT first_date, last_date FROM ticker_coverage WHERE ticker_symbol = ?",
+                                      (tickerSymbol,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    # 특정 날짜의 종가 조회 (저장된 기간 밖이면 MISSING, 저장된 기간 안이지만 종가가 없으면 휴장일이므로 None 반환)
+    def get_close(self, tickerSymbol: str, date: str):
+        with self._lock:
+            coverage = self._coverage(tickerSymbol)
+            if coverage is None or not coverage[0] <= date <= coverage[1]:
+                self._stats["misses"] += 1
+                return MISSING
+            self._stats["hits"] += 1
+            row = self._connect().execute("SELECT close FROM daily_close WHERE ticker_symbol = ? AND date = ?",
+                                          (tickerSymbol, date)).fetchone()
+            return row[0] if row else None
+
+    # 가장 최근에 저장된 종가 조회
+    def last_close(self, tickerSymbol: str) -> Optional[float]:
+        with self._lock:
+            row = self._connect().execute("SELECT close FROM daily_close WHERE ticker_symbol = ? "
+                                          "ORDER BY date DESC LIMIT 1", (tickerSymbol,)).fetchone()
+            return row[0] if row else None
+
+    def history(self, tickerSymbol: str, start: Optional[str] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            return self._connect().execute("SELECT date, close FROM daily_close WHERE ticker_symbol = ? AND date >= ? "
+                                           "ORDER BY date", (tickerSymbol, start or "")).fetchall()
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT ticker_symbol FROM ticker_coverage")]
+
+    # [start, end] 기간의 종가 저장 (end는 종가가 확정된 마지막 날짜)
+    # 기존에 저장된 기간과 이어지는 경우에만 저장된 기간을 넓히고, 이어지지 않으면 더 최근 기간을 저장된 기간으로 사용
+    def append(self, tickerSymbol: str, closes: Dict[str, float], start: str, end: str):
+        if start > end:
+            return
+        rows = [(tickerSymbol, date, close) for date, close in closes.items() if start <= date <= end]
+        with self._lock:
+            connection = self._connect()
+            # 다른 워커가 같은 티커의 저장된 기간을 동시에 바꾸지 않도록 저장된 기간을 읽기 전에 쓰기 잠금을 잡음
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                coverage = self._coverage(tickerSymbol)
+                if coverage is not None and start <= _next_date(coverage[1]) and _next_date(end) >= coverage[0]:
+                    start, end = min(start, coverage[0]), max(end, coverage[1])
+                elif coverage is not None and end < coverage[1]:
+                    start, end = coverage
+
+                connection.executemany("INSERT OR REPLACE INTO daily_close (ticker_symbol, date, close) "
+                                       "VALUES (?, ?, ?)", rows)
+                connection.execute("INSERT OR REPLACE INTO ticker_coverage (ticker_symbol, first_date, last_date) "
+                                   "VALUES (?, ?, ?)", (tickerSymbol, start, end))
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            self._stats["appendedRows"] += len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tickers"] = 0 if self._connection is None else \
+                self._connection.execute("SELECT COUNT(*) FROM ticker_coverage").fetchone()[0]
+        return stats
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM daily_close")
+            connection.execute("DELETE FROM ticker_coverage")
+            connection.commit()
+            self._reset_stats()
+
+
+def _next_date(date: str) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+price_store = PriceStore()
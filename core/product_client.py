@@ -0,0 +1,95 @@
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+from exception.errors import ProductServiceServerException
+from core.single_flight import SingleFlight
+from core.shared_cache import create_cache_backend, MISSING
+from core.metrics import observe_upstream, PRODUCT_SERVICE
+import py_eureka_client.eureka_client as eureka_client
+import urllib.error
+import asyncio
+import json
+import os
+
+load_dotenv()
+
+PRODUCT_CACHE_MAX_SIZE = int(os.getenv('PRODUCT_CACHE_MAX_SIZE', 10000))
+PRODUCT_SERVICE_MAX_CONCURRENCY = int(os.getenv('PRODUCT_SERVICE_MAX_CONCURRENCY', 16))
+
+
+# product-service 상품 정보 조회 클라이언트
+# 최초기준가격평가일이 지난(발행된) 상품의 조건(initialBasePriceEvaluationDate, equities, equityTickerSymbols)은 변하지 않으므로
+# 상품 id 별로 메모리에 캐시하고, 캐시에 없는 상품을 동시에 여러 요청이 조회하면 product-service는 한 번만 호출함
+# (캐시 저장소는 SHARED_CACHE_BACKEND 설정에 따라 워커마다 따로 두거나 같은 호스트의 워커들이 함께 사용)
+class ProductClient:
+    def __init__(self, maxSize: int = PRODUCT_CACHE_MAX_SIZE, maxConcurrency: int = PRODUCT_SERVICE_MAX_CONCURRENCY):
+        self.maxSize = maxSize
+        self.maxConcurrency = maxConcurrency
+        self._cache = create_cache_backend("product", maxSize)
+        self._singleFlight = SingleFlight()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+        }
+
+    async def get_product(self, productId: int, requestId: Optional[str] = None) -> dict:
+        product = await self._cache.get_async(productId)
+        if product is not MISSING:
+            self._stats["hits"] += 1
+            return product
+
+        self._stats["misses"] += 1
+        return await self._singleFlight.do(productId, lambda: self._fetch_product(productId, requestId))
+
+    # 여러 상품 조회 (중복 id는 한 번만 조회하고, 캐시에 없는 상품만 동시 요청 수를 제한해서 조회)
+    # product-service에 여러 상품을 한 번에 조회하는 API가 없으므로 상품 단건 조회 API를 사용함
+    async def get_products(self, productIdList: List[int], requestId: Optional[str] = None) -> List[dict]:
+        semaphore = asyncio.Semaphore(self.maxConcurrency)
+
+        async def get_product(productId):
+            async with semaphore:
+                return await self.get_product(productId, requestId)
+
+        uniqueProductIdList = list(dict.fromkeys(productIdList))
+        results = await asyncio.gather(*[get_product(productId) for productId in uniqueProductIdList],
+                                       return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, ProductServiceServerException):
+                raise result
+        failedProductIdList = [productId for productId, result in zip(uniqueProductIdList, results)
+                               if isinstance(result, ProductServiceServerException)]
+        if failedProductIdList:
+            raise ProductServiceServerException(failedProductIdList)
+
+        products: Dict[int, dict] = dict(zip(uniqueProductIdList, results))
+        return [products[productId] for productId in productIdList]
+
+    async def _fetch_product(self, productId: int, requestId: Optional[str]) -> dict:
+        try:
+            headers = {"requestId": requestId}
+            with observe_upstream(PRODUCT_SERVICE):
+                responseProduct = await eureka_client.do_service_async("product-service", f"/v1/product/{productId}", headers=headers)
+            product = json.loads(responseProduct)
+        except urllib.error.URLError:
+            raise ProductServiceServerException(productId)
+
+        if datetime.strptime(product["initialBasePriceEvaluationDate"], "%Y-%m-%d").date() <= datetime.now().date():
+            await self._cache.put_async(productId, product)
+        return product
+
+    def stats(self) -> dict:
+        stats = {**self._stats, **self._cache.stats()}
+        stats["coalesced"] = self._singleFlight.stats()["coalesced"]
+        return stats
+
+    def clear(self):
+        self._cache.clear()
+        self._singleFlight.clear()
+        self._reset_stats()
+
+
+product_client = ProductClient()
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.config import PropensityBoundaries, get_propensity_boundaries, sum_early_repayment_probability, \
+    EARLY_REPAYMENT_REDEMPTION_COUNT, PRODUCT_ID_CHUNK_SIZE
+from core.database import ReadOnlySessionLocal
+from core.result_read_cache import result_read_cache, AI_RESULT, MONTE_CARLO_RESULT
+from util.repayment_option import RepaymentOption
+from util.risk_propensity import RiskPropensity
+from models import AIResult, MonteCarloResult, MonteCarloEarlyRepayment
+import numpy as np
+import asyncio
+import logging
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ai_result, monte_carlo_result의 변경 여부를 확인하는 주기 (초)
+PROPENSITY_INDEX_REFRESH_INTERVAL = float(os.getenv('PROPENSITY_INDEX_REFRESH_INTERVAL', 30))
+# 늦게 커밋된 트랜잭션의 행을 놓치지 않도록 마지막으로 확인한 수정 시각보다 이만큼 앞에서부터 다시 확인 (초)
+PROPENSITY_INDEX_WATERMARK_LAG = float(os.getenv('PROPENSITY_INDEX_WATERMARK_LAG', 60))
+
+REPAYMENT_OPTIONS = (RepaymentOption.EARLY_REPAYMENT, RepaymentOption.MATURITY_REPAYMENT)
+
+
+# 투자 성향 분류 색인
+# 상품 id마다 색인 위치를 정하고, 위험 성향(안전 점수 구간)과 상환 성향별로 상품 위치의 bool 배열(비트맵)을 유지함
+# 요청의 상품 id 위치에서 위험 성향 비트맵과 상환 성향 비트맵을 AND 해서 DB 조회 없이 조건을 만족하는 상품을 찾음
+# 상품의 결과 행이 여러 개이면 하나라도 조건을 만족할 때 해당 분류에 포함 (DB 조회 쿼리와 같은 기준)
+class PropensityIndex:
+    def __init__(self, boundaries: Optional[PropensityBoundaries] = None, capacity: int = 1024):
+        self._boundaries = boundaries
+        self._capacity = capacity
+        self._positions: Dict[int, int] = {}
+        self._riskBitmaps = {riskPropensity: np.zeros(capacity, dtype=bool) for riskPropensity in RiskPropensity}
+        self._repaymentBitmaps = {repaymentOption: np.zeros(capacity, dtype=bool) for repaymentOption in REPAYMENT_OPTIONS}
+        self._watermarks: Dict[str, Optional[datetime]] = {AI_RESULT: None, MONTE_CARLO_RESULT: None}
+        self.ready = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "queries": 0,
+            "refreshes": 0,
+            "updatedProducts": 0,
+        }
+
+    @property
+    def boundaries(self) -> PropensityBoundaries:
+        return self._boundaries or get_propensity_boundaries()
+
+    def _position(self, productId: int) -> int:
+        position = self._positions.get(productId)
+        if position is None:
+            position = len(self._positions)
+            self._positions[productId] = position
+            if position >= self._capacity:
+                self._grow()
+        return position
+
+    def _grow(self):
+        self._capacity *= 2
+        for bitmaps in (self._riskBitmaps, self._repaymentBitmaps):
+            for key, bitmap in bitmaps.items():
+                bitmaps[key] = np.concatenate([bitmap, np.zeros(self._capacity - len(bitmap), dtype=bool)])
+
+    # 상품별 안전 점수(상품의 모든 ai_result 행) 반영
+    def update_ai_results(self, safetyScores: Dict[int, Sequence[float]]):
+        for productId, scores in safetyScores.items():
+            position = self._position(productId)
+            for riskPropensity, bitmap in self._riskBitmaps.items():
+                minScore, maxScore = self.boundaries.safety_score_range(riskPropensity)
+                bitmap[position] = any(minScore <= score < maxScore for score in scores)
+        self._stats["updatedProducts"] += len(safetyScores)
+
+    # 상품별 손실 확률과 첫 두 평가일의 조기상환 확률 합(상품의 모든 monte_carlo_result 행) 반영
+    def update_monte_carlo_results(self, lossProbabilities: Dict[int, Sequence[float]],
+                                   earlyRepaymentProbabilities: Dict[int, Sequence[float]]):
+        for productId in set(lossProbabilities) | set(earlyRepaymentProbabilities):
+            position = self._position(productId)
+            self._repaymentBitmaps[RepaymentOption.EARLY_REPAYMENT][position] = \
+                any(probability >= self.boundaries.earlyRepayment for probability in earlyRepaymentProbabilities.get(productId, []))
+            self._repaymentBitmaps[RepaymentOption.MATURITY_REPAYMENT][position] = \
+                any(probability <= self.boundaries.maturityRepayment for probability in lossProbabilities.get(productId, []))
+        self._stats["updatedProducts"] += len(set(lossProbabilities) | set(earlyRepaymentProbabilities))
+
+    # 요청 상품 id 중 투자 성향을 만족하는 상품 id (요청 순서 유지)
+    def query(self, productIdList: List[int], riskPropensity: RiskPropensity, repaymentOption: RepaymentOption) -> List[int]:
+        self._stats["queries"] += 1
+        known = [productId for productId in productIdList if productId in self._positions]
+        if not known:
+            return []
+        positions = np.fromiter((self._positions[productId] for productId in known), dtype=np.int64, count=len(known))
+        mask = self._riskBitmaps[riskPropensity][positions]
+        if repaymentOption in self._repaymentBitmaps:
+            mask &= self._repaymentBitmaps[repaymentOption][positions]
+        return [productId for productId, satisfied in zip(known, mask) if satisfied]
+
+    # 마지막 확인 이후 수정된 결과가 있는 상품만 다시 읽어서 반영 (처음 호출하면 전체를 읽음)
+    # 다시 읽는 중에 실패하면 다음 갱신에서 같은 상품들을 다시 읽도록 모두 반영된 뒤에만 watermark를 옮김
+    # (ai_result가 수정된 상품 id, monte_carlo_result가 수정된 상품 id) 반환
+    async def refresh(self, session: AsyncSession) -> Tuple[List[int], List[int]]:
+        aiProductIds, aiWatermark = await _changed_product_ids(session, AIResult, self._watermarks[AI_RESULT])
+        monteCarloProductIds, monteCarloWatermark = \
+            await _changed_product_ids(session, MonteCarloResult, self._watermarks[MONTE_CARLO_RESULT])
+        await self.reload_products(session, aiProductIds, monteCarloProductIds)
+        self._watermarks = {AI_RESULT: aiWatermark, MONTE_CARLO_RESULT: monteCarloWatermark}
+        self._stats["refreshes"] += 1
+        self.ready = True
+        return aiProductIds, monteCarloProductIds
+
+    # 지정한 상품들의 결과를 DB에서 다시 읽어서 반영
+    async def reload_products(self, session: AsyncSession, aiProductIds: Iterable[int], monteCarloProductIds: Iterable[int]):
+        aiProductIds, monteCarloProductIds = list(aiProductIds), list(monteCarloProductIds)
+        for chunk in _chunks(aiProductIds):
+            result = await session.execute(select(AIResult.product_id, AIResult.safety_score)
+                                           .where(AIResult.product_id.in_(chunk)))
+            self.update_ai_results(_group(result.all(), chunk))
+
+        for chunk in _chunks(monteCarloProductIds):
+            result = await session.execute(select(MonteCarloResult.monte_carlo_result_id, MonteCarloResult.product_id,
+                                                  MonteCarloResult.loss_probability,
+                                                  MonteCarloResult.early_repayment_probability)
+                                           .where(MonteCarloResult.product_id.in_(chunk)))
+            monteCarloRows = result.all()
+            earlyResult = await session.execute(
+                select(MonteCarloEarlyRepayment.monte_carlo_result_id, func.sum(MonteCarloEarlyRepayment.probability))
+                .where(MonteCarloEarlyRepayment.product_id.in_(chunk),
+                       MonteCarloEarlyRepayment.redemption_index < EARLY_REPAYMENT_REDEMPTION_COUNT)
+                .group_by(MonteCarloEarlyRepayment.monte_carlo_result_id))
+            earlySums = dict(earlyResult.all())
+            # 평가일별 행이 없는 결과는 monte_carlo_result.early_repayment_probability 값으로 판단
+            earlyRows = [(productId, earlySums[monteCarloResultId] if monteCarloResultId in earlySums
+                          else sum_early_repayment_probability(earlyRepaymentProbability))
+                         for monteCarloResultId, productId, _, earlyRepaymentProbability in monteCarloRows]
+            self.update_monte_carlo_results(_group([(productId, loss) for _, productId, loss, _ in monteCarloRows], chunk),
+                                            _group(earlyRows, chunk))
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["ready"] = self.ready
+        stats["products"] = len(self._positions)
+        stats["watermarks"] = {table: watermark.isoformat() if watermark else None
+                               for table, watermark in self._watermarks.items()}
+        return stats
+
+    def clear(self):
+        self._positions.clear()
+        for bitmaps in (self._riskBitmaps, self._repaymentBitmaps):
+            for bitmap in bitmaps.values():
+                bitmap[:] = False
+        self._watermarks = {AI_RESULT: None, MONTE_CARLO_RESULT: None}
+        self.ready = False
+        self._reset_stats()
+
+
+# 수정 시각이 watermark(에서 PROPENSITY_INDEX_WATERMARK_LAG를 뺀 시각) 이후인 행의 상품 id와 새 watermark
+async def _changed_product_ids(session: AsyncSession, model, watermark: Optional[datetime]) -> Tuple[List[int], Optional[datetime]]:
+    query = select(model.product_id, func.max(model.last_modified_at)).group_by(model.product_id)
+    if watermark is not None:
+        query = query.where(model.last_modified_at >= watermark - timedelta(seconds=PROPENSITY_INDEX_WATERMARK_LAG))
+    rows = (await session.execute(query)).all()
+    lastModifiedAts = [lastModifiedAt for _, lastModifiedAt in rows if lastModifiedAt is not None]
+    return [productId for productId, _ in rows], max([watermark, *lastModifiedAts], key=lambda value: value or datetime.min)
+
+
+def _chunks(productIds: List[int]):
+    for start in range(0, len(productIds), PRODUCT_ID_CHUNK_SIZE):
+        yield productIds[start:start + PRODUCT_ID_CHUNK_SIZE]
+
+
+# (상품 id, 값) 행을 상품별 값 리스트로 묶음 (행이 없어진 상품은 빈 리스트)
+def _group(rows, productIds: List[int]) -> Dict[int, List[float]]:
+    grouped = {productId: [] for productId in productIds}
+    for productId, value in rows:
+        if value is not None:
+            grouped[productId].append(float(value))
+    return grouped
+
+
+propensity_index = PropensityIndex()
+
+
+# 시작할 때 전체 결과로 색인을 만든 뒤, 주기적으로 수정된 결과만 다시 읽어서 반영
+# 수정된 결과는 상품 단건 조회 캐시에서도 제거 (다른 서비스에서 쓴 ai_result 등)
+# 단건 조회와 같은 조회 전용 세션으로 확인하므로, 읽기 복제본이 늦게 반영한 결과도 복제본에 반영된 뒤에 캐시에서 제거됨
+async def run_propensity_index_refresher(interval: float = PROPENSITY_INDEX_REFRESH_INTERVAL):
+    while True:
+        try:
+            async with ReadOnlySessionLocal() as session:
+                aiProductIds, monteCarloProductIds = await propensity_index.refresh(session)
+            await result_read_cache.invalidate(AI_RESULT, aiProductIds)
+            await result_read_cache.invalidate(MONTE_CARLO_RESULT, monteCarloProductIds)
+        except Exception:
+            logger.exception("투자 성향 분류 색인 갱신에 실패하였습니다.")
+        await asyncio.sleep(interval)
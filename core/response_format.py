@@ -0,0 +1,57 @@
+from decimal import Decimal
+from fastapi import Response
+from typing import Any, Iterable, List, Optional, Sequence
+import msgpack
+import orjson
+
+# 여러 상품 조회 응답 형식 (Accept 헤더로 선택하며, 지정하지 않으면 응답 모델로 검증한 기본 JSON으로 응답)
+# - FAST_JSON_MEDIA_TYPE: 응답 모델 검증 없이 orjson으로 바로 직렬화한 JSON (본문은 기본 JSON 응답과 같음)
+# - MSGPACK_MEDIA_TYPE: 필드별 값 배열({필드: [값, ...]})을 msgpack으로 직렬화한 열(column) 형식 (서비스 간 호출용)
+FAST_JSON_MEDIA_TYPE = "application/vnd.elswhere.fast+json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+BULK_MEDIA_TYPES = (FAST_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE)
+
+# 라우트의 responses에 추가하는 응답 형식 문서
+bulk_media_type_response = {200: {"content": {FAST_JSON_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}}}
+
+
+# orjson, msgpack이 직접 직렬화하지 못하는 값 변환 (Numeric 컬럼의 Decimal은 응답 모델과 같이 float로 변환)
+def _encode_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"직렬화할 수 없는 값입니다: {type(value).__name__}")
+
+
+# Accept 헤더에서 먼저 나온 여러 상품 조회 응답 형식 (없으면 None, q 값은 고려하지 않음)
+def negotiate_bulk_media_type(accept: Optional[str]) -> Optional[str]:
+    for mediaRange in (accept or "").split(","):
+        mediaType = mediaRange.split(";", 1)[0].strip().lower()
+        if mediaType in BULK_MEDIA_TYPES:
+            return mediaType
+    return None
+
+
+# 행(필드 순서의 값 튜플) 리스트 응답
+# 기본 JSON은 필드 이름을 키로 하는 객체 리스트를 반환해서 라우트의 응답 모델로 검증하고, 그 외 형식은 Response로 바로 반환
+def bulk_response(accept: Optional[str], fields: Sequence[str], rows: Iterable[Sequence[Any]]):
+    mediaType = negotiate_bulk_media_type(accept)
+    rows = list(rows)
+    if mediaType == MSGPACK_MEDIA_TYPE:
+        columns = list(zip(*rows)) if rows else [() for _ in fields]
+        return Response(msgpack.packb({field: list(values) for field, values in zip(fields, columns)}, default=_encode_default),
+                        media_type=MSGPACK_MEDIA_TYPE)
+
+    records = [dict(zip(fields, row)) for row in rows]
+    if mediaType == FAST_JSON_MEDIA_TYPE:
+        return Response(orjson.dumps(records, default=_encode_default), media_type=FAST_JSON_MEDIA_TYPE)
+    return records
+
+
+# 값 리스트 응답 (기본 JSON과 orjson은 값 배열, msgpack은 {field: [값, ...]})
+def bulk_value_response(accept: Optional[str], field: str, values: List[Any]):
+    mediaType = negotiate_bulk_media_type(accept)
+    if mediaType == MSGPACK_MEDIA_TYPE:
+        return Response(msgpack.packb({field: values}, default=_encode_default), media_type=MSGPACK_MEDIA_TYPE)
+    if mediaType == FAST_JSON_MEDIA_TYPE:
+        return Response(orjson.dumps(values, default=_encode_default), media_type=FAST_JSON_MEDIA_TYPE)
+    return values
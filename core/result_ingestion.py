@@ -0,0 +1,98 @@
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Sequence, Tuple
+from sqlalchemy import Table, insert, delete, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.propensity_index import propensity_index
+from core.result_read_cache import result_read_cache, AI_RESULT, MONTE_CARLO_RESULT
+from models import AIResult, AIResultHistory, MonteCarloResult, MonteCarloResultHistory, MonteCarloEarlyRepayment
+import os
+
+load_dotenv()
+
+# 결과를 덮어쓰기 전의 값을 이력 테이블에 남길지 여부
+RESULT_HISTORY_ENABLED = os.getenv('RESULT_HISTORY_ENABLED', 'true').lower() == 'true'
+# 한 번의 INSERT ... ON DUPLICATE KEY UPDATE 문에 넣는 최대 행 수
+RESULT_UPSERT_CHUNK_SIZE = int(os.getenv('RESULT_UPSERT_CHUNK_SIZE', 1000))
+
+# 결과를 계산한 입력(입력 해시, 시장 데이터, 난수 시드) 컬럼
+# 계산 입력 없이 저장되는 결과(외부에서 저장한 결과 등)는 NULL로 덮어써서, 이전 입력으로 캐시가 적중하지 않도록 함
+MONTE_CARLO_CACHE_COLUMNS = ("input_hash", "terms_hash", "spot_ratios", "volatilities", "correlations", "seed")
+
+
+# AI 분석 결과 저장 (product_id 유일 키 기준으로 없으면 추가, 있으면 갱신)
+# rows: ai_result 컬럼 값 (product_id, repayment_prediction, safety_score)
+async def upsert_ai_results(session: AsyncSession, rows: Sequence[dict]) -> List[int]:
+    return await _upsert(session, AIResult.__table__, AIResultHistory.__table__, rows)
+
+
+# 몬테카를로 분석 결과 저장 (product_id 유일 키 기준으로 없으면 추가, 있으면 갱신하고 평가일별 조기상환 확률 행도 교체)
+# rows: monte_carlo_result 컬럼 값 (early_repayment_probability는 쉼표로 구분된 %, 계산 입력 컬럼이 없으면 NULL로 저장)
+async def upsert_monte_carlo_results(session: AsyncSession, rows: Sequence[dict]) -> List[int]:
+    rows = [{**dict.fromkeys(MONTE_CARLO_CACHE_COLUMNS), **row} for row in rows]
+    productIds = await _upsert(session, MonteCarloResult.__table__, MonteCarloResultHistory.__table__, rows)
+    probabilities = {row["product_id"]: [float(probability) for probability in row["early_repayment_probability"].split(",")
+                                         if probability.strip()]
+                     for row in rows}
+    for chunk in _chunks(productIds):
+        result = await session.execute(select(MonteCarloResult.product_id, MonteCarloResult.monte_carlo_result_id)
+                                       .where(MonteCarloResult.product_id.in_(chunk)))
+        await replace_early_repayments(session, {monteCarloResultId: (productId, probabilities[productId])
+                                                 for productId, monteCarloResultId in result.all()})
+    return productIds
+
+
+# 결과별 평가일별 조기상환 확률 행을 새 값으로 교체 (monte_carlo_result.early_repayment_probability와 같은 값)
+async def replace_early_repayments(session: AsyncSession, probabilities: Dict[int, Tuple[int, Sequence[float]]]):
+    if not probabilities:
+        return
+    await session.execute(delete(MonteCarloEarlyRepayment)
+                          .where(MonteCarloEarlyRepayment.monte_carlo_result_id.in_(list(probabilities))))
+    rows = [{"monte_carlo_result_id": monteCarloResultId, "product_id": productId,
+             "redemption_index": index, "probability": round(probability, 4)}
+            for monteCarloResultId, (productId, values) in probabilities.items()
+            for index, probability in enumerate(values)]
+    if rows:
+        await session.execute(insert(MonteCarloEarlyRepayment), rows)
+
+
+# 결과가 커밋된 후 결과에서 파생된 메모리 데이터 갱신 (상품 단건 조회 캐시 제거, 투자 성향 분류 색인 반영)
+async def refresh_derived_results(session: AsyncSession, aiProductIds: Iterable[int], monteCarloProductIds: Iterable[int]):
+    aiProductIds, monteCarloProductIds = list(aiProductIds), list(monteCarloProductIds)
+    await result_read_cache.invalidate(AI_RESULT, aiProductIds)
+    await result_read_cache.invalidate(MONTE_CARLO_RESULT, monteCarloProductIds)
+    await propensity_index.reload_products(session, aiProductIds, monteCarloProductIds)
+
+
+# 여러 행 INSERT ... ON DUPLICATE KEY UPDATE
+# 같은 상품 id가 여러 번 들어오면 마지막 행을 사용하고, 이력을 남기는 경우 덮어쓰기 전의 행을 이력 테이블에 먼저 복사
+async def _upsert(session: AsyncSession, table: Table, historyTable: Table, rows: Sequence[dict]) -> List[int]:
+    rowsByProductId = {row["product_id"]: row for row in rows}
+    if not rowsByProductId:
+        return []
+    columns = sorted({column for row in rowsByProductId.values() for column in row})
+    historyColumns = [column.name for column in historyTable.columns if column.name in table.columns]
+
+    productIds = list(rowsByProductId)
+    for chunk in _chunks(productIds):
+        if RESULT_HISTORY_ENABLED:
+            await session.execute(insert(historyTable).from_select(
+                historyColumns, select(*[table.c[column] for column in historyColumns]).where(table.c.product_id.in_(chunk))))
+        await session.execute(upsert_statement(table, [{column: rowsByProductId[productId].get(column) for column in columns}
+                                                       for productId in chunk]))
+    return productIds
+
+
+# product_id 유일 키가 겹치면 product_id를 제외한 컬럼과 수정 시각을 갱신하는 INSERT 문
+# (ON DUPLICATE KEY UPDATE에는 컬럼의 onupdate가 적용되지 않으므로 last_modified_at을 직접 갱신)
+def upsert_statement(table: Table, values: List[dict]):
+    statement = mysql_insert(table).values(values)
+    return statement.on_duplicate_key_update(
+        {**{column: statement.inserted[column] for column in values[0] if column != "product_id"},
+         "last_modified_at": func.now()})
+
+
+def _chunks(productIds: List[int]):
+    for start in range(0, len(productIds), RESULT_UPSERT_CHUNK_SIZE):
+        yield productIds[start:start + RESULT_UPSERT_CHUNK_SIZE]
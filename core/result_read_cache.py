@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+from core.single_flight import SingleFlight
+from core.shared_cache import create_cache_backend, MISSING
+import hashlib
+import os
+
+load_dotenv()
+
+RESULT_READ_CACHE_MAX_SIZE = int(os.getenv('RESULT_READ_CACHE_MAX_SIZE', 10000))
+
+# 캐시하는 결과 종류 (테이블)
+AI_RESULT = "ai"
+MONTE_CARLO_RESULT = "monteCarlo"
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    body: Any
+    etag: str
+
+
+# 공유 메모리 캐시에 저장할 값 (응답 모델은 필드 값 dict로 저장하고, 조회한 값은 dict로 응답해도 라우트의 응답 모델로 검증됨)
+def _encode_cached_result(cached: CachedResult) -> list:
+    return [cached.body.model_dump() if isinstance(cached.body, BaseModel) else cached.body, cached.etag]
+
+
+def _decode_cached_result(value: list) -> CachedResult:
+    body, etag = value
+    return CachedResult(body=body, etag=etag)
+
+
+# 응답 본문을 직렬화한 값의 해시로 만든 ETag
+# (last_modified_at은 초 단위라 같은 초에 다시 쓰인 행도 구분할 수 있도록 수정 시각 대신 본문 내용으로 만듦)
+def make_etag(body: BaseModel) -> str:
+    return f'"{hashlib.sha256(body.model_dump_json().encode()).hexdigest()[:32]}"'
+
+
+# If-None-Match 헤더에 ETag가 포함되어 있는지 확인 (약한 비교)
+def etag_matches(ifNoneMatch: Optional[str], etag: str) -> bool:
+    if not ifNoneMatch:
+        return False
+    candidates = [candidate.strip() for candidate in ifNoneMatch.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+
+# 상품 단건 AI, 몬테카를로 분석 결과 read-through 캐시
+# - 결과는 일괄 계산 때만 바뀌므로 (결과 종류, 상품 id) 별로 최대 RESULT_READ_CACHE_MAX_SIZE개까지 LRU 방식으로 보관
+# - 결과가 없는 상품은 캐시하지 않고, 캐시에 없는 상품을 동시에 여러 요청이 조회하면 DB는 한 번만 조회함
+# - 결과 행이 다시 쓰이면 invalidate로 제거 (이 서비스에서 쓴 결과는 저장 직후, 다른 서비스에서 쓴 결과는 투자 성향 분류 색인이
+#   수정된 행을 확인할 때 제거됨)
+# - 캐시 저장소는 SHARED_CACHE_BACKEND 설정에 따라 워커마다 따로 두거나 같은 호스트의 워커들이 함께 사용
+#   (함께 사용하면 한 워커에서 제거한 결과는 다른 워커에서도 제거됨)
+class ResultReadCache:
+    def __init__(self, maxSize: int = RESULT_READ_CACHE_MAX_SIZE):
+        self.maxSize = maxSize
+        self._cache = create_cache_backend("result", maxSize, encode=_encode_cached_result, decode=_decode_cached_result)
+        self._singleFlight = SingleFlight()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+        }
+
+    async def get(self, kind: str, productId: int,
+                  load: Callable[[], Awaitable[Optional[CachedResult]]]) -> Optional[CachedResult]:
+        key = (kind, productId)
+        cached = await self._cache.get_async(key)
+        if cached is not MISSING:
+            self._stats["hits"] += 1
+            return cached
+
+        self._stats["misses"] += 1
+        return await self._singleFlight.do(key, lambda: self._load(key, load))
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Optional[CachedResult]]]) -> Optional[CachedResult]:
+        cached = await load()
+        if cached is not None:
+            await self._cache.put_async(key, cached)
+        return cached
+
+    def put(self, kind: str, productId: int, cached: CachedResult):
+        self._cache.put((kind, productId), cached)
+
+    async def invalidate(self, kind: str, productIds: Iterable[int]):
+        self._stats["invalidations"] += await self._cache.delete_many_async([(kind, productId) for productId in productIds])
+
+    def stats(self) -> dict:
+        stats = {**self._stats, **self._cache.stats()}
+        stats["coalesced"] = self._singleFlight.stats()["coalesced"]
+        return stats
+
+    def clear(self):
+        self._cache.clear()
+        self._singleFlight.clear()
+        self._reset_stats()
+
+
+result_read_cache = ResultReadCache()
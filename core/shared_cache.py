@@ -0,0 +1,338 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+from core.config import UVICORN_WORKERS
+import threading
+import logging
+import asyncio
+import sqlite3
+import msgpack
+import json
+import time
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 캐시 저장소 종류
+# - local: 프로세스 메모리 (워커마다 따로 캐시)
+# - shm: 같은 호스트의 모든 워커가 함께 사용하는 공유 메모리(/dev/shm)의 SQLite 파일
+LOCAL = "local"
+SHARED_MEMORY = "shm"
+
+# 워커가 여러 개이면 기본으로 공유 메모리 캐시 사용
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', SHARED_MEMORY if UVICORN_WORKERS > 1 else LOCAL)
+# 저장 형식(테이블, 값 인코딩)을 바꾸면 올려서, 이전 버전의 서비스가 만든 파일을 읽지 않도록 함 (파일 이름에 포함)
+SHARED_CACHE_FORMAT_VERSION = 2
+# 서비스 사용자만 접근할 수 있는(0700) 디렉터리 (다른 사용자가 만들었거나 권한이 열려 있으면 공유 캐시를 사용하지 않음)
+SHARED_CACHE_DIR = os.getenv('SHARED_CACHE_DIR', f'/dev/shm/analysis-service-{os.getuid()}')
+SHARED_CACHE_PATH = os.path.join(SHARED_CACHE_DIR, f'cache-v{SHARED_CACHE_FORMAT_VERSION}.sqlite3')
+# 다른 워커가 쓰는 중이면 기다리는 최대 시간 (초, 스레드에서 기다리며 시간이 지나면 캐시에 없는 것으로 처리)
+SHARED_CACHE_BUSY_TIMEOUT = float(os.getenv('SHARED_CACHE_BUSY_TIMEOUT', 1))
+# 조회할 때마다 최근 사용 시각을 쓰면 워커 간 쓰기 경합이 생기므로 이 시간(초)이 지난 항목만 갱신 (근사 LRU)
+SHARED_CACHE_TOUCH_INTERVAL = float(os.getenv('SHARED_CACHE_TOUCH_INTERVAL', 1))
+# 이 개수만큼 저장할 때마다 최대 크기를 넘은 항목을 제거 (워커당 최대 크기를 이만큼 넘을 수 있음)
+SHARED_CACHE_EVICTION_INTERVAL = int(os.getenv('SHARED_CACHE_EVICTION_INTERVAL', 100))
+# 여러 키를 조회할 때 한 번의 쿼리에 넣는 최대 키 수 (SQLite 바인드 변수 수 제한)
+SHARED_CACHE_QUERY_CHUNK_SIZE = 500
+
+# 캐시에 값이 없음을 나타내는 값 (None도 캐시할 수 있는 값으로 사용)
+MISSING = object()
+
+
+# 캐시 저장소 공통 비동기 호출
+# 이벤트 루프에서는 *_async 메서드를 사용하며, 파일 I/O나 다른 워커의 잠금 대기로 블로킹될 수 있는 저장소(blocking)는 스레드에서 실행
+class CacheBackend:
+    blocking = False
+
+    async def _call(self, func: Callable, *args):
+        if self.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get_async(self, key: Hashable):
+        return await self._call(self.get, key)
+
+    async def get_many_async(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        return await self._call(self.get_many, list(keys))
+
+    async def put_async(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        await self._call(self.put_many, {key: value}, ttl)
+
+    async def put_many_async(self, values: Dict[Hashable, Any], ttl: Optional[float] = None):
+        await self._call(self.put_many, values, ttl)
+
+    async def delete_many_async(self, keys: Iterable[Hashable]) -> int:
+        return await self._call(self.delete_many, list(keys))
+
+    async def items_async(self) -> Dict[Hashable, Any]:
+        return await self._call(self.items)
+
+
+# 프로세스 메모리 LRU 캐시 (항목별 TTL 지원)
+class LocalCacheBackend(CacheBackend):
+    def __init__(self, namespace: str, maxSize: int):
+        self.namespace = namespace
+        self.maxSize = maxSize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    # 여러 키 조회 (캐시에 없는 키는 MISSING)
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        return {key: self.get(key) for key in keys}
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.put_many({key: value}, ttl)
+
+    def put_many(self, values: Dict[Hashable, Any], ttl: Optional[float] = None):
+        expiresAt = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (value, expiresAt)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys: Iterable[Hashable]) -> int:
+        with self._lock:
+            return sum(self._entries.pop(key, MISSING) is not MISSING for key in keys)
+
+    # 저장된 모든 항목 (TTL이 지난 항목 제외, 최근 사용 순서는 바꾸지 않음)
+    def items(self) -> Dict[Hashable, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {key: value for key, (value, expiresAt) in self._entries.items() if expiresAt is None or expiresAt > now}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "evictions": self._evictions}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._evictions = 0
+
+
+# 같은 호스트의 워커들이 함께 사용하는 LRU 캐시
+# 메모리 파일 시스템(/dev/shm)에 둔 SQLite 파일을 WAL 모드와 mmap으로 열어서 사용하며, 저장과 제거는 트랜잭션으로 원자적으로 처리
+# 값은 encode로 msgpack이 직렬화할 수 있는 값(dict, list, str, 숫자, None)으로 바꿔서 저장하고 decode로 되돌리며,
+# 키는 JSON 문자열로 저장 (튜플 키는 리스트로 바뀌어도 같은 문자열이 됨)
+# 저장소나 값에 문제가 생기면(잠금 대기 시간 초과, 권한, 손상된 값 등) 요청 처리에 영향을 주지 않도록 캐시에 없는 것으로 처리함
+class SharedMemoryCacheBackend(CacheBackend):
+    blocking = True
+
+    def __init__(self, namespace: str, maxSize: int, path: Optional[str] = None,
+                 encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None,
+                 touchInterval: float = SHARED_CACHE_TOUCH_INTERVAL, evictionInterval: int = SHARED_CACHE_EVICTION_INTERVAL,
+                 busyTimeout: float = SHARED_CACHE_BUSY_TIMEOUT):
+        self.namespace = namespace
+        self.maxSize = maxSize
+        self.path = path or SHARED_CACHE_PATH
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+        self.touchInterval = touchInterval
+        self.evictionInterval = evictionInterval
+        self.busyTimeout = busyTimeout
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._putsSinceEviction = 0
+        self._evictions = 0
+
+    # 프로세스마다 커넥션을 따로 연결 (fork된 워커는 부모의 커넥션을 사용하지 않음)
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            create_private_file(self.path)
+            connection = sqlite3.connect(self.path, timeout=self.busyTimeout, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # 메모리 파일 시스템이므로 디스크 동기화는 하지 않음
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("PRAGMA mmap_size=268435456")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache_entry ("
+                               "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL, "
+                               "accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at ON cache_entry (namespace, accessed_at)")
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key: Hashable):
+        return self.get_many([key])[key]
+
+    # 여러 키 조회 (캐시에 없거나 읽지 못한 키는 MISSING)
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        encodedKeys = {json.dumps(key): key for key in keys}
+        values = dict.fromkeys(encodedKeys.values(), MISSING)
+        if not encodedKeys:
+            return values
+        try:
+            with self._lock:
+                connection = self._connect()
+                rows = []
+                keyList = list(encodedKeys)
+                for start in range(0, len(keyList), SHARED_CACHE_QUERY_CHUNK_SIZE):
+                    chunk = keyList[start:start + SHARED_CACHE_QUERY_CHUNK_SIZE]
+                    rows += connection.execute(f"SELECT key, value, expires_at, accessed_at FROM cache_entry "
+                                               f"WHERE namespace = ? AND key IN ({', '.join('?' * len(chunk))})",
+                                               (self.namespace, *chunk)).fetchall()
+                now = time.time()
+                expiredKeys = [encodedKey for encodedKey, _, expiresAt, _ in rows if expiresAt is not None and expiresAt <= now]
+                touchKeys = [encodedKey for encodedKey, _, expiresAt, accessedAt in rows
+                             if (expiresAt is None or expiresAt > now) and now - accessedAt >= self.touchInterval]
+                if expiredKeys:
+                    connection.executemany("DELETE FROM cache_entry WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                                           [(self.namespace, encodedKey, now) for encodedKey in expiredKeys])
+                if touchKeys:
+                    connection.executemany("UPDATE cache_entry SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                                           [(now, self.namespace, encodedKey) for encodedKey in touchKeys])
+        except Exception:
+            logger.warning("공유 캐시(%s) 조회에 실패하였습니다.", self.namespace, exc_info=True)
+            return values
+
+        for encodedKey, value, expiresAt, _ in rows:
+            if expiresAt is not None and expiresAt <= now:
+                continue
+            try:
+                values[encodedKeys[encodedKey]] = self.decode(msgpack.unpackb(value))
+            except Exception:
+                logger.warning("공유 캐시(%s)의 값을 읽지 못했습니다: %s", self.namespace, encodedKey, exc_info=True)
+        return values
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.put_many({key: value}, ttl)
+
+    def put_many(self, values: Dict[Hashable, Any], ttl: Optional[float] = None):
+        if not values:
+            return
+        now = time.time()
+        expiresAt = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                # 잠금을 얻은 뒤에 인코딩해서, 같은 객체를 여러 스레드에서 저장하면 마지막에 저장한 스레드가 최신 상태를 저장함
+                rows = [(self.namespace, json.dumps(key), msgpack.packb(self.encode(value)), expiresAt, now)
+                        for key, value in values.items()]
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany("INSERT OR REPLACE INTO cache_entry "
+                                           "(namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)", rows)
+                    self._putsSinceEviction += len(rows)
+                    if self._putsSinceEviction >= self.evictionInterval:
+                        self._evict(connection, now)
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+        except Exception:
+            logger.warning("공유 캐시(%s) 저장에 실패하였습니다.", self.namespace, exc_info=True)
+
+    # 만료된 항목과, 최대 크기를 넘은 만큼 가장 오래전에 사용한 항목 제거
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute("DELETE FROM cache_entry WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        cursor = connection.execute("DELETE FROM cache_entry WHERE namespace = ? AND key IN ("
+                                    "SELECT key FROM cache_entry WHERE namespace = ? "
+                                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                                    (self.namespace, self.namespace, self.maxSize))
+        self._evictions += cursor.rowcount
+        self._putsSinceEviction = 0
+
+    def delete(self, key: Hashable) -> bool:
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys: Iterable[Hashable]) -> int:
+        rows = [(self.namespace, json.dumps(key)) for key in keys]
+        if not rows:
+            return 0
+        try:
+            with self._lock:
+                connection = self._connect()
+                before = connection.total_changes
+                connection.executemany("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", rows)
+                return connection.total_changes - before
+        except Exception:
+            logger.warning("공유 캐시(%s) 삭제에 실패하였습니다.", self.namespace, exc_info=True)
+            return 0
+
+    # 저장된 모든 항목 (만료된 항목과 읽지 못한 값 제외, 최근 사용 시각은 갱신하지 않음, JSON 배열 키는 튜플로 되돌림)
+    def items(self) -> Dict[Hashable, Any]:
+        try:
+            with self._lock:
+                rows = self._connect().execute("SELECT key, value FROM cache_entry WHERE namespace = ? "
+                                               "AND (expires_at IS NULL OR expires_at > ?)",
+                                               (self.namespace, time.time())).fetchall()
+        except Exception:
+            logger.warning("공유 캐시(%s) 조회에 실패하였습니다.", self.namespace, exc_info=True)
+            return {}
+
+        values = {}
+        for encodedKey, value in rows:
+            try:
+                key = json.loads(encodedKey)
+                values[tuple(key) if isinstance(key, list) else key] = self.decode(msgpack.unpackb(value))
+            except Exception:
+                logger.warning("공유 캐시(%s)의 값을 읽지 못했습니다: %s", self.namespace, encodedKey, exc_info=True)
+        return values
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                size = self._connect().execute("SELECT COUNT(*) FROM cache_entry WHERE namespace = ?",
+                                               (self.namespace,)).fetchone()[0]
+        except Exception:
+            logger.warning("공유 캐시(%s) 상태 조회에 실패하였습니다.", self.namespace, exc_info=True)
+            size = None
+        return {"size": size, "evictions": self._evictions}
+
+    # 모든 워커가 함께 사용하는 항목도 지워짐
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM cache_entry WHERE namespace = ?", (self.namespace,))
+            self._putsSinceEviction = 0
+            self._evictions = 0
+
+
+# 서비스 사용자만 접근할 수 있는 디렉터리 생성 (0700, 다른 사용자 소유이거나 다른 사용자에게 권한이 열려 있으면 사용하지 않음)
+# 공유 캐시 파일, 워커 간 잠금 파일, 워커별 지표 파일을 두는 디렉터리에 사용
+def create_private_directory(directory: str):
+    # 없는 상위 디렉터리도 0700으로 만듦 (os.makedirs의 mode는 마지막 디렉터리에만 적용됨)
+    parent = os.path.dirname(os.path.abspath(directory))
+    if not os.path.exists(parent):
+        create_private_directory(parent)
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077 or os.path.islink(directory):
+        raise PermissionError(f"공유 디렉터리는 서비스 사용자만 접근할 수 있어야 합니다: {directory}")
+
+
+# 서비스 사용자만 읽고 쓸 수 있는 파일 생성 (디렉터리 0700, 파일 0600, SQLite의 -wal, -shm 파일은 같은 권한으로 생성됨)
+def create_private_file(path: str):
+    create_private_directory(os.path.dirname(os.path.abspath(path)))
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600))
+
+
+# SHARED_CACHE_BACKEND 설정에 따른 캐시 저장소 (namespace로 같은 저장소 안의 캐시를 구분)
+# encode, decode: 공유 메모리 캐시에 msgpack으로 직렬화할 수 없는 값을 저장할 때 사용하는 변환 함수
+def create_cache_backend(namespace: str, maxSize: int, encode: Optional[Callable[[Any], Any]] = None,
+                         decode: Optional[Callable[[Any], Any]] = None) -> CacheBackend:
+    if SHARED_CACHE_BACKEND == SHARED_MEMORY:
+        return SharedMemoryCacheBackend(namespace, maxSize, encode=encode, decode=decode)
+    return LocalCacheBackend(namespace, maxSize)
@@ -0,0 +1,43 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+# 같은 키에 대해 동시에 들어온 요청들이 하나의 실행 결과를 함께 기다리도록 하는 single-flight
+# 먼저 들어온 요청이 취소되더라도 실행은 계속되어 함께 기다리던 요청들이 결과를 받을 수 있음
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "calls": 0,
+            "coalesced": 0,
+        }
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            self._stats["calls"] += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # 기다리던 요청이 모두 취소된 경우에도 예외가 처리되지 않았다는 경고가 남지 않도록 예외를 확인
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["inFlight"] = len(self._calls)
+        return stats
+
+    def clear(self):
+        self._calls.clear()
+        self._reset_stats()
@@ -0,0 +1,73 @@
+from dotenv import load_dotenv
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+import logging
+import time
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 시작 단계가 실패했을 때 다시 시도하기까지 기다리는 시간 (초)
+STARTUP_RETRY_INTERVAL = float(os.getenv('STARTUP_RETRY_INTERVAL', 5))
+
+# 시작 단계 상태
+PENDING = "PENDING"
+READY = "READY"
+FAILED = "FAILED"
+
+
+# 서비스 준비 상태 (readiness)
+# 요청 처리를 막지 않도록 서버가 뜬 뒤 백그라운드에서 실행하는 시작 단계(DB 스키마 준비, Eureka 등록 등)가
+# 모두 끝나야 준비된 것으로 봄 (서버가 떠 있는지(liveness)와는 별개)
+class Readiness:
+    def __init__(self):
+        self._steps: Dict[str, dict] = {}
+        self._startedAt: Optional[float] = None
+
+    def start(self, steps: Iterable[str]):
+        self._startedAt = time.monotonic()
+        self._steps = {step: {"status": PENDING, "attempts": 0, "error": None, "seconds": None} for step in steps}
+
+    def record_attempt(self, step: str):
+        self._steps[step]["attempts"] += 1
+
+    def mark_ready(self, step: str):
+        self._steps[step].update(status=READY, error=None, seconds=round(time.monotonic() - self._startedAt, 3))
+
+    def mark_failed(self, step: str, error: Exception):
+        self._steps[step].update(status=FAILED, error=f"{type(error).__name__}: {error}")
+
+    def is_ready(self, step: Optional[str] = None) -> bool:
+        if step is not None:
+            return step in self._steps and self._steps[step]["status"] == READY
+        return self._startedAt is not None and all(state["status"] == READY for state in self._steps.values())
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "steps": {step: dict(state) for step, state in self._steps.items()}
+        }
+
+    def clear(self):
+        self._steps = {}
+        self._startedAt = None
+
+
+readiness = Readiness()
+
+
+# 시작 단계를 성공할 때까지 STARTUP_RETRY_INTERVAL마다 다시 실행
+async def run_startup_step(step: str, func: Callable[[], Awaitable], retryInterval: Optional[float] = None):
+    while True:
+        readiness.record_attempt(step)
+        try:
+            await func()
+        except Exception as e:
+            readiness.mark_failed(step, e)
+            logger.exception("시작 단계(%s)에 실패하였습니다. 잠시 후 다시 시도합니다.", step)
+            await asyncio.sleep(STARTUP_RETRY_INTERVAL if retryInterval is None else retryInterval)
+        else:
+            readiness.mark_ready(step)
+            return
@@ -1,8 +1,14 @@
-from core.database import AsyncSessionLocal
-from contextlib import asynccontextmanager
+from core.database import AsyncSessionLocal, ReadOnlySessionLocal
 
-@asynccontextmanager
+
+# 쓰기용 세션 (기본 엔진, 요청 처리가 끝나면 커밋)
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
-        await session.commit()
\ No newline at end of file
+        await session.commit()
+
+
+# 조회 전용 세션 (읽기 복제본이 설정되어 있으면 복제본 사용, 커밋하지 않음)
+async def get_read_db():
+    async with ReadOnlySessionLocal() as session:
+        yield session
\ No newline at end of file
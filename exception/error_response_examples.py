@@ -37,6 +37,24 @@ validate_initial_price_exception_response = {
     }
 }
 
+market_data_timeout_exception_response = {
+    504: {
+        "description": "기초자산 시세 데이터 조회 시간이 초과되었습니다.",
+        "content": {
+            "application/json": {
+                "example": {
+                    "timestamp": str(datetime.now()),
+                    "trackingId": str(uuid.uuid4()),
+                    "status_code": 504,
+                    "status": "GATEWAY_TIMEOUT",
+                    "code": "MarketDataTimeoutException",
+                    "message": "기초자산 시세 데이터 조회 시간이 초과되었습니다."
+                }
+            }
+        }
+    }
+}
+
 monte_carlo_result_exception_response = {
     404: {
         "description": "해당 상품에 대한 몬테카를로 분석 결과를 찾을 수 없습니다.",
@@ -72,3 +90,21 @@ ai_result_exception_response = {
         }
     }
 }
+
+monte_carlo_batch_job_exception_response = {
+    404: {
+        "description": "해당 몬테카를로 일괄 계산 작업을 찾을 수 없습니다.",
+        "content": {
+            "application/json": {
+                "example": {
+                    "timestamp": str(datetime.now()),
+                    "trackingId": str(uuid.uuid4()),
+                    "status_code": 404,
+                    "status": "NOT_FOUND",
+                    "code": "MonteCarloBatchJobException",
+                    "message": "해당 몬테카를로 일괄 계산 작업을 찾을 수 없습니다."
+                }
+            }
+        }
+    }
+}
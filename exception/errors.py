@@ -21,4 +21,12 @@ class MonteCarloResultException(Exception):
 
 class AIResultException(Exception):
     def __init__(self, productId: int):
-        self.productId = productId
\ No newline at end of file
+        self.productId = productId
+
+class MarketDataTimeoutException(Exception):
+    def __init__(self, tickerSymbol: str):
+        self.tickerSymbol = tickerSymbol
+
+class MonteCarloBatchJobException(Exception):
+    def __init__(self, jobId: str):
+        self.jobId = jobId
@@ -2,12 +2,24 @@ import uuid
 from datetime import datetime
 from urllib.request import Request
 from fastapi import FastAPI, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from exception.errors import ProductServiceServerException, ValidateInitialBasePriceEvaluationDateException, \
-    MonteCarloResultException
+    MonteCarloResultException, MarketDataTimeoutException, MonteCarloBatchJobException
+import math
 
 
 def add_exception_handler(app: FastAPI):
+    # 요청 값 검증 실패 - FastAPI 기본 응답과 같은 형식 (응답에 포함되는 입력 값의 NaN, Infinity는 JSON으로 직렬화할 수 없으므로 문자열로 바꿈)
+    @app.exception_handler(RequestValidationError)
+    async def request_validation_exception_handler(request: Request, exc: RequestValidationError):
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"detail": jsonable_encoder(exc.errors(),
+                                                custom_encoder={float: lambda value: value if math.isfinite(value) else str(value)})}
+        )
+
     @app.exception_handler(ProductServiceServerException)
     async def product_service_server_exception_handler(request: Request, exc: ProductServiceServerException):
         return JSONResponse(
@@ -37,6 +49,21 @@ def add_exception_handler(app: FastAPI):
             }
         )
 
+    @app.exception_handler(MarketDataTimeoutException)
+    async def market_data_timeout_exception_handler(request: Request,
+                                                    exc: MarketDataTimeoutException):
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={
+                "timestamp": str(datetime.now()),
+                "trackingId": str(uuid.uuid4()),
+                "status_code": status.HTTP_504_GATEWAY_TIMEOUT,
+                "status": "GATEWAY_TIMEOUT",
+                "code": "MarketDataTimeoutException",
+                "message": "기초자산 시세 데이터 조회 시간이 초과되었습니다."
+            }
+        )
+
     @app.exception_handler(MonteCarloResultException)
     async def monte_carlo_result_exception_handler(request: Request,
                                                    exc: MonteCarloResultException):
@@ -50,4 +77,19 @@ def add_exception_handler(app: FastAPI):
                 "code": "MonteCarloResultException",
                 "message": "해당 상품에 대한 몬테카를로 분석 결과를 찾을 수 없습니다."
             }
-        )
\ No newline at end of file
+        )
+
+    @app.exception_handler(MonteCarloBatchJobException)
+    async def monte_carlo_batch_job_exception_handler(request: Request,
+                                                      exc: MonteCarloBatchJobException):
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "timestamp": str(datetime.now()),
+                "trackingId": str(uuid.uuid4()),
+                "status_code": 404,
+                "status": "NOT_FOUND",
+                "code": "MonteCarloBatchJobException",
+                "message": "해당 몬테카를로 일괄 계산 작업을 찾을 수 없습니다."
+            }
+        )
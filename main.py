@@ -1,38 +1,117 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
 from uvicorn.config import LOGGING_CONFIG
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from api.main import api_router
 from exception.exception_handler import add_exception_handler
-from core.database import Base, engine
-from core.opentelemetry import setup_opentelemetry
+from core.database import engine
+from core.opentelemetry import setup_opentelemetry, start_opentelemetry, OPENTELEMETRY_ENABLED
+from core.metrics import setup_metrics, prepare_multiprocess_metrics, shutdown_metrics
+from core.market_data import shutdown_market_data_executor, run_price_store_refresher
+from core.barrier_monitor import barrier_monitor, run_barrier_monitor
+from core.propensity_index import run_propensity_index_refresher
+from core.startup import readiness, run_startup_step
+from core.config import UVICORN_WORKERS
+from core.host_lock import HostLock
+from core.shared_cache import SHARED_CACHE_DIR
+from migrations import upgrade_schema, get_pending_migrations
+from sqlalchemy import text
+from functools import partial
 # from core.logger import setup_logger
 import py_eureka_client.eureka_client as eureka_client
 import uvicorn
+import asyncio
 import os
 import models
 
 load_dotenv()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# 서버가 요청을 받기 시작한 뒤 백그라운드에서 실행하는 시작 단계
+DATABASE_STEP = "database"
+EUREKA_STEP = "eureka"
+TRACING_STEP = "tracing"
+# 서비스 시작 시 스키마 생성과 마이그레이션을 실행할지 여부 (배포 단계에서 python -m migrations로 실행하면 끔)
+DATABASE_MIGRATE_ON_STARTUP = os.getenv('DATABASE_MIGRATE_ON_STARTUP', 'true').lower() == 'true'
+# 워커가 여러 개일 때 워커별 지표 파일을 저장하는 디렉터리
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', os.path.join(SHARED_CACHE_DIR, 'metrics'))
+
+# 같은 호스트의 워커들 중 호스트에 한 번만 필요한 작업(마이그레이션, Eureka 등록, 종가 저장소 갱신, 낙인 배리어 감시)을 실행할 워커를 정하는 잠금
+# (잠금을 가진 워커가 종료되면 다음에 시작되는 워커가 잠금을 얻음)
+leader_lock = HostLock("leader")
+
+
+# 마이그레이션은 잠금을 얻은 워커(leader)만 실행하고, 다른 워커는 마이그레이션이 모두 적용될 때까지 준비되지 않은 것으로 처리
+async def prepare_database(isLeader: bool = True):
+    async with engine.begin() as conn:
+        if DATABASE_MIGRATE_ON_STARTUP and isLeader:
+            await conn.run_sync(upgrade_schema)
+        elif DATABASE_MIGRATE_ON_STARTUP:
+            pendingMigrations = await conn.run_sync(get_pending_migrations)
+            if pendingMigrations:
+                raise RuntimeError(f"다른 워커가 아직 마이그레이션을 적용하지 않았습니다: {', '.join(pendingMigrations)}")
+        else:
+            await conn.execute(text("SELECT 1"))
+
+
+async def register_eureka():
     await eureka_client.init_async(eureka_server=os.getenv('EUREKA_SERVER'),
                                    app_name="analysis-service",
                                    instance_host=os.getenv('INSTANCE_HOST'),
                                    instance_port=int(os.getenv('INSTANCE_NON_SECURE_PORT')))
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+
+# DB가 준비된 뒤에 Eureka에 등록해서 준비되지 않은 인스턴스로 요청이 라우팅되지 않도록 함
+# (워커들은 같은 포트를 함께 사용하므로 Eureka에는 leader만 등록)
+async def run_startup(isLeader: bool = True):
+    await run_startup_step(DATABASE_STEP, partial(prepare_database, isLeader))
+    if isLeader:
+        await run_startup_step(EUREKA_STEP, register_eureka)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워커가 하나이면 잠금 파일 없이 항상 leader
+    isLeader = leader_lock.try_acquire()
+    # DB 스키마 준비와 Eureka 등록은 요청 처리를 막지 않도록 백그라운드에서 실행 (완료 여부는 /health/ready로 확인)
+    readiness.start([DATABASE_STEP] + ([EUREKA_STEP] if isLeader else []) + ([TRACING_STEP] if OPENTELEMETRY_ENABLED else []))
+    startup = asyncio.create_task(run_startup(isLeader))
+    # OpenTelemetry 모듈 import와 트레이싱 설정 (설정이 끝난 뒤의 요청부터 추적)
+    tracing = asyncio.create_task(run_startup_step(TRACING_STEP, start_opentelemetry)) if OPENTELEMETRY_ENABLED else None
+    # 로컬 종가 저장소에 마지막 저장 날짜 이후의 종가를 주기적으로 이어서 저장 (종가 저장소 파일은 워커들이 함께 사용하므로 leader만 갱신)
+    priceStoreRefresher = asyncio.create_task(run_price_store_refresher()) if isLeader else None
+    # 운용 중인 상품과 등록 요청된 상품의 기초자산 가격을 주기적으로 확인해서 낙인 여부 갱신
+    # (leader만 감시하고, 다른 워커는 등록 요청과 낙인 상품 리스트를 공유 메모리 캐시로 주고받음)
+    barrier_monitor.active = isLeader
+    barrierMonitor = asyncio.create_task(run_barrier_monitor()) if isLeader else None
+    # 투자 성향 분류 색인을 만들고 주기적으로 수정된 결과를 반영 (색인은 워커의 메모리에 있으므로 워커마다 실행)
+    propensityIndexRefresher = asyncio.create_task(run_propensity_index_refresher())
     yield
-    await eureka_client.stop_async()
+    startup.cancel()
+    if tracing is not None:
+        tracing.cancel()
+    if priceStoreRefresher is not None:
+        priceStoreRefresher.cancel()
+    if barrierMonitor is not None:
+        barrierMonitor.cancel()
+    propensityIndexRefresher.cancel()
+    if readiness.is_ready(EUREKA_STEP):
+        await eureka_client.stop_async()
+    shutdown_market_data_executor()
+    shutdown_metrics()
+    leader_lock.release()
 
 
 app = FastAPI(lifespan=lifespan,
               openapi_url="/v3/api-docs")
 
-# OpenTelemetry 설정을 위한 함수 호출
+# OpenTelemetry 추적 미들웨어 추가 (OpenTelemetry 설정은 서버가 뜬 뒤 시작 단계에서 실행)
 setup_opentelemetry(app)
 
+# 요청, DB 커넥션 풀, 외부 호출 지표를 /metrics로 노출
+setup_metrics(app)
+
 app.include_router(api_router)
 
 add_exception_handler(app)
@@ -72,10 +151,29 @@ def health_check_handler():
     return {"status": "It's Working in " + os.getenv('APPLICATION_NAME')}
 
 
+# liveness - 프로세스가 요청을 처리할 수 있으면 항상 200 (시작 단계 완료 여부와 무관)
+@app.get("/health/live", tags=["Health Check"], summary="liveness")
+def liveness_handler():
+    return {"status": "UP"}
+
+
+# readiness - 시작 단계(DB 스키마 준비, Eureka 등록, 트레이싱 설정)가 모두 끝났으면 200, 아니면 503과 단계별 상태
+@app.get("/health/ready", tags=["Health Check"], summary="readiness")
+def readiness_handler():
+    stats = readiness.stats()
+    return JSONResponse(status_code=status.HTTP_200_OK if stats["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content=stats)
+
+
 if __name__ == "__main__":
     try:
         LOGGING_CONFIG["formatters"]["default"]["fmt"] = "%(asctime)s [%(name)s] %(levelprefix)s %(message)s"
         LOGGING_CONFIG["formatters"]["access"]["fmt"] = '%(asctime)s [%(name)s] %(levelprefix)s %(client_addr)s - "%(request_line)s" %(status_code)s'
-        uvicorn.run(app, host="0.0.0.0", port=int(os.getenv('INSTANCE_PORT')))
+        # 워커가 여러 개이면 uvicorn이 워커 프로세스마다 main 모듈을 import하므로 앱을 import 경로로 전달하고,
+        # /metrics가 모든 워커의 지표를 합쳐서 응답하도록 워커별 지표 파일 디렉터리 지정
+        if UVICORN_WORKERS > 1:
+            prepare_multiprocess_metrics(PROMETHEUS_MULTIPROC_DIR)
+        uvicorn.run(app if UVICORN_WORKERS == 1 else "main:app", host="0.0.0.0", port=int(os.getenv('INSTANCE_PORT')),
+                    workers=UVICORN_WORKERS)
     except KeyboardInterrupt:
         pass
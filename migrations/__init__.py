@@ -0,0 +1,55 @@
+from sqlalchemy import Column, String, DateTime, MetaData, Table, inspect, select, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+from core.database import Base
+from typing import List
+import importlib
+import pkgutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 적용된 마이그레이션 기록 테이블
+schema_migration = Table(
+    "schema_migration", MetaData(),
+    Column("version", String(128), primary_key=True),
+    Column("applied_at", DateTime, server_default=func.now(), nullable=False)
+)
+
+
+# migrations 패키지의 v로 시작하는 모듈들을 이름 순서대로 반환
+# 각 모듈은 upgrade(connection: Connection) 함수를 가지며, Base.metadata.create_all로 이미 최신 스키마가 만들어진 DB에서도
+# 다시 실행할 수 있도록 작성함
+def get_migrations():
+    return [importlib.import_module(f"{__name__}.{module.name}")
+            for module in sorted(pkgutil.iter_modules(__path__), key=lambda module: module.name)
+            if module.name.startswith("v")]
+
+
+# 아직 적용되지 않은 마이그레이션을 순서대로 적용 (AsyncConnection.run_sync로 실행)
+def run_migrations(connection: Connection):
+    schema_migration.create(connection, checkfirst=True)
+    applied = set(connection.execute(select(schema_migration.c.version)).scalars())
+    for migration in get_migrations():
+        version = migration.__name__.rsplit(".", 1)[-1]
+        if version in applied:
+            continue
+        logger.info("마이그레이션 적용: %s", version)
+        migration.upgrade(connection)
+        connection.execute(insert(schema_migration).values(version=version))
+
+
+# 아직 적용되지 않은 마이그레이션 버전 목록 (마이그레이션을 실행하지 않는 워커가 스키마가 준비되었는지 확인할 때 사용)
+def get_pending_migrations(connection: Connection) -> List[str]:
+    versions = [migration.__name__.rsplit(".", 1)[-1] for migration in get_migrations()]
+    if not inspect(connection).has_table(schema_migration.name):
+        return versions
+    applied = set(connection.execute(select(schema_migration.c.version)).scalars())
+    return [version for version in versions if version not in applied]
+
+
+# 모델 기준으로 없는 테이블을 만든 뒤 아직 적용되지 않은 마이그레이션 적용
+# (서비스 시작 후 백그라운드에서, 또는 배포 단계에서 python -m migrations로 실행)
+def upgrade_schema(connection: Connection):
+    Base.metadata.create_all(connection)
+    run_migrations(connection)
@@ -0,0 +1,15 @@
+from core.database import engine
+from migrations import upgrade_schema
+import asyncio
+import models
+
+
+# python -m migrations
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
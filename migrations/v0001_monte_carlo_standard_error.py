@@ -0,0 +1,17 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# 몬테카를로 분석 결과의 확률별 표준오차 컬럼 추가
+COLUMNS = {
+    "early_repayment_standard_error": "TEXT NULL",
+    "maturity_repayment_standard_error": "DECIMAL(8,4) NULL",
+    "loss_standard_error": "DECIMAL(8,4) NULL",
+    "under_knockin_barrier_standard_error": "DECIMAL(8,4) NULL",
+}
+
+
+def upgrade(connection: Connection):
+    existing = {column["name"] for column in inspect(connection).get_columns("monte_carlo_result")}
+    for name, definition in COLUMNS.items():
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE monte_carlo_result ADD COLUMN {name} {definition}"))
@@ -0,0 +1,17 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# 몬테카를로 분석 결과 재사용을 위한 입력 해시, 현재가 비율, 난수 시드 컬럼 추가
+COLUMNS = {
+    "input_hash": "CHAR(64) NULL",
+    "terms_hash": "CHAR(64) NULL",
+    "spot_ratios": "TEXT NULL",
+    "seed": "BIGINT NULL",
+}
+
+
+def upgrade(connection: Connection):
+    existing = {column["name"] for column in inspect(connection).get_columns("monte_carlo_result")}
+    for name, definition in COLUMNS.items():
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE monte_carlo_result ADD COLUMN {name} {definition}"))
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, BigInteger, Integer, DECIMAL, DateTime, Index, MetaData, Table, insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+
+# monte_carlo_result.early_repayment_probability(쉼표로 구분된 %)를 평가일별 행으로 나눈 테이블 생성 및 기존 결과 이관
+monte_carlo_early_repayment = Table(
+    "monte_carlo_early_repayment", MetaData(),
+    Column("monte_carlo_early_repayment_id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("monte_carlo_result_id", BigInteger, nullable=False),
+    Column("product_id", BigInteger, nullable=False),
+    Column("redemption_index", Integer, nullable=False),
+    Column("probability", DECIMAL(8, 4), nullable=False),
+    Column("created_at", DateTime, server_default=func.now(), nullable=False),
+    Column("last_modified_at", DateTime, server_default=func.now(), nullable=False),
+    Index("ix_monte_carlo_early_repayment_product_redemption", "product_id", "redemption_index", "probability",
+          "monte_carlo_result_id"),
+    Index("ix_monte_carlo_early_repayment_result", "monte_carlo_result_id"),
+)
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade(connection: Connection):
+    monte_carlo_early_repayment.create(connection, checkfirst=True)
+
+    # 아직 평가일별 행이 없는 결과만 이관 (중간에 실패해도 다시 실행할 수 있음)
+    rows = connection.execute(text(
+        "SELECT monte_carlo_result_id, product_id, early_repayment_probability FROM monte_carlo_result "
+        "WHERE monte_carlo_result_id NOT IN (SELECT monte_carlo_result_id FROM monte_carlo_early_repayment)"
+    )).all()
+    values = [{"monte_carlo_result_id": monteCarloResultId, "product_id": productId,
+               "redemption_index": index, "probability": float(probability)}
+              for monteCarloResultId, productId, earlyRepaymentProbability in rows
+              for index, probability in enumerate(_split(earlyRepaymentProbability))]
+    for start in range(0, len(values), BACKFILL_BATCH_SIZE):
+        connection.execute(insert(monte_carlo_early_repayment), values[start:start + BACKFILL_BATCH_SIZE])
+
+
+def _split(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
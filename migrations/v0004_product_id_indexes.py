@@ -0,0 +1,18 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# 투자 성향 조회(상품 id 조건 + 점수/확률 범위 조건)에 사용하는 복합 인덱스 추가
+INDEXES = {
+    "ix_ai_result_product_safety_score": ("ai_result", ["product_id", "safety_score"]),
+    "ix_monte_carlo_result_product_loss": ("monte_carlo_result", ["product_id", "loss_probability"]),
+}
+
+
+def upgrade(connection: Connection):
+    inspector = inspect(connection)
+    for name, (table, columns) in INDEXES.items():
+        if not inspector.has_table(table):
+            continue
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        connection.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
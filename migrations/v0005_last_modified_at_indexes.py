@@ -0,0 +1,18 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# 투자 성향 분류 색인이 마지막 확인 이후 수정된 결과만 읽을 수 있도록 수정 시각 인덱스 추가
+INDEXES = {
+    "ix_ai_result_last_modified_at": ("ai_result", ["last_modified_at"]),
+    "ix_monte_carlo_result_last_modified_at": ("monte_carlo_result", ["last_modified_at"]),
+}
+
+
+def upgrade(connection: Connection):
+    inspector = inspect(connection)
+    for name, (table, columns) in INDEXES.items():
+        if not inspector.has_table(table):
+            continue
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        connection.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
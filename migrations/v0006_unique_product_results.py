@@ -0,0 +1,71 @@
+from sqlalchemy import Column, BigInteger, Integer, DECIMAL, Text, CHAR, Boolean, DateTime, Index, MetaData, Table, \
+    inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+
+metadata = MetaData()
+
+monte_carlo_result_history = Table(
+    "monte_carlo_result_history", metadata,
+    Column("monte_carlo_result_history_id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("monte_carlo_result_id", BigInteger, nullable=False),
+    Column("product_id", BigInteger, nullable=False),
+    Column("early_repayment_probability", Text, nullable=False),
+    Column("maturity_repayment_probability", DECIMAL(8, 4), nullable=False),
+    Column("loss_probability", DECIMAL(8, 4), nullable=False),
+    Column("under_knockin_barrier_probability", DECIMAL(8, 4), nullable=False),
+    Column("early_repayment_standard_error", Text, nullable=True),
+    Column("maturity_repayment_standard_error", DECIMAL(8, 4), nullable=True),
+    Column("loss_standard_error", DECIMAL(8, 4), nullable=True),
+    Column("under_knockin_barrier_standard_error", DECIMAL(8, 4), nullable=True),
+    Column("input_hash", CHAR(64), nullable=True),
+    Column("terms_hash", CHAR(64), nullable=True),
+    Column("spot_ratios", Text, nullable=True),
+    Column("seed", BigInteger, nullable=True),
+    Column("created_at", DateTime, nullable=True),
+    Column("last_modified_at", DateTime, nullable=True),
+    Column("archived_at", DateTime, server_default=func.now(), nullable=False),
+    Index("ix_monte_carlo_result_history_product_id", "product_id", "archived_at"),
+)
+
+ai_result_history = Table(
+    "ai_result_history", metadata,
+    Column("ai_result_history_id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("ai_result_id", BigInteger, nullable=False),
+    Column("product_id", BigInteger, nullable=False),
+    Column("repayment_prediction", Boolean, nullable=False),
+    Column("safety_score", DECIMAL(5, 4), nullable=False),
+    Column("created_at", DateTime, nullable=True),
+    Column("last_modified_at", DateTime, nullable=True),
+    Column("archived_at", DateTime, server_default=func.now(), nullable=False),
+    Index("ix_ai_result_history_product_id", "product_id", "archived_at"),
+)
+
+# 결과 테이블의 product_id 유일 키 추가
+# 유일 키를 만들기 전에 상품별로 가장 최근(id가 가장 큰) 행만 남기고, 나머지 행은 이력 테이블로 옮김
+TABLES = {
+    "ai_result": ("ai_result_id", ai_result_history, "ux_ai_result_product_id"),
+    "monte_carlo_result": ("monte_carlo_result_id", monte_carlo_result_history, "ux_monte_carlo_result_product_id"),
+}
+
+
+def upgrade(connection: Connection):
+    inspector = inspect(connection)
+    for table, (idColumn, historyTable, indexName) in TABLES.items():
+        historyTable.create(connection, checkfirst=True)
+        if not inspector.has_table(table):
+            continue
+        if indexName in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+
+        # MySQL은 같은 테이블을 서브쿼리에서 바로 참조해서 삭제할 수 없으므로 파생 테이블로 감쌈
+        stale = (f"{idColumn} NOT IN (SELECT {idColumn} FROM "
+                 f"(SELECT MAX({idColumn}) AS {idColumn} FROM {table} GROUP BY product_id) AS latest)")
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        columns = ", ".join(column.name for column in historyTable.columns if column.name in existing)
+        connection.execute(text(f"INSERT INTO {historyTable.name} ({columns}) SELECT {columns} FROM {table} WHERE {stale}"))
+        if table == "monte_carlo_result" and inspector.has_table("monte_carlo_early_repayment"):
+            connection.execute(text(f"DELETE FROM monte_carlo_early_repayment WHERE monte_carlo_result_id IN "
+                                    f"(SELECT {idColumn} FROM {table} WHERE {stale})"))
+        connection.execute(text(f"DELETE FROM {table} WHERE {stale}"))
+        connection.execute(text(f"CREATE UNIQUE INDEX {indexName} ON {table} (product_id)"))
@@ -0,0 +1,20 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+# 몬테카를로 분석 결과 재사용 시 변동성, 상관계수 변동을 허용 범위로 비교하기 위한 컬럼 추가 (이력 테이블에도 추가)
+COLUMNS = {
+    "volatilities": "TEXT NULL",
+    "correlations": "TEXT NULL",
+}
+TABLES = ("monte_carlo_result", "monte_carlo_result_history")
+
+
+def upgrade(connection: Connection):
+    tables = set(inspect(connection).get_table_names())
+    for table in TABLES:
+        if table not in tables:
+            continue
+        existing = {column["name"] for column in inspect(connection).get_columns(table)}
+        for name, definition in COLUMNS.items():
+            if name not in existing:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
@@ -1,10 +1,15 @@
 from sqlalchemy.sql import func
 from core.database import Base
-from sqlalchemy import Column, BigInteger, DECIMAL, Text, DateTime, Boolean
+from sqlalchemy import Column, BigInteger, DECIMAL, Text, DateTime, Boolean, CHAR, Integer, Index
 
 
 class MonteCarloResult(Base):
     __tablename__ = 'monte_carlo_result'
+    __table_args__ = (
+        Index('ux_monte_carlo_result_product_id', 'product_id', unique=True),
+        Index('ix_monte_carlo_result_product_loss', 'product_id', 'loss_probability'),
+        Index('ix_monte_carlo_result_last_modified_at', 'last_modified_at'),
+    )
 
     monte_carlo_result_id = Column(BigInteger, primary_key=True, autoincrement=True, comment="id")
     product_id = Column(BigInteger, nullable=False)
@@ -12,6 +17,61 @@ class MonteCarloResult(Base):
     maturity_repayment_probability = Column(DECIMAL(8,4), nullable=False)
     loss_probability = Column(DECIMAL(8,4), nullable=False)
     under_knockin_barrier_probability = Column(DECIMAL(8,4), nullable=False)
+    early_repayment_standard_error = Column(Text, nullable=True)
+    maturity_repayment_standard_error = Column(DECIMAL(8,4), nullable=True)
+    loss_standard_error = Column(DECIMAL(8,4), nullable=True)
+    under_knockin_barrier_standard_error = Column(DECIMAL(8,4), nullable=True)
+    input_hash = Column(CHAR(64), nullable=True)
+    terms_hash = Column(CHAR(64), nullable=True)
+    spot_ratios = Column(Text, nullable=True)
+    volatilities = Column(Text, nullable=True)
+    correlations = Column(Text, nullable=True)
+    seed = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_modified_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+# 몬테카를로 분석 결과가 새 결과로 덮어써지기 전의 값 (RESULT_HISTORY_ENABLED=true일 때 기록)
+class MonteCarloResultHistory(Base):
+    __tablename__ = 'monte_carlo_result_history'
+    __table_args__ = (
+        Index('ix_monte_carlo_result_history_product_id', 'product_id', 'archived_at'),
+    )
+
+    monte_carlo_result_history_id = Column(BigInteger, primary_key=True, autoincrement=True, comment="id")
+    monte_carlo_result_id = Column(BigInteger, nullable=False)
+    product_id = Column(BigInteger, nullable=False)
+    early_repayment_probability = Column(Text, nullable=False)
+    maturity_repayment_probability = Column(DECIMAL(8,4), nullable=False)
+    loss_probability = Column(DECIMAL(8,4), nullable=False)
+    under_knockin_barrier_probability = Column(DECIMAL(8,4), nullable=False)
+    early_repayment_standard_error = Column(Text, nullable=True)
+    maturity_repayment_standard_error = Column(DECIMAL(8,4), nullable=True)
+    loss_standard_error = Column(DECIMAL(8,4), nullable=True)
+    under_knockin_barrier_standard_error = Column(DECIMAL(8,4), nullable=True)
+    input_hash = Column(CHAR(64), nullable=True)
+    terms_hash = Column(CHAR(64), nullable=True)
+    spot_ratios = Column(Text, nullable=True)
+    volatilities = Column(Text, nullable=True)
+    correlations = Column(Text, nullable=True)
+    seed = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    last_modified_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+# monte_carlo_result.early_repayment_probability를 평가일별 행으로 나눈 테이블 (상환 성향 조건을 인덱스로 조회하기 위해 사용)
+class MonteCarloEarlyRepayment(Base):
+    __tablename__ = 'monte_carlo_early_repayment'
+    __table_args__ = (
+        Index('ix_monte_carlo_early_repayment_product_redemption', 'product_id', 'redemption_index', 'probability',
+              'monte_carlo_result_id'),
+        Index('ix_monte_carlo_early_repayment_result', 'monte_carlo_result_id'),
+    )
+
+    monte_carlo_early_repayment_id = Column(BigInteger, primary_key=True, autoincrement=True, comment="id")
+    monte_carlo_result_id = Column(BigInteger, nullable=False)
+    product_id = Column(BigInteger, nullable=False)
+    redemption_index = Column(Integer, nullable=False, comment="조기상환 평가일 순서 (0부터 시작)")
+    probability = Column(DECIMAL(8,4), nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     last_modified_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -25,6 +85,11 @@ class MonteCarloResultError(Base):
 
 class AIResult(Base):
     __tablename__ = 'ai_result'
+    __table_args__ = (
+        Index('ux_ai_result_product_id', 'product_id', unique=True),
+        Index('ix_ai_result_product_safety_score', 'product_id', 'safety_score'),
+        Index('ix_ai_result_last_modified_at', 'last_modified_at'),
+    )
 
     ai_result_id = Column(BigInteger, primary_key=True, autoincrement=True, comment="id")
     product_id = Column(BigInteger, nullable=False)
@@ -33,6 +98,22 @@ class AIResult(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     last_modified_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
+# AI 분석 결과가 새 결과로 덮어써지기 전의 값 (RESULT_HISTORY_ENABLED=true일 때 기록)
+class AIResultHistory(Base):
+    __tablename__ = 'ai_result_history'
+    __table_args__ = (
+        Index('ix_ai_result_history_product_id', 'product_id', 'archived_at'),
+    )
+
+    ai_result_history_id = Column(BigInteger, primary_key=True, autoincrement=True, comment="id")
+    ai_result_id = Column(BigInteger, nullable=False)
+    product_id = Column(BigInteger, nullable=False)
+    repayment_prediction = Column(Boolean, nullable=False)
+    safety_score = Column(DECIMAL(5,4), nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    last_modified_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now(), nullable=False)
+
 class AIResultError(Base):
     __tablename__ = 'ai_result_error'
 
@@ -0,0 +1,215 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from multiprocessing import get_context, shared_memory
+from dotenv import load_dotenv
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from simulation.engine import MonteCarloInputs, MonteCarloEstimate, simulate, TRADING_DAYS_PER_YEAR, DEFAULT_BATCH_PATHS
+from simulation.sampling import ANTITHETIC
+import numpy as np
+import asyncio
+import os
+
+load_dotenv()
+
+# 일괄 계산에 사용하는 프로세스 수 (기본값: CPU 코어 수)
+SIMULATION_MAX_WORKERS = int(os.getenv('SIMULATION_MAX_WORKERS', os.cpu_count() or 1))
+# 프로세스마다 나눠 주는 작업 묶음 수 (상품마다 계산 시간이 달라도 프로세스들이 고르게 일하도록 코어 수보다 잘게 나눔)
+SIMULATION_SHARDS_PER_WORKER = int(os.getenv('SIMULATION_SHARDS_PER_WORKER', 4))
+SIMULATION_PATHS = int(os.getenv('SIMULATION_PATHS', 100_000))
+SIMULATION_RISK_FREE_RATE = float(os.getenv('SIMULATION_RISK_FREE_RATE', 0.03))
+# 분산 감소 설정 (SIMULATION_SAMPLING: pseudo, antithetic, sobol)
+# SIMULATION_TOLERANCE를 지정하면 모든 확률의 95% 신뢰구간 반폭이 지정한 값(%p) 이하가 되는 즉시 계산을 멈춤 (SIMULATION_PATHS는 최대 경로 수)
+SIMULATION_SAMPLING = os.getenv('SIMULATION_SAMPLING', ANTITHETIC)
+SIMULATION_CONTROL_VARIATE = os.getenv('SIMULATION_CONTROL_VARIATE', 'true').lower() == 'true'
+SIMULATION_TOLERANCE = float(os.getenv('SIMULATION_TOLERANCE')) if os.getenv('SIMULATION_TOLERANCE') else None
+# 프로세스별 최대 메모리 사용량은 경로 수와 관계없이 한 번에 계산하는 경로 묶음 크기에 비례 (SIMULATION_FLOAT32=true이면 절반)
+SIMULATION_BATCH_PATHS = int(os.getenv('SIMULATION_BATCH_PATHS', DEFAULT_BATCH_PATHS))
+SIMULATION_FLOAT32 = os.getenv('SIMULATION_FLOAT32', 'false').lower() == 'true'
+
+
+# 프로세스에 넘기는 상품별 조건 (시장 데이터는 공유 메모리의 기초자산 위치(tickerIndices)로만 참조)
+@dataclass
+class ProductTerms:
+    productId: int
+    tickerIndices: List[int]
+    initialCloses: List[float]
+    evaluationSteps: List[int]
+    redemptionBarriers: List[float]
+    knockInBarrier: Optional[float]
+    # 난수 시드 (None이면 상품 id)
+    seed: Optional[int] = None
+
+
+# 상품 정보에서 몬테카를로 계산 조건 추출
+# - earlyRepaymentEvaluationDates: 조기상환 평가일 리스트 (마지막 값은 만기 평가일, 쉼표로 구분된 문자열도 허용)
+# - redemptionBarriers: 평가일별 상환 배리어 (최초기준가격 대비 %)
+# - knockIn: 낙인 배리어 (최초기준가격 대비 %, 낙인 조건이 없는 상품은 null)
+# 이미 지난 평가일은 제외하고, 오늘부터 남은 평가일까지의 영업일 수로 변환
+def parse_product_terms(productId: int, product: dict, tickerIndex: Dict[str, int],
+                        initialCloses: Dict[Tuple[str, str], Optional[float]], today: date) -> ProductTerms:
+    evaluationDates = _split(product.get("earlyRepaymentEvaluationDates"))
+    redemptionBarriers = [float(barrier) for barrier in _split(product.get("redemptionBarriers"))]
+    if not evaluationDates or len(evaluationDates) != len(redemptionBarriers):
+        raise ValueError(f"상품 {productId}의 조기상환 평가일과 상환 배리어 정보가 올바르지 않습니다.")
+
+    tickerSymbols = [product["equityTickerSymbols"][equity] for equity in product["equities"].split(" / ")]
+    closes = [initialCloses.get((tickerSymbol, product["initialBasePriceEvaluationDate"])) for tickerSymbol in tickerSymbols]
+    if any(close is None for close in closes):
+        raise ValueError(f"상품 {productId}의 최초기준가격을 가져올 수 없습니다.")
+
+    # 오늘 이후부터 평가일까지(평가일 포함)의 영업일 수
+    steps = np.busday_count(np.datetime64(today) + 1, np.array(evaluationDates, dtype="datetime64[D]") + 1)
+    remaining = steps > 0
+    if not remaining.any():
+        raise ValueError(f"상품 {productId}의 만기 평가일이 지났습니다.")
+
+    knockIn = product.get("knockIn")
+    return ProductTerms(productId=productId,
+                        tickerIndices=[tickerIndex[tickerSymbol] for tickerSymbol in tickerSymbols],
+                        initialCloses=closes,
+                        evaluationSteps=steps[remaining].tolist(),
+                        redemptionBarriers=[barrier for barrier, isRemaining in zip(redemptionBarriers, remaining) if isRemaining],
+                        knockInBarrier=float(knockIn) if knockIn is not None else None)
+
+
+def _split(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value)
+
+
+# 기초자산별 일별 종가로 연 변동성과 상관계수 행렬 추정
+# 기초자산마다 휴장일이 다르므로 상관계수는 두 기초자산의 수익률이 모두 있는 날짜들로만 계산하고,
+# 추정된 행렬이 양의 준정부호가 아니면 음의 고유값을 잘라내서 가장 가까운 상관계수 행렬로 보정
+def estimate_volatility_and_correlation(tickerSymbols: Sequence[str],
+                                        histories: Dict[str, List[Tuple[str, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    if not tickerSymbols:
+        return np.empty(0), np.empty((0, 0))
+    # pandas는 서비스 시작 시간을 줄이기 위해 처음 추정할 때 import
+    import pandas as pd
+
+    frame = pd.DataFrame({tickerSymbol: pd.Series(dict(histories.get(tickerSymbol, [])), dtype=float)
+                          for tickerSymbol in tickerSymbols})
+    logReturns = np.log(frame.sort_index()).diff()
+
+    volatilities = (logReturns.std() * np.sqrt(TRADING_DAYS_PER_YEAR)).fillna(0.0).to_numpy()
+    correlation = logReturns.corr().fillna(0.0).to_numpy()
+    np.fill_diagonal(correlation, 1.0)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    if eigenvalues.min() < 1e-10:
+        correlation = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-10, None)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(correlation))
+        correlation = correlation / np.outer(scale, scale)
+    return volatilities, correlation
+
+
+# 모든 프로세스가 함께 읽는 시장 데이터 (현재가 K | 변동성 K | 상관계수 K × K)
+# 상품마다 시장 데이터를 pickle로 넘기지 않고, 프로세스가 시작될 때 공유 메모리에 한 번만 연결함
+class SharedMarketSnapshot:
+    def __init__(self, spots: np.ndarray, volatilities: np.ndarray, correlation: np.ndarray):
+        self.tickerCount = len(spots)
+        self._memory = shared_memory.SharedMemory(create=True, size=max(_snapshot_size(self.tickerCount), 1) * 8)
+        _, snapshotSpots, snapshotVolatilities, snapshotCorrelation = _snapshot_views(self._memory, self.tickerCount)
+        snapshotSpots[:] = spots
+        snapshotVolatilities[:] = volatilities
+        snapshotCorrelation[:] = correlation
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def close(self):
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _snapshot_size(tickerCount: int) -> int:
+    return 2 * tickerCount + tickerCount * tickerCount
+
+
+def _snapshot_views(memory: shared_memory.SharedMemory, tickerCount: int):
+    buffer = np.ndarray((_snapshot_size(tickerCount),), dtype=np.float64, buffer=memory.buf)
+    return (memory,
+            buffer[:tickerCount],
+            buffer[tickerCount:2 * tickerCount],
+            buffer[2 * tickerCount:].reshape(tickerCount, tickerCount))
+
+
+# 프로세스별로 연결된 공유 메모리 시장 데이터
+_worker_snapshot = None
+
+
+def _attach_snapshot(name: str, tickerCount: int):
+    global _worker_snapshot
+    _worker_snapshot = _snapshot_views(shared_memory.SharedMemory(name=name), tickerCount)
+
+
+# 프로세스에서 상품 묶음을 차례로 계산 (실패한 상품은 에러 메시지와 함께 반환)
+def simulate_shard(shard: List[ProductTerms], paths: int, riskFreeRate: float,
+                   simulationOptions: dict) -> List[Tuple[int, Optional[MonteCarloEstimate], Optional[str]]]:
+    _, spots, volatilities, correlation = _worker_snapshot
+    results = []
+    for terms in shard:
+        try:
+            tickerIndices = np.asarray(terms.tickerIndices)
+            inputs = MonteCarloInputs(initialRatios=spots[tickerIndices] / np.asarray(terms.initialCloses),
+                                      volatilities=volatilities[tickerIndices],
+                                      correlation=correlation[np.ix_(tickerIndices, tickerIndices)],
+                                      riskFreeRate=riskFreeRate,
+                                      evaluationSteps=np.asarray(terms.evaluationSteps),
+                                      redemptionBarriers=np.asarray(terms.redemptionBarriers),
+                                      knockInBarrier=terms.knockInBarrier)
+            seed = terms.seed if terms.seed is not None else terms.productId
+            results.append((terms.productId, simulate(inputs, paths=paths, seed=seed, **simulationOptions), None))
+        except Exception as e:
+            results.append((terms.productId, None, repr(e)))
+    return results
+
+
+def shard_products(productTerms: List[ProductTerms], shardCount: int) -> List[List[ProductTerms]]:
+    shardCount = max(1, min(shardCount, len(productTerms)))
+    return [productTerms[index::shardCount] for index in range(shardCount)]
+
+
+def simulation_options(sampling: str = SIMULATION_SAMPLING, controlVariate: bool = SIMULATION_CONTROL_VARIATE,
+                       tolerance: Optional[float] = SIMULATION_TOLERANCE) -> dict:
+    return {"sampling": sampling, "controlVariate": controlVariate, "tolerance": tolerance,
+            "batchPaths": SIMULATION_BATCH_PATHS, "dtype": np.float32 if SIMULATION_FLOAT32 else np.float64}
+
+
+# 상품들을 프로세스 풀에 나눠서 계산하고, 묶음이 끝날 때마다 progress(끝난 상품 수)를 호출
+# 시장 데이터는 공유 메모리로 넘기고, 프로세스는 이벤트 루프와 상태를 공유하지 않도록 spawn으로 시작
+async def run_simulations(productTerms: List[ProductTerms], snapshot: SharedMarketSnapshot,
+                          paths: int = SIMULATION_PATHS, riskFreeRate: float = SIMULATION_RISK_FREE_RATE,
+                          maxWorkers: int = SIMULATION_MAX_WORKERS, sampling: str = SIMULATION_SAMPLING,
+                          controlVariate: bool = SIMULATION_CONTROL_VARIATE, tolerance: Optional[float] = SIMULATION_TOLERANCE,
+                          progress: Optional[Callable[[int], None]] = None) -> List[Tuple[int, Optional[MonteCarloEstimate], Optional[str]]]:
+    if not productTerms:
+        return []
+
+    maxWorkers = max(1, min(maxWorkers, len(productTerms)))
+    simulationOptions = simulation_options(sampling, controlVariate, tolerance)
+    pool = ProcessPoolExecutor(max_workers=maxWorkers, mp_context=get_context("spawn"),
+                               initializer=_attach_snapshot, initargs=(snapshot.name, snapshot.tickerCount))
+    try:
+        futures = [asyncio.wrap_future(pool.submit(simulate_shard, shard, paths, riskFreeRate, simulationOptions))
+                   for shard in shard_products(productTerms, maxWorkers * SIMULATION_SHARDS_PER_WORKER)]
+        results = []
+        for future in asyncio.as_completed(futures):
+            shardResults = await future
+            results.extend(shardResults)
+            if progress is not None:
+                progress(len(shardResults))
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+from sqlalchemy.future import select
+from core.database import AsyncSessionLocal
+from core.host_lock import HostLock
+from core.market_data import get_closes, backfill
+from core.price_ratio import get_close_keys
+from core.price_store import price_store
+from core.product_client import product_client
+from core.result_ingestion import refresh_derived_results
+from core.shared_cache import create_cache_backend, MISSING
+from exception.errors import ProductServiceServerException
+from simulation.batch import ProductTerms, SharedMarketSnapshot, parse_product_terms, \
+    estimate_volatility_and_correlation, run_simulations, simulation_options, SIMULATION_PATHS, SIMULATION_RISK_FREE_RATE
+from simulation.result_cache import result_cache, cache_key, estimate_delta, HIT, WARM_START
+from simulation.result_writer import write_batch_results
+from util.batch_job_status import BatchJobStatus
+from models import MonteCarloResult
+import numpy as np
+import asyncio
+import logging
+import uuid
+import os
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 변동성과 상관계수 추정에 사용하는 과거 종가 기간 (일)
+SIMULATION_VOLATILITY_LOOKBACK_DAYS = int(os.getenv('SIMULATION_VOLATILITY_LOOKBACK_DAYS', 365))
+# 보관하는 최근 작업 수
+BATCH_JOB_HISTORY_SIZE = int(os.getenv('BATCH_JOB_HISTORY_SIZE', 100))
+# 같은 호스트의 다른 워커가 일괄 계산 중이면 다시 확인하기까지 기다리는 시간 (초)
+BATCH_JOB_LOCK_RETRY_INTERVAL = float(os.getenv('BATCH_JOB_LOCK_RETRY_INTERVAL', 1))
+
+
+@dataclass
+class BatchJob:
+    jobId: str
+    total: int
+    status: BatchJobStatus = BatchJobStatus.PENDING
+    completed: int = 0
+    succeeded: int = 0
+    failedProductIds: List[int] = field(default_factory=list)
+    # 입력이 같아 저장된 결과를 그대로 사용한 상품 수, 이전 난수 시드로 다시 계산한 상품 수
+    cacheHits: int = 0
+    warmStarts: int = 0
+    # 이전 난수 시드로 다시 계산한 상품별 이전 결과 대비 확률 변화량 (%p)
+    warmStartDeltas: Dict[int, Dict[str, float]] = field(default_factory=dict)
+    createdAt: datetime = field(default_factory=datetime.now)
+    finishedAt: Optional[datetime] = None
+
+    def fail(self, productIds: List[int]):
+        self.failedProductIds.extend(productIds)
+        self.completed += len(productIds)
+
+
+# 공유 메모리 캐시에 저장할 때의 작업 상태 (상태는 이름, 날짜는 ISO 형식 문자열로 저장)
+# 저장은 스레드에서 실행되므로 이벤트 루프에서 바뀌는 리스트와 딕셔너리는 복사한 뒤 변환
+def _encode_batch_job(job: BatchJob) -> dict:
+    return {"jobId": job.jobId, "total": job.total, "status": job.status.name, "completed": job.completed,
+            "succeeded": job.succeeded, "failedProductIds": list(job.failedProductIds), "cacheHits": job.cacheHits,
+            "warmStarts": job.warmStarts, "warmStartDeltas": list(dict(job.warmStartDeltas).items()),
+            "createdAt": job.createdAt.isoformat(), "finishedAt": job.finishedAt.isoformat() if job.finishedAt else None}
+
+
+def _decode_batch_job(value: dict) -> BatchJob:
+    return BatchJob(**{**value, "status": BatchJobStatus[value["status"]],
+                       "createdAt": datetime.fromisoformat(value["createdAt"]),
+                       "finishedAt": datetime.fromisoformat(value["finishedAt"]) if value["finishedAt"] else None,
+                       "warmStartDeltas": dict(value["warmStartDeltas"])})
+
+
+# 작업 id → 작업 상태 (워커가 여러 개이면 공유 메모리 캐시에 저장해서, 작업을 등록하지 않은 워커에서도 진행 상황을 조회할 수 있음)
+batch_jobs = create_cache_backend("batchJob", BATCH_JOB_HISTORY_SIZE, encode=_encode_batch_job, decode=_decode_batch_job)
+# 일괄 계산은 모든 코어를 사용하므로 한 번에 하나의 작업만 실행 (워커 안에서는 _batch_lock, 같은 호스트의 워커 사이에서는 _batch_host_lock)
+_batch_lock = asyncio.Lock()
+_batch_host_lock = HostLock("batch")
+_batch_tasks = set()
+
+
+async def get_batch_job(jobId: str) -> Optional[BatchJob]:
+    job = await batch_jobs.get_async(jobId)
+    return None if job is MISSING else job
+
+
+# 작업 상태 저장 (프로세스 메모리 캐시는 작업 객체를 그대로 보관하므로 저장하지 않아도 바뀐 상태가 보임)
+async def save_batch_job(job: BatchJob):
+    await batch_jobs.put_async(job.jobId, job)
+
+
+# 진행 상황처럼 동기 콜백에서 바뀐 상태는 백그라운드에서 저장 (저장 순서와 관계없이 마지막 저장이 최신 상태를 저장함)
+def _save_batch_job_later(job: BatchJob):
+    task = asyncio.create_task(save_batch_job(job))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+
+
+# 같은 호스트의 다른 워커가 일괄 계산을 끝낼 때까지 기다렸다가 잠금을 얻음
+async def _acquire_batch_host_lock():
+    while not _batch_host_lock.try_acquire():
+        await asyncio.sleep(BATCH_JOB_LOCK_RETRY_INTERVAL)
+
+
+# 일괄 계산 작업 등록 (상품 id 리스트가 없으면 몬테카를로 분석 결과가 있는 모든 상품을 다시 계산)
+async def start_batch_job(productIdList: Optional[List[int]], requestId: Optional[str]) -> BatchJob:
+    if productIdList is None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(MonteCarloResult.product_id).distinct())
+            productIdList = result.scalars().all()
+    productIdList = list(dict.fromkeys(productIdList))
+
+    job = BatchJob(jobId=str(uuid.uuid4()), total=len(productIdList))
+    await save_batch_job(job)
+
+    task = asyncio.create_task(run_batch_job(job, productIdList, requestId))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    return job
+
+
+async def run_batch_job(job: BatchJob, productIdList: List[int], requestId: Optional[str]):
+    async with _batch_lock:
+        await _acquire_batch_host_lock()
+        job.status = BatchJobStatus.RUNNING
+        try:
+            await save_batch_job(job)
+            estimates = {}
+            productTerms, snapshotInputs = await prepare_batch(job, productIdList, requestId)
+            productTerms, cacheValues, previousResults = await apply_result_cache(job, productTerms, snapshotInputs)
+            await save_batch_job(job)
+
+            def progress(count: int):
+                job.completed += count
+                logger.info("몬테카를로 일괄 계산 진행: %d/%d (작업 %s)", job.completed, job.total, job.jobId)
+                _save_batch_job_later(job)
+
+            with SharedMarketSnapshot(*snapshotInputs) as snapshot:
+                for productId, estimate, error in await run_simulations(productTerms, snapshot, progress=progress):
+                    if estimate is None:
+                        logger.warning("상품 %d 몬테카를로 계산 실패: %s", productId, error)
+                        job.failedProductIds.append(productId)
+                        continue
+                    estimates[productId] = estimate
+                    if cacheValues[productId]["seed"] == getattr(previousResults.get(productId), "seed", None):
+                        job.warmStartDeltas[productId] = estimate_delta(previousResults[productId], estimate)
+                        logger.info("상품 %d 이전 결과 대비 변화량: %s", productId, job.warmStartDeltas[productId])
+
+            async with AsyncSessionLocal() as session:
+                await write_batch_results(session, estimates, job.failedProductIds, cacheValues)
+                await session.commit()
+                # 상품 단건 조회 캐시와 투자 성향 분류 색인에 새 결과를 바로 반영 (다른 곳에서 바뀐 결과는 주기적인 갱신으로 반영)
+                await refresh_derived_results(session, [], estimates)
+            job.succeeded = len(estimates) + job.cacheHits
+            job.status = BatchJobStatus.COMPLETED
+        except Exception:
+            logger.exception("몬테카를로 일괄 계산 작업 %s가 실패하였습니다.", job.jobId)
+            job.status = BatchJobStatus.FAILED
+        finally:
+            job.finishedAt = datetime.now()
+            _batch_host_lock.release()
+            await save_batch_job(job)
+
+
+# 상품 정보와 시장 데이터(현재가, 변동성, 상관계수)를 준비하고, 계산할 수 없는 상품은 실패로 기록
+async def prepare_batch(job: BatchJob, productIdList: List[int], requestId: Optional[str]):
+    semaphore = asyncio.Semaphore(product_client.maxConcurrency)
+
+    async def get_product(productId):
+        async with semaphore:
+            return await product_client.get_product(productId, requestId)
+
+    results = await asyncio.gather(*[get_product(productId) for productId in productIdList], return_exceptions=True)
+    products: Dict[int, dict] = {}
+    for productId, result in zip(productIdList, results):
+        if isinstance(result, ProductServiceServerException):
+            job.fail([productId])
+        elif isinstance(result, Exception):
+            raise result
+        else:
+            products[productId] = result
+
+    closeKeys = {closeKey for product in products.values() for closeKey in get_close_keys(product)}
+    tickerSymbols = sorted({tickerSymbol for tickerSymbol, _ in closeKeys})
+    initialCloses, recentCloses = await get_closes(closeKeys, tickerSymbols)
+
+    # 변동성과 상관계수 추정에 필요한 기간의 종가를 로컬 저장소에 채운 뒤 저장소에서 읽음
+    lookbackStart = (datetime.now().date() - timedelta(days=SIMULATION_VOLATILITY_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    if tickerSymbols:
+        await backfill({tickerSymbol: lookbackStart for tickerSymbol in tickerSymbols})
+    histories = await asyncio.to_thread(
+        lambda: {tickerSymbol: price_store.history(tickerSymbol, lookbackStart) for tickerSymbol in tickerSymbols})
+    volatilities, correlation = estimate_volatility_and_correlation(tickerSymbols, histories)
+    spots = np.array([recentCloses.get(tickerSymbol, np.nan) for tickerSymbol in tickerSymbols])
+
+    tickerIndex = {tickerSymbol: index for index, tickerSymbol in enumerate(tickerSymbols)}
+    today = datetime.now().date()
+    productTerms: List[ProductTerms] = []
+    for productId, product in products.items():
+        try:
+            terms = parse_product_terms(productId, product, tickerIndex, initialCloses, today)
+        except (KeyError, ValueError) as e:
+            logger.warning("상품 %d 몬테카를로 계산 조건을 만들 수 없습니다: %r", productId, e)
+            job.fail([productId])
+            continue
+        if np.isnan(spots[terms.tickerIndices]).any():
+            job.fail([productId])
+            continue
+        productTerms.append(terms)
+
+    return productTerms, (spots, volatilities, correlation)
+
+
+# 저장된 결과의 입력 해시와 비교해서 입력이 같은 상품은 계산에서 제외하고, 시장 데이터만 조금 바뀐 상품은 이전 난수 시드로 계산
+# (계산할 상품 조건, 상품별 캐시 컬럼 값, 저장되어 있던 결과) 반환
+async def apply_result_cache(job: BatchJob, productTerms: List[ProductTerms], snapshotInputs):
+    if not productTerms:
+        return [], {}, {}
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(MonteCarloResult)
+                                       .where(MonteCarloResult.product_id.in_([terms.productId for terms in productTerms])))
+        previousResults = {monteCarloResult.product_id: monteCarloResult for monteCarloResult in result.scalars().all()}
+
+    options = simulation_options()
+    toSimulate: List[ProductTerms] = []
+    cacheValues: Dict[int, dict] = {}
+    for terms in productTerms:
+        key = cache_key(terms, *snapshotInputs, SIMULATION_PATHS, SIMULATION_RISK_FREE_RATE, options)
+        previous = previousResults.get(terms.productId)
+        decision = result_cache.classify(key, previous)
+        if decision == HIT:
+            job.cacheHits += 1
+            job.completed += 1
+            continue
+        if decision == WARM_START:
+            job.warmStarts += 1
+            seed = previous.seed
+        else:
+            seed = key.seed
+        toSimulate.append(replace(terms, seed=seed))
+        cacheValues[terms.productId] = key.to_values(seed)
+
+    logger.info("몬테카를로 결과 재사용: %d개, 이전 시드로 계산: %d개, 새로 계산: %d개 (작업 %s)",
+                job.cacheHits, job.warmStarts, len(toSimulate) - job.warmStarts, job.jobId)
+    return toSimulate, cacheValues, previousResults
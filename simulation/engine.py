@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from simulation.sampling import PSEUDO, ANTITHETIC, SOBOL, SAMPLING_METHODS, pseudo_normals, antithetic_normals, sobol_normals
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+# 한 번에 생성하는 시간 구간의 크기 (경로 묶음의 경로 수 × 기초자산 수 × 구간 크기만큼의 난수를 한 번에 생성)
+DEFAULT_BLOCK_SIZE = 16
+# 한 번에 계산하는 경로 묶음의 크기 (적응형 계산은 묶음이 끝날 때마다 오차를 확인함)
+DEFAULT_BATCH_PATHS = 16384
+# Sobol 준난수 한 묶음의 크기 (2의 거듭제곱, 묶음마다 새로 뒤섞는 비용이 있으므로 너무 작지 않게 설정)
+SOBOL_BATCH_PATHS = 4096
+# 적응형 계산에서 오차를 확인하기 전에 필요한 최소 표본 수 (Sobol은 독립적으로 뒤섞은 준난수 묶음 수)
+MIN_SOBOL_REPLICATES = 8
+# 95% 신뢰구간
+DEFAULT_CONFIDENCE_Z = 1.96
+
+
+# 몬테카를로 시뮬레이션 입력
+# - initialRatios: 기초자산별 현재 가격 / 최초기준가격
+# - volatilities: 기초자산별 연 변동성, correlation: 기초자산 간 상관계수 행렬
+# - evaluationSteps: 오늘부터 각 조기상환 평가일까지의 거래일 수 (마지막 값은 만기 평가일)
+# - redemptionBarriers: 평가일별 상환 배리어 (최초기준가격 대비 %, 마지막 값은 만기 상환 배리어)
+# - knockInBarrier: 낙인 배리어 (최초기준가격 대비 %, 낙인 조건이 없는 상품은 None)
+@dataclass
+class MonteCarloInputs:
+    initialRatios: np.ndarray
+    volatilities: np.ndarray
+    correlation: np.ndarray
+    riskFreeRate: float
+    evaluationSteps: np.ndarray
+    redemptionBarriers: np.ndarray
+    knockInBarrier: Optional[float] = None
+
+
+# 몬테카를로 시뮬레이션 결과 (모든 확률과 표준오차는 %)
+@dataclass
+class MonteCarloEstimate:
+    earlyRepaymentProbabilities: List[float]
+    maturityRepaymentProbability: float
+    lossProbability: float
+    underKnockInBarrierProbability: float
+    paths: int
+    earlyRepaymentStandardErrors: List[float] = field(default_factory=list)
+    maturityRepaymentStandardError: float = 0.0
+    lossStandardError: float = 0.0
+    underKnockInBarrierStandardError: float = 0.0
+
+
+# 상관관계가 있는 기하 브라운 운동 경로를 고정된 크기의 경로 묶음(batchPaths) 단위로 생성하고, 상품의 조기상환/만기상환/낙인 여부를 판정
+# 경로별 반복문 없이 경로 묶음과 시간 구간(blockSize) 단위로만 반복하며, 경로 묶음마다 판정에 필요한 상태(상환된 평가일, 낙인 여부,
+# 만기 평가일의 가장 낮은 비율)만 유지하고 경로 묶음이 끝나면 합계만 누적하므로, 최대 메모리 사용량은 전체 경로 수와 관계없이
+# 경로 묶음 크기 × 시간 구간 크기 × 기초자산 수에 비례함 (Sobol은 브라운 브리지를 위해 경로 묶음 전체 기간의 난수를 한 번에 생성)
+# 낙인 조건이 없는 상품은 매일의 가격이 필요 없으므로 평가일 사이를 한 번에 이동함
+# - sampling: 난수 생성 방식 (simulation.sampling 참고)
+# - controlVariate: 만기 시점 기초자산 할인 가격(기댓값 = 현재 가격 / 최초기준가격)을 제어 변량으로 사용해서 확률 추정치를 보정
+# - tolerance: 지정하면 모든 확률의 신뢰구간 반폭이 tolerance(%p) 이하가 되는 즉시 계산을 멈춤 (paths는 최대 경로 수)
+# 계산하는 경로 수는 paths를 넘지 않음 (대조 변량은 짝수로, Sobol은 준난수 묶음 크기(2의 거듭제곱)의 배수로 내림하며,
+# 실제로 계산한 경로 수는 결과의 paths로 반환)
+# - dtype: 경로 계산 정밀도 (np.float32를 사용하면 경로 묶음의 메모리 사용량이 절반으로 줄어듦)
+def simulate(inputs: MonteCarloInputs, paths: int = 100_000, seed: Optional[int] = None,
+             blockSize: int = DEFAULT_BLOCK_SIZE, sampling: str = PSEUDO, controlVariate: bool = False,
+             tolerance: Optional[float] = None, confidenceZ: float = DEFAULT_CONFIDENCE_Z,
+             batchPaths: int = DEFAULT_BATCH_PATHS, dtype=np.float64) -> MonteCarloEstimate:
+    if sampling not in SAMPLING_METHODS:
+        raise ValueError(f"지원하지 않는 난수 생성 방식입니다: {sampling}")
+
+    rng = np.random.default_rng(seed)
+    evaluationSteps = np.asarray(inputs.evaluationSteps, dtype=np.int64)
+
+    # 시간 격자 (낙인 감시가 필요하면 매 거래일, 아니면 평가일만)
+    if inputs.knockInBarrier is not None:
+        gridSteps = np.arange(1, evaluationSteps[-1] + 1)
+    else:
+        gridSteps = evaluationSteps
+    gridTimes = gridSteps / TRADING_DAYS_PER_YEAR
+
+    minPaths = 2 if sampling == ANTITHETIC else 1
+    if paths < minPaths:
+        raise ValueError(f"경로 수는 {minPaths} 이상이어야 합니다: {paths}")
+
+    if sampling == SOBOL:
+        # 준난수 묶음마다 같은 크기를 사용해야 묶음의 평균을 같은 가중치의 표본으로 사용할 수 있음
+        batchPaths = min(SOBOL_BATCH_PATHS, _floor_power_of_two(batchPaths), _floor_power_of_two(paths))
+        paths, minUnits = paths - paths % batchPaths, MIN_SOBOL_REPLICATES
+    else:
+        if sampling == ANTITHETIC:
+            paths -= paths % 2
+            batchPaths -= batchPaths % 2
+        batchPaths, minUnits = max(min(batchPaths, paths), minPaths), 2
+
+    statistics = _Statistics(len(evaluationSteps) + 2, controlVariate,
+                             expectedControl=float(np.mean(inputs.initialRatios)))
+    simulatedPaths = 0
+    while simulatedPaths < paths:
+        if sampling == PSEUDO:
+            batchPaths = min(batchPaths, paths - simulatedPaths)
+            normals = pseudo_normals(rng, len(gridSteps), len(inputs.volatilities), batchPaths, blockSize, dtype)
+        elif sampling == ANTITHETIC:
+            batchPaths = min(batchPaths, paths - simulatedPaths)
+            normals = antithetic_normals(rng, len(gridSteps), len(inputs.volatilities), batchPaths, blockSize, dtype)
+        else:
+            normals = sobol_normals(rng, gridTimes, len(inputs.volatilities), batchPaths, blockSize, dtype)
+
+        indicators, control = simulate_batch(inputs, gridSteps, normals, batchPaths, dtype)
+        simulatedPaths += batchPaths
+
+        # 서로 독립인 표본 단위로 모아서 표준오차 계산 (대조 변량은 경로 쌍의 평균, Sobol은 준난수 묶음의 평균)
+        if sampling == ANTITHETIC:
+            half = batchPaths // 2
+            indicators = (indicators[:, :half] + indicators[:, half:]) / 2
+            control = (control[:half] + control[half:]) / 2
+        elif sampling == SOBOL:
+            indicators = indicators.mean(axis=1, keepdims=True)
+            control = control.mean(keepdims=True)
+        statistics.add(indicators, control)
+
+        if tolerance is not None and statistics.units >= minUnits:
+            _, standardErrors = statistics.estimate()
+            if confidenceZ * standardErrors.max() * 100 <= tolerance:
+                break
+
+    probabilities, standardErrors = statistics.estimate()
+    probabilities, standardErrors = (np.clip(probabilities, 0, 1) * 100).tolist(), (standardErrors * 100).tolist()
+    return MonteCarloEstimate(
+        earlyRepaymentProbabilities=probabilities[:-3],
+        maturityRepaymentProbability=probabilities[-3],
+        lossProbability=probabilities[-2],
+        underKnockInBarrierProbability=probabilities[-1],
+        paths=simulatedPaths,
+        earlyRepaymentStandardErrors=standardErrors[:-3],
+        maturityRepaymentStandardError=standardErrors[-3],
+        lossStandardError=standardErrors[-2],
+        underKnockInBarrierStandardError=standardErrors[-1]
+    )
+
+
+def _floor_power_of_two(value: int) -> int:
+    return 1 << (value.bit_length() - 1)
+
+
+# 경로 묶음 하나를 시간 순서대로 생성하면서 경로별 상태만 갱신하고, 경로별 판정 결과(조기상환 평가일별, 만기상환, 손실, 낙인 여부 × 경로)와
+# 제어 변량(만기 시점 기초자산 할인 가격의 평균)을 반환
+# - redeemedAt: 조기상환된 평가일 (조기상환되지 않았으면 -1)
+# - knockedIn: 상환 시점(조기상환되지 않은 경로는 만기)까지 낙인 배리어 아래로 내려간 적이 있는지 여부
+# - terminalWorst: 만기 평가일의 가장 낮은 비율 (로그)
+def simulate_batch(inputs: MonteCarloInputs, gridSteps: np.ndarray, normals, paths: int, dtype=np.float64):
+    evaluationSteps = np.asarray(inputs.evaluationSteps, dtype=np.int64)
+    evaluationCount = len(evaluationSteps)
+    volatilities = np.asarray(inputs.volatilities, dtype=np.float64)
+    cholesky = np.linalg.cholesky(np.asarray(inputs.correlation, dtype=np.float64))
+    monitorKnockIn = inputs.knockInBarrier is not None
+    gridDays = np.diff(gridSteps, prepend=0) / TRADING_DAYS_PER_YEAR
+    evaluationIndices = np.searchsorted(gridSteps, evaluationSteps)
+    logBarriers = np.log(np.asarray(inputs.redemptionBarriers, dtype=np.float64) / 100).astype(dtype)
+    logKnockIn = dtype(np.log(inputs.knockInBarrier / 100)) if monitorKnockIn else None
+
+    # 기초자산 가격은 최초기준가격 대비 비율의 로그 값으로 다루며, 기초자산별 경로가 연속된 메모리에 놓이도록 (기초자산, 경로) 순서로 보관
+    # (가장 낮은 비율 = 기초자산 축의 로그 값 최솟값)
+    logRatios = np.repeat(np.log(np.asarray(inputs.initialRatios, dtype=np.float64))[:, None], paths, axis=1).astype(dtype)
+    drift = (inputs.riskFreeRate - 0.5 * volatilities ** 2)
+    diffusion = (cholesky * volatilities[:, None]).astype(dtype)
+
+    redeemedAt = np.full(paths, -1, dtype=np.int16)
+    knockedIn = (logRatios.min(axis=0) < logKnockIn) if monitorKnockIn else np.zeros(paths, dtype=bool)
+    terminalWorst = None
+    nextEvaluation = 0
+
+    blockStart = 0
+    for blockNormals in normals:
+        dt = gridDays[blockStart:blockStart + len(blockNormals)]
+        increments = diffusion @ blockNormals
+        increments *= np.sqrt(dt).astype(dtype)[:, None, None]
+        increments += (dt[:, None] * drift).astype(dtype)[:, :, None]
+        blockLogRatios = np.cumsum(increments, axis=0, out=increments)
+        blockLogRatios += logRatios
+        worst = np.minimum.reduce(blockLogRatios, axis=1)
+        logRatios = blockLogRatios[-1].copy()
+
+        # 평가일 사이 구간마다 아직 상환되지 않은 경로의 낙인 여부를 갱신한 뒤 평가일의 상환 여부를 판정
+        segmentStart = 0
+        while nextEvaluation < evaluationCount and evaluationIndices[nextEvaluation] < blockStart + len(dt):
+            offset = evaluationIndices[nextEvaluation] - blockStart
+            if monitorKnockIn:
+                knockedIn |= (worst[segmentStart:offset + 1].min(axis=0) < logKnockIn) & (redeemedAt < 0)
+            if nextEvaluation < evaluationCount - 1:
+                redeemedAt[(redeemedAt < 0) & (worst[offset] >= logBarriers[nextEvaluation])] = nextEvaluation
+            else:
+                terminalWorst = worst[offset].copy()
+            segmentStart = offset + 1
+            nextEvaluation += 1
+        if monitorKnockIn and segmentStart < len(dt):
+            knockedIn |= (worst[segmentStart:].min(axis=0) < logKnockIn) & (redeemedAt < 0)
+        blockStart += len(dt)
+
+    # 만기 상환 배리어 이상이거나, 낙인 조건이 있는 상품 중 낙인이 발생하지 않은 경로는 만기상환
+    earlyRedeemed = redeemedAt >= 0
+    remaining = ~earlyRedeemed
+    maturityRepaid = remaining & ((terminalWorst >= logBarriers[-1]) | (monitorKnockIn & ~knockedIn))
+    lost = remaining & ~maturityRepaid
+
+    indicators = np.zeros((evaluationCount + 2, paths))
+    indicators[redeemedAt[earlyRedeemed], np.flatnonzero(earlyRedeemed)] = 1.0
+    indicators[-3] = maturityRepaid
+    indicators[-2] = lost
+    indicators[-1] = knockedIn
+
+    maturity = gridDays.sum()
+    control = np.exp(logRatios.astype(np.float64) - inputs.riskFreeRate * maturity).mean(axis=0)
+    return indicators, control
+
+
+# 표본 단위 판정 결과의 합계만 누적해서 확률과 표준오차를 계산
+# 제어 변량을 사용하면 확률별로 최적 계수 beta = cov(X, C) / var(C)로 X - beta * (C - E[C])의 평균을 추정치로 사용
+class _Statistics:
+    def __init__(self, size: int, controlVariate: bool, expectedControl: float):
+        self.controlVariate = controlVariate
+        self.expectedControl = expectedControl
+        self.units = 0
+        self._sum = np.zeros(size)
+        self._squareSum = np.zeros(size)
+        self._controlSum = 0.0
+        self._controlSquareSum = 0.0
+        self._crossSum = np.zeros(size)
+
+    def add(self, indicators: np.ndarray, control: np.ndarray):
+        self.units += indicators.shape[1]
+        self._sum += indicators.sum(axis=1)
+        self._squareSum += np.einsum("ij,ij->i", indicators, indicators)
+        self._controlSum += control.sum()
+        self._controlSquareSum += control @ control
+        self._crossSum += indicators @ control
+
+    def estimate(self):
+        mean = self._sum / self.units
+        variance = self._squareSum / self.units - mean ** 2
+        if self.controlVariate:
+            controlMean = self._controlSum / self.units
+            controlVariance = self._controlSquareSum / self.units - controlMean ** 2
+            if controlVariance > 0:
+                covariance = self._crossSum / self.units - mean * controlMean
+                beta = covariance / controlVariance
+                mean = mean - beta * (controlMean - self.expectedControl)
+                variance = variance - covariance ** 2 / controlVariance
+        if self.units < 2:
+            return mean, np.zeros_like(mean)
+        standardErrors = np.sqrt(np.clip(variance, 0, None) / (self.units - 1))
+        return mean, standardErrors
+
+
+# 평가일별 조기상환 확률을 monte_carlo_result.early_repayment_probability 형식(쉼표로 구분된 %)으로 변환
+def format_early_repayment_probability(probabilities: List[float]) -> str:
+    return ",".join(f"{probability:.4f}" for probability in probabilities)
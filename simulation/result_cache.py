@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+from simulation.batch import ProductTerms
+from simulation.engine import MonteCarloEstimate
+from models import MonteCarloResult
+import numpy as np
+import threading
+import hashlib
+import json
+import os
+
+load_dotenv()
+
+# 입력값을 해시하기 전에 반올림하는 소수점 자리수 (이보다 작은 변동은 같은 입력으로 보고 저장된 결과를 재사용)
+SIMULATION_CACHE_DECIMALS = int(os.getenv('SIMULATION_CACHE_DECIMALS', 6))
+# 상품 조건과 계산 설정이 같고 시장 데이터 변동이 아래 허용 범위 안이면 이전 계산의 난수 시드를 재사용
+# (변동성과 상관계수는 매일 최근 기간의 종가로 다시 추정하므로 조금씩 바뀌는 것을 허용함)
+# - SIMULATION_WARM_START_SPOT_TOLERANCE: 기초자산별 현재가 비율의 상대 변동
+# - SIMULATION_WARM_START_VOLATILITY_TOLERANCE: 기초자산별 변동성의 상대 변동
+# - SIMULATION_WARM_START_CORRELATION_TOLERANCE: 기초자산 쌍별 상관계수의 절대 변동
+SIMULATION_WARM_START_SPOT_TOLERANCE = float(os.getenv('SIMULATION_WARM_START_SPOT_TOLERANCE', 0.05))
+SIMULATION_WARM_START_VOLATILITY_TOLERANCE = float(os.getenv('SIMULATION_WARM_START_VOLATILITY_TOLERANCE', 0.1))
+SIMULATION_WARM_START_CORRELATION_TOLERANCE = float(os.getenv('SIMULATION_WARM_START_CORRELATION_TOLERANCE', 0.1))
+# 계산 방식이 바뀌어 이전 결과를 재사용하면 안 되는 경우 값을 올림
+CACHE_KEY_VERSION = 2
+
+# 저장된 결과와의 비교 결과
+# - hit: 입력이 같으므로 저장된 결과를 그대로 사용
+# - warm start: 시장 데이터만 조금 바뀌었으므로 이전 난수 시드로 다시 계산 (공통 난수로 이전 결과와의 차이를 낮은 분산으로 추정)
+# - miss: 입력 해시로 정한 새 난수 시드로 계산
+HIT = "hit"
+WARM_START = "warmStart"
+MISS = "miss"
+
+
+# 몬테카를로 계산 입력의 해시
+# - inputHash: 상품 조건, 시장 데이터(현재가 비율, 변동성, 상관계수), 계산 설정(무위험 이자율, 경로 수 등) 전체
+# - termsHash: 상품 조건과 계산 설정 (시장 데이터는 해시하지 않고 저장된 값과의 차이를 허용 범위로 비교)
+# - spotRatios, volatilities, correlations: 상품 기초자산의 현재가 비율, 변동성, 상관계수 (상관계수는 기초자산 쌍별 값)
+@dataclass
+class CacheKey:
+    inputHash: str
+    termsHash: str
+    spotRatios: List[float]
+    volatilities: List[float] = field(default_factory=list)
+    correlations: List[float] = field(default_factory=list)
+
+    # 새로 계산하는 상품의 난수 시드 (같은 입력은 항상 같은 결과가 나오도록 입력 해시로 정함)
+    @property
+    def seed(self) -> int:
+        return int(self.inputHash[:15], 16)
+
+    def to_values(self, seed: int) -> dict:
+        return {"input_hash": self.inputHash,
+                "terms_hash": self.termsHash,
+                "spot_ratios": format_market_values(self.spotRatios),
+                "volatilities": format_market_values(self.volatilities),
+                "correlations": format_market_values(self.correlations),
+                "seed": seed}
+
+
+def cache_key(terms: ProductTerms, spots: np.ndarray, volatilities: np.ndarray, correlation: np.ndarray,
+              paths: int, riskFreeRate: float, simulationOptions: dict) -> CacheKey:
+    tickerIndices = np.asarray(terms.tickerIndices)
+    spotRatios = _round(spots[tickerIndices] / np.asarray(terms.initialCloses))
+    productVolatilities = _round(volatilities[tickerIndices])
+    productCorrelation = correlation[np.ix_(tickerIndices, tickerIndices)]
+    correlations = _round(productCorrelation[np.triu_indices(len(tickerIndices), k=1)])
+    inputs = {
+        "version": CACHE_KEY_VERSION,
+        "evaluationSteps": [int(step) for step in terms.evaluationSteps],
+        "redemptionBarriers": _round(terms.redemptionBarriers),
+        "knockInBarrier": terms.knockInBarrier,
+        "riskFreeRate": round(riskFreeRate, SIMULATION_CACHE_DECIMALS),
+        "paths": paths,
+        "options": {name: (np.dtype(value).name if name == "dtype" else value)
+                    for name, value in simulationOptions.items()},
+    }
+    termsHash = _hash(inputs)
+    inputHash = _hash({**inputs, "spotRatios": spotRatios, "volatilities": productVolatilities,
+                       "correlations": correlations})
+    return CacheKey(inputHash=inputHash, termsHash=termsHash, spotRatios=spotRatios,
+                    volatilities=productVolatilities, correlations=correlations)
+
+
+def _round(values) -> List[float]:
+    return np.round(np.asarray(values, dtype=float), SIMULATION_CACHE_DECIMALS).tolist()
+
+
+def _hash(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+# 현재가 비율, 변동성, 상관계수 컬럼 값 (쉼표로 구분)
+def format_market_values(values: List[float]) -> str:
+    return ",".join(f"{value:.{SIMULATION_CACHE_DECIMALS}f}" for value in values)
+
+
+def parse_market_values(value: Optional[str]) -> List[float]:
+    return [float(item) for item in value.split(",")] if value else []
+
+
+# 이전 결과 대비 확률 변화량 (%p)
+def estimate_delta(previous: MonteCarloResult, estimate: MonteCarloEstimate) -> Dict[str, float]:
+    previousEarly = [float(probability) for probability in previous.early_repayment_probability.split(",")]
+    return {
+        "earlyRepaymentProbability": round(sum(estimate.earlyRepaymentProbabilities) - sum(previousEarly), 4),
+        "maturityRepaymentProbability": round(estimate.maturityRepaymentProbability - float(previous.maturity_repayment_probability), 4),
+        "lossProbability": round(estimate.lossProbability - float(previous.loss_probability), 4),
+        "underKnockInBarrierProbability": round(estimate.underKnockInBarrierProbability - float(previous.under_knockin_barrier_probability), 4),
+    }
+
+
+# 몬테카를로 계산 결과 캐시 (결과는 monte_carlo_result 테이블에 입력 해시와 함께 저장되며, 여기서는 분류와 적중률만 관리)
+class ResultCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "hits": 0,
+            "warmStarts": 0,
+            "misses": 0,
+        }
+
+    def classify(self, key: CacheKey, previous: Optional[MonteCarloResult]) -> str:
+        if previous is None or previous.input_hash is None:
+            decision = MISS
+        elif previous.input_hash == key.inputHash:
+            decision = HIT
+        elif previous.terms_hash == key.termsHash and previous.seed is not None and _market_moved_within(previous, key):
+            decision = WARM_START
+        else:
+            decision = MISS
+
+        with self._lock:
+            self._stats[{HIT: "hits", WARM_START: "warmStarts", MISS: "misses"}[decision]] += 1
+        return decision
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["hits"] + stats["warmStarts"] + stats["misses"]
+        stats["hitRate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._reset_stats()
+
+
+def _market_moved_within(previous: MonteCarloResult, key: CacheKey) -> bool:
+    return _moved_within(parse_market_values(previous.spot_ratios), key.spotRatios, SIMULATION_WARM_START_SPOT_TOLERANCE) and \
+        _moved_within(parse_market_values(previous.volatilities), key.volatilities,
+                      SIMULATION_WARM_START_VOLATILITY_TOLERANCE) and \
+        _moved_within(parse_market_values(previous.correlations), key.correlations,
+                      SIMULATION_WARM_START_CORRELATION_TOLERANCE, relative=False)
+
+
+# 저장된 값과 현재 값의 차이가 모두 허용 범위 안인지 여부 (저장된 값의 개수가 다르면(이전 버전에서 저장한 결과 등) 범위 밖으로 봄)
+def _moved_within(previous: List[float], current: List[float], tolerance: float, relative: bool = True) -> bool:
+    if len(previous) != len(current):
+        return False
+    previous, current = np.asarray(previous), np.asarray(current)
+    moved = np.abs(current / previous - 1) if relative else np.abs(current - previous)
+    return bool(np.all(moved <= tolerance))
+
+
+result_cache = ResultCache()
@@ -0,0 +1,46 @@
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Dict, List, Optional
+from simulation.engine import MonteCarloEstimate, format_early_repayment_probability
+from core.result_ingestion import upsert_monte_carlo_results
+from models import MonteCarloResult, MonteCarloResultError
+
+
+def to_monte_carlo_values(estimate: MonteCarloEstimate) -> dict:
+    return {
+        "early_repayment_probability": format_early_repayment_probability(estimate.earlyRepaymentProbabilities),
+        "maturity_repayment_probability": round(estimate.maturityRepaymentProbability, 4),
+        "loss_probability": round(estimate.lossProbability, 4),
+        "under_knockin_barrier_probability": round(estimate.underKnockInBarrierProbability, 4),
+        "early_repayment_standard_error": format_early_repayment_probability(estimate.earlyRepaymentStandardErrors),
+        "maturity_repayment_standard_error": round(estimate.maturityRepaymentStandardError, 4),
+        "loss_standard_error": round(estimate.lossStandardError, 4),
+        "under_knockin_barrier_standard_error": round(estimate.underKnockInBarrierStandardError, 4)
+    }
+
+
+def to_monte_carlo_result(productId: int, estimate: MonteCarloEstimate) -> MonteCarloResult:
+    return MonteCarloResult(product_id=productId, **to_monte_carlo_values(estimate))
+
+
+# 상품의 몬테카를로 분석 결과 저장 (이미 결과가 있는 상품은 기존 결과를 갱신)
+async def save_monte_carlo_result(session: AsyncSession, productId: int, estimate: MonteCarloEstimate) -> MonteCarloResult:
+    await upsert_monte_carlo_results(session, [{"product_id": productId, **to_monte_carlo_values(estimate)}])
+    result = await session.execute(select(MonteCarloResult).where(MonteCarloResult.product_id == productId))
+    return result.scalars().one()
+
+
+# 일괄 계산 결과를 한 번에 저장
+# 결과는 product_id 기준으로 여러 행을 한 번에 추가/갱신하고, 계산에 실패한 상품은 monte_carlo_result_error에 기록
+# cacheValues: 상품별 입력 해시, 시장 데이터(현재가 비율, 변동성, 상관계수), 난수 시드 컬럼 값
+async def write_batch_results(session: AsyncSession, estimates: Dict[int, MonteCarloEstimate], failedProductIds: List[int],
+                              cacheValues: Optional[Dict[int, dict]] = None):
+    cacheValues = cacheValues or {}
+    if estimates:
+        await upsert_monte_carlo_results(session, [{"product_id": productId, **to_monte_carlo_values(estimate),
+                                                    **cacheValues.get(productId, {})}
+                                                   for productId, estimate in estimates.items()])
+
+    if failedProductIds:
+        await session.execute(insert(MonteCarloResultError), [{"product_id": productId} for productId in failedProductIds])
@@ -0,0 +1,89 @@
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+
+# 표준정규난수 생성 방식
+# - pseudo: 의사 난수
+# - antithetic: 대조 변량 (난수 z와 -z로 두 경로를 만들어 경로 쌍의 평균을 하나의 표본으로 사용)
+# - sobol: 뒤섞은(scrambled) Sobol 준난수 + 브라운 브리지 (낮은 차원의 준난수가 경로의 큰 움직임을 결정하도록 구성하며,
+#          독립적으로 뒤섞은 준난수 묶음의 평균을 하나의 표본으로 사용)
+PSEUDO = "pseudo"
+ANTITHETIC = "antithetic"
+SOBOL = "sobol"
+SAMPLING_METHODS = (PSEUDO, ANTITHETIC, SOBOL)
+
+# scipy Sobol 생성기가 지원하는 최대 차원 (시간 격자 수 × 기초자산 수)
+SOBOL_MAX_DIMENSION = 21201
+
+
+def pseudo_normals(rng: np.random.Generator, stepCount: int, assetCount: int, paths: int,
+                   blockSize: int, dtype=np.float64) -> Iterator[np.ndarray]:
+    for blockStart in range(0, stepCount, blockSize):
+        yield rng.standard_normal((min(blockSize, stepCount - blockStart), assetCount, paths), dtype=dtype)
+
+
+# 앞 절반 경로의 난수 z에 대해 뒤 절반 경로는 -z를 사용 (paths는 짝수)
+def antithetic_normals(rng: np.random.Generator, stepCount: int, assetCount: int, paths: int,
+                       blockSize: int, dtype=np.float64) -> Iterator[np.ndarray]:
+    for normals in pseudo_normals(rng, stepCount, assetCount, paths // 2, blockSize, dtype):
+        yield np.concatenate([normals, -normals], axis=2)
+
+
+# 경로 묶음 전체 기간의 난수를 한 번에 만들며 (메모리 사용량은 경로 묶음 크기 × 시간 격자 수 × 기초자산 수에 비례),
+# 준난수 → 정규분포 변환과 브라운 브리지 증분 계산은 각각 하나의 배열 안에서 처리
+def sobol_normals(rng: np.random.Generator, gridTimes: np.ndarray, assetCount: int, paths: int,
+                  blockSize: int, dtype=np.float64) -> Iterator[np.ndarray]:
+    stepCount = len(gridTimes)
+    if stepCount * assetCount > SOBOL_MAX_DIMENSION:
+        raise ValueError(f"Sobol 준난수는 {SOBOL_MAX_DIMENSION}차원까지만 생성할 수 있습니다.")
+
+    # scipy.stats는 import가 오래 걸리므로 서비스 시작 시간에 포함되지 않도록 Sobol 준난수를 처음 만들 때 import
+    from scipy.stats import qmc
+    from scipy.special import ndtri
+
+    sobol = qmc.Sobol(d=stepCount * assetCount, scramble=True, seed=rng)
+    uniforms = sobol.random(paths)
+    np.clip(uniforms, 1e-12, 1 - 1e-12, out=uniforms)
+    normals = ndtri(uniforms, out=uniforms).reshape(paths, stepCount, assetCount).transpose(1, 2, 0)
+    increments = brownian_bridge(normals, gridTimes, dtype)
+    del uniforms, normals
+    for blockStart in range(0, stepCount, blockSize):
+        yield increments[blockStart:blockStart + blockSize]
+
+
+# 브라운 브리지 생성 순서: 만기 시점을 먼저 정하고, 이미 정해진 두 시점 사이의 가운데 시점을 차례로 정함
+# (생성할 시점, 왼쪽 시점, 오른쪽 시점) 리스트 (왼쪽 시점이 -1이면 0 시점, 오른쪽 시점이 None이면 만기 시점 자체)
+def bridge_order(stepCount: int) -> List[Tuple[int, int, Optional[int]]]:
+    order = [(stepCount - 1, -1, None)]
+    intervals = [(-1, stepCount - 1)]
+    while intervals:
+        nextIntervals = []
+        for left, right in intervals:
+            if right - left < 2:
+                continue
+            middle = (left + right) // 2
+            order.append((middle, left, right))
+            nextIntervals += [(left, middle), (middle, right)]
+        intervals = nextIntervals
+    return order
+
+
+# 생성 순서대로 배치된 표준정규난수(시간 격자 × 기초자산 × 경로)로 브라운 운동을 만들고,
+# 각 시간 구간의 증분을 구간 길이로 나눠서 다시 표준정규난수 형태로 반환
+def brownian_bridge(normals: np.ndarray, gridTimes: np.ndarray, dtype=np.float64) -> np.ndarray:
+    brownian = np.empty(normals.shape, dtype=dtype)
+    for k, (index, left, right) in enumerate(bridge_order(len(gridTimes))):
+        leftTime = gridTimes[left] if left >= 0 else 0.0
+        leftValue = brownian[left] if left >= 0 else 0.0
+        if right is None:
+            brownian[index] = leftValue + np.sqrt(gridTimes[index] - leftTime) * normals[k]
+            continue
+        rightTime = gridTimes[right]
+        weight = (gridTimes[index] - leftTime) / (rightTime - leftTime)
+        deviation = np.sqrt((gridTimes[index] - leftTime) * (rightTime - gridTimes[index]) / (rightTime - leftTime))
+        brownian[index] = leftValue + weight * (brownian[right] - leftValue) + deviation * normals[k]
+
+    # 뒤에서부터 바로 앞 시점의 값을 빼서 증분으로 변환 (별도의 증분 배열을 만들지 않음)
+    for index in range(len(gridTimes) - 1, 0, -1):
+        brownian[index] -= brownian[index - 1]
+    brownian /= np.sqrt(np.diff(gridTimes, prepend=0.0))[:, None, None]
+    return brownian
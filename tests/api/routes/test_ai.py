@@ -0,0 +1,49 @@
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert
+from main import app
+from models import AIResult
+from core.response_format import FAST_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+import msgpack
+import pytest
+
+
+# AI 분석 결과 일괄 조회 api - 필요한 컬럼만 조회해서 결과와 결과가 없는 상품 id를 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_ai_bulk(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(AIResult), [{"ai_result_id": 1, "product_id": 7, "repayment_prediction": True,
+                                                       "safety_score": 0.75}])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/ai/bulk", json={"productIdList": [7, 8]})
+        listResponse = await ac.post("/v1/ai/list", json={"productIdList": [7, 8]})
+
+    # then
+    assert response.json() == {"results": [{"AIResultId": 1, "productId": 7, "repaymentPrediction": True, "safetyScore": 0.75}],
+                               "missingProductIdList": [8]}
+    assert listResponse.json() == [{"AIResultId": 1, "productId": 7, "safetyScore": 0.75}]
+
+
+# AI 분석 결과 리스트 api - Accept 헤더에 따라 검증 없는 JSON과 필드별 배열 msgpack으로 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_ai_list_negotiates_bulk_media_type(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(AIResult), [{"ai_result_id": productId * 10, "product_id": productId,
+                                                       "repayment_prediction": True, "safety_score": productId / 10}
+                                                      for productId in (1, 2, 3)])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        default = await ac.post("/v1/ai/list", json={"productIdList": [1, 2, 3]})
+        fastJson = await ac.post("/v1/ai/list", json={"productIdList": [1, 2, 3]}, headers={"Accept": FAST_JSON_MEDIA_TYPE})
+        columnar = await ac.post("/v1/ai/list", json={"productIdList": [1, 2, 3]},
+                                 headers={"Accept": f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.5"})
+
+    # then
+    assert default.headers["content-type"] == "application/json"
+    assert fastJson.headers["content-type"] == FAST_JSON_MEDIA_TYPE
+    assert fastJson.json() == default.json()
+    assert columnar.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(columnar.content) == {"AIResultId": [10, 20, 30], "productId": [1, 2, 3],
+                                                 "safetyScore": [0.1, 0.2, 0.3]}
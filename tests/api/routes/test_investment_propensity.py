@@ -0,0 +1,177 @@
+from unittest.mock import patch
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from api.routes.investment_propensity import get_product_ids_by_repayment_option, get_product_ids_by_investment_propensity, \
+    query_product_ids_by_investment_propensity
+from util.repayment_option import RepaymentOption
+from util.risk_propensity import RiskPropensity
+from httpx import AsyncClient, ASGITransport
+from main import app
+from core.config import PropensityBoundaries
+from core.propensity_index import propensity_index, PropensityIndex
+from core.database import Base
+from core.response_format import MSGPACK_MEDIA_TYPE
+import msgpack
+from models import AIResult, MonteCarloResult, MonteCarloEarlyRepayment
+import pytest
+
+boundaries = PropensityBoundaries(extremeAndHighRisk=0.3, highAndMediumRisk=0.6, mediumAndLowRisk=0.8,
+                                  earlyRepayment=50, maturityRepayment=10)
+
+
+# 조기상환 성향 - 첫 두 평가일의 조기상환 확률 합이 기준(EARLY_REPAYMENT_BOUNDARY) 이상인 상품만 조회하는지 확인
+def test_get_product_ids_by_early_repayment_option():
+    # given
+    engine = create_engine("sqlite://")
+    MonteCarloEarlyRepayment.__table__.create(engine)
+    probabilities = {1: [30.0, 25.0, 10.0],
+                     2: [20.0, 20.0, 40.0],
+                     # 조기상환 평가일이 하나뿐인 상품
+                     3: [55.0],
+                     4: [60.0, 5.0]}
+    with Session(engine) as session:
+        session.execute(insert(MonteCarloEarlyRepayment),
+                        [{"monte_carlo_early_repayment_id": productId * 10 + index, "monte_carlo_result_id": productId,
+                          "product_id": productId, "redemption_index": index, "probability": probability}
+                         for productId, values in probabilities.items() for index, probability in enumerate(values)])
+
+        # when
+        productIds = session.execute(get_product_ids_by_repayment_option([1, 2, 3], RepaymentOption.EARLY_REPAYMENT,
+                                                                                 boundaries)).scalars().all()
+
+    # then
+    assert sorted(productIds) == [1, 3]
+
+
+# 투자 성향 - 위험 성향(안전 점수 범위)과 상환 성향을 한 번의 조인 쿼리로 함께 만족하는 상품만 조회하는지 확인
+def test_get_product_ids_by_investment_propensity():
+    # given
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[AIResult.__table__, MonteCarloResult.__table__, MonteCarloEarlyRepayment.__table__])
+    # 상품 id: (안전 점수, 손실 확률, 조기상환 확률)
+    products = {1: (0.7, 5.0, [40.0, 20.0]),
+                2: (0.65, 20.0, [10.0, 10.0]),
+                3: (0.9, 5.0, [60.0, 10.0]),
+                4: (0.7, 8.0, [20.0, 20.0])}
+    with Session(engine) as session:
+        session.execute(insert(AIResult), [{"ai_result_id": productId, "product_id": productId, "repayment_prediction": True,
+                                            "safety_score": score} for productId, (score, _, _) in products.items()])
+        session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId, "product_id": productId,
+                                                    "early_repayment_probability": "", "maturity_repayment_probability": 0,
+                                                    "loss_probability": loss, "under_knockin_barrier_probability": 0}
+                                                   for productId, (_, loss, _) in products.items()])
+        session.execute(insert(MonteCarloEarlyRepayment),
+                        [{"monte_carlo_early_repayment_id": productId * 10 + index, "monte_carlo_result_id": productId,
+                          "product_id": productId, "redemption_index": index, "probability": probability}
+                         for productId, (_, _, values) in products.items() for index, probability in enumerate(values)])
+
+        # when
+        def query(repaymentOption):
+            return sorted(session.execute(get_product_ids_by_investment_propensity(
+                [1, 2, 3, 4], RiskPropensity.MEDIUM_RISK, repaymentOption, boundaries)).scalars().all())
+
+        early, maturity, noPreference = query(RepaymentOption.EARLY_REPAYMENT), \
+            query(RepaymentOption.MATURITY_REPAYMENT), query(RepaymentOption.NO_PREFERENCE)
+
+    # then
+    assert early == [1]
+    assert maturity == [1, 4]
+    assert noPreference == [1, 2, 4]
+
+
+# 투자 성향에 만족하는 상품 id 리스트 api - 분류 색인이 준비되어 있으면 색인으로 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_satisfied_investment_propensity_products_from_index(monkeypatch):
+    # given
+    monkeypatch.setattr('core.propensity_index.get_propensity_boundaries', lambda: boundaries)
+    propensity_index.update_ai_results({1: [0.7], 2: [0.7], 3: [0.2]})
+    propensity_index.update_monte_carlo_results({1: [5.0], 2: [30.0], 3: [5.0]}, {1: [55.0], 2: [80.0], 3: [60.0]})
+    propensity_index.ready = True
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/investment-propensity/list",
+                                 json={"productIdList": [3, 2, 1], "riskPropensity": "MEDIUM_RISK",
+                                       "repaymentOption": "MATURITY_REPAYMENT"})
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == [1]
+
+
+# 투자 성향에 만족하는 상품 id 리스트 api - msgpack을 요청하면 상품 id 배열을 productId 필드에 담아 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_satisfied_investment_propensity_products_as_msgpack(monkeypatch):
+    # given
+    monkeypatch.setattr('core.propensity_index.get_propensity_boundaries', lambda: boundaries)
+    propensity_index.update_ai_results({1: [0.7], 2: [0.7]})
+    propensity_index.update_monte_carlo_results({1: [5.0], 2: [8.0]}, {})
+    propensity_index.ready = True
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/investment-propensity/list",
+                                 json={"productIdList": [2, 1], "riskPropensity": "MEDIUM_RISK",
+                                       "repaymentOption": "MATURITY_REPAYMENT"},
+                                 headers={"Accept": MSGPACK_MEDIA_TYPE})
+
+    # then
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content) == {"productId": [2, 1]}
+
+
+# 투자 성향에 만족하는 상품 id 리스트 api - 분류 색인이 준비되지 않았으면 조회 전용 세션으로 조회하고 커밋하지 않는지 확인
+@pytest.mark.asyncio
+async def test_get_satisfied_investment_propensity_products_uses_read_only_session(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(AIResult), [{"ai_result_id": productId, "product_id": productId,
+                                                       "repayment_prediction": True, "safety_score": score}
+                                                      for productId, score in {1: 0.7, 2: 0.65, 3: 0.9}.items()])
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId, "product_id": productId,
+                                                               "early_repayment_probability": "",
+                                                               "maturity_repayment_probability": 0,
+                                                               "loss_probability": loss, "under_knockin_barrier_probability": 0}
+                                                              for productId, loss in {1: 5.0, 2: 20.0, 3: 5.0}.items()])
+
+    # when
+    with patch('api.routes.investment_propensity.get_propensity_boundaries', return_value=boundaries):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/v1/investment-propensity/list",
+                                     json={"productIdList": [1, 2, 3], "riskPropensity": "MEDIUM_RISK",
+                                           "repaymentOption": "MATURITY_REPAYMENT"})
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == [1]
+    assert sqlite_session.commits == 0
+
+
+# 조기상환 성향 - 평가일별 행이 없는 결과는 monte_carlo_result.early_repayment_probability로 판단하는지 확인 (DB 조회, 분류 색인)
+@pytest.mark.asyncio
+async def test_early_repayment_falls_back_to_parent_row_without_children(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(AIResult), [{"ai_result_id": productId, "product_id": productId,
+                                                       "repayment_prediction": True, "safety_score": 0.7}
+                                                      for productId in (1, 2, 3)])
+    # 1: 평가일별 행이 있는 결과, 2, 3: 평가일별 행 없이 저장된 결과
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId, "product_id": productId,
+                                                               "early_repayment_probability": probabilities,
+                                                               "maturity_repayment_probability": 0,
+                                                               "loss_probability": 5.0, "under_knockin_barrier_probability": 0}
+                                                              for productId, probabilities in
+                                                              {1: "", 2: "30.0000,25.0000,40.0000", 3: "20.0000,20.0000"}.items()])
+    sqlite_session.session.execute(insert(MonteCarloEarlyRepayment),
+                                   [{"monte_carlo_early_repayment_id": index, "monte_carlo_result_id": 1, "product_id": 1,
+                                     "redemption_index": index, "probability": probability}
+                                    for index, probability in enumerate([40.0, 20.0])])
+
+    # when
+    queried = await query_product_ids_by_investment_propensity(sqlite_session, [1, 2, 3], RiskPropensity.MEDIUM_RISK,
+                                                                  RepaymentOption.EARLY_REPAYMENT, boundaries)
+    index = PropensityIndex(boundaries)
+    await index.reload_products(sqlite_session, [1, 2, 3], [1, 2, 3])
+    indexed = index.query([1, 2, 3], RiskPropensity.MEDIUM_RISK, RepaymentOption.EARLY_REPAYMENT)
+
+    # then
+    assert sorted(queried) == [1, 2]
+    assert indexed == [1, 2]
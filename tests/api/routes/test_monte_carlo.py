@@ -0,0 +1,166 @@
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from datetime import datetime
+from main import app
+from api.routes.monte_carlo import MonteCarloResponse
+from models import MonteCarloResult
+from core.result_read_cache import result_read_cache, CachedResult, MONTE_CARLO_RESULT, make_etag
+from core.shared_cache import SharedMemoryCacheBackend
+from simulation.batch_job import BatchJob, save_batch_job, _encode_batch_job, _decode_batch_job
+from util.batch_job_status import BatchJobStatus
+import pytest
+
+
+# 몬테카를로 일괄 계산 작업 조회 - 존재하지 않는 작업 id를 조회하는 경우 테스트 케이스
+@pytest.mark.asyncio
+async def test_get_monte_carlo_batch_not_found():
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/v1/monte-carlo/batch/unknown")
+
+    # then
+    assert response.status_code == 404
+    assert response.json()["code"] == "MonteCarloBatchJobException"
+
+
+# 몬테카를로 일괄 계산 작업 조회 - 워커가 여러 개이면 다른 워커가 등록하고 진행한 작업을 공유 메모리 캐시에서 조회하는지 확인
+@pytest.mark.asyncio
+async def test_get_monte_carlo_batch_from_other_worker(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    job = BatchJob(jobId="job-1", total=3, status=BatchJobStatus.COMPLETED, completed=3, succeeded=2,
+                   failedProductIds=[3], cacheHits=1, warmStarts=1, warmStartDeltas={2: {"lossProbability": -0.5}},
+                   createdAt=datetime(2024, 7, 19, 9, 0, 0), finishedAt=datetime(2024, 7, 19, 9, 1, 0))
+    with patch('simulation.batch_job.batch_jobs',
+               SharedMemoryCacheBackend("batchJob", 10, path=path, encode=_encode_batch_job, decode=_decode_batch_job)):
+        await save_batch_job(job)
+
+    # when
+    with patch('simulation.batch_job.batch_jobs',
+               SharedMemoryCacheBackend("batchJob", 10, path=path, encode=_encode_batch_job, decode=_decode_batch_job)):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/v1/monte-carlo/batch/job-1")
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == {"jobId": "job-1", "status": "COMPLETED", "total": 3, "completed": 3, "succeeded": 2,
+                               "failedProductIds": [3], "cacheHits": 1, "warmStarts": 1,
+                               "warmStartDeltas": {"2": {"lossProbability": -0.5}},
+                               "createdAt": "2024-07-19T09:00:00", "finishedAt": "2024-07-19T09:01:00"}
+
+
+# 몬테카를로 분석 결과 조회 - 캐시된 결과는 DB 조회 없이 ETag와 함께 응답하고, 같은 ETag로 다시 조회하면 본문 없이 304를 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_monte_carlo_etag():
+    # given
+    body = MonteCarloResponse(monteCarloResultId=10, productId=1, earlyRepaymentProbability="40.0000,20.0000",
+                              maturityRepaymentProbability=30.0, lossProbability=10.0, underKnockInBarrierProbability=12.0)
+    etag = make_etag(body)
+    # 같은 초에 다시 쓰여 수정 시각이 같아도 본문이 바뀌면 ETag가 바뀌어야 함
+    modifiedBody = body.model_copy(update={"lossProbability": 11.0})
+    result_read_cache.put(MONTE_CARLO_RESULT, 1, CachedResult(body=body, etag=etag))
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/v1/monte-carlo/1")
+        notModifiedResponse = await ac.get("/v1/monte-carlo/1", headers={"If-None-Match": response.headers["ETag"]})
+        await result_read_cache.invalidate(MONTE_CARLO_RESULT, [1])
+        result_read_cache.put(MONTE_CARLO_RESULT, 1, CachedResult(body=modifiedBody, etag=make_etag(modifiedBody)))
+        modifiedResponse = await ac.get("/v1/monte-carlo/1", headers={"If-None-Match": etag})
+
+    # then
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert response.json()["earlyRepaymentProbability"] == "40.0000,20.0000"
+    assert notModifiedResponse.status_code == 304
+    assert notModifiedResponse.content == b""
+    assert modifiedResponse.status_code == 200
+    assert modifiedResponse.headers["ETag"] != etag
+    assert modifiedResponse.json()["lossProbability"] == 11.0
+    assert result_read_cache.stats()["invalidations"] == 1
+
+
+# 몬테카를로 분석 결과 일괄 조회 api - 상품 id를 나눠서 조회하고, 결과가 없는 상품 id를 함께 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_monte_carlo_bulk(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId * 10, "product_id": productId,
+                                                               "early_repayment_probability": "40.0000,20.0000",
+                                                               "maturity_repayment_probability": 30, "loss_probability": 10,
+                                                               "under_knockin_barrier_probability": 12}
+                                                              for productId in (1, 2, 4)])
+
+    # when
+    with patch('core.bulk_lookup.PRODUCT_ID_CHUNK_SIZE', 2):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/v1/monte-carlo/bulk", json={"productIdList": [4, 3, 2, 1, 5, 4]})
+
+    # then
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(result["productId"] for result in body["results"]) == [1, 2, 4]
+    assert body["results"][0]["earlyRepaymentProbability"] == "40.0000,20.0000"
+    assert body["results"][0]["lossStandardError"] is None
+    assert body["missingProductIdList"] == [3, 5]
+    # 중복을 제외한 상품 id 5개를 2개씩 나눠서 조회
+    assert sqlite_session.queries == 3
+
+
+# 몬테카를로 분석 결과 일괄 저장 api - 외부에서 저장한 결과는 계산 입력 컬럼을 비워서, 다음 일괄 계산이 이전 입력으로 캐시 적중하지 않는지 확인
+@pytest.mark.asyncio
+async def test_ingest_monte_carlo_clears_simulation_inputs(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": 10, "product_id": 1,
+                                                               "early_repayment_probability": "40.0000",
+                                                               "maturity_repayment_probability": 30, "loss_probability": 10,
+                                                               "under_knockin_barrier_probability": 12,
+                                                               "input_hash": "a" * 64, "terms_hash": "b" * 64,
+                                                               "spot_ratios": "1.0", "volatilities": "0.2",
+                                                               "correlations": "", "seed": 7}])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/monte-carlo/ingest",
+                                 json={"results": [{"productId": 1, "earlyRepaymentProbability": "55.0000",
+                                                    "maturityRepaymentProbability": 20, "lossProbability": 5,
+                                                    "underKnockInBarrierProbability": 6}]})
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == {"upserted": 1, "productIdList": [1]}
+    assert sqlite_session.commits >= 1
+    stored = sqlite_session.session.execute(select(MonteCarloResult)).scalars().one()
+    assert stored.early_repayment_probability == "55.0000"
+    assert (stored.input_hash, stored.terms_hash, stored.spot_ratios, stored.volatilities, stored.correlations,
+            stored.seed) == (None, None, None, None, None, None)
+
+
+# 몬테카를로 분석 결과 일괄 저장 api - 확률이 nan, inf이거나 0~100 범위를 벗어나면 DB에 저장하지 않고 422를 응답하는지 확인
+@pytest.mark.asyncio
+async def test_ingest_monte_carlo_rejects_invalid_probabilities(sqlite_session):
+    # given
+    item = {"productId": 1, "earlyRepaymentProbability": "55.0000", "maturityRepaymentProbability": 20,
+            "lossProbability": 5, "underKnockInBarrierProbability": 6}
+    invalidItems = [{**item, "earlyRepaymentProbability": "40.0000,nan"},
+                    {**item, "earlyRepaymentProbability": "inf"},
+                    {**item, "earlyRepaymentProbability": "-5"},
+                    {**item, "lossProbability": 120},
+                    {**item, "lossStandardError": -0.1},
+                    {**item, "earlyRepaymentStandardError": "0.1,-0.2"}]
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        responses = [await ac.post("/v1/monte-carlo/ingest", json={"results": [invalidItem]})
+                     for invalidItem in invalidItems]
+        # JSON 표준이 아닌 NaN 값
+        nanResponse = await ac.post("/v1/monte-carlo/ingest", headers={"Content-Type": "application/json"},
+                                    content='{"results": [{"productId": 1, "earlyRepaymentProbability": "55.0000", '
+                                            '"maturityRepaymentProbability": NaN, "lossProbability": 5, '
+                                            '"underKnockInBarrierProbability": 6}]}')
+
+    # then
+    assert [response.status_code for response in responses] == [422] * len(invalidItems)
+    assert nanResponse.status_code == 422
+    assert sqlite_session.session.execute(select(MonteCarloResult)).scalars().all() == []
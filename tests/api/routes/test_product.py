@@ -1,31 +1,19 @@
 from httpx import AsyncClient, ASGITransport
 from exception.errors import ProductServiceServerException
+from unittest.mock import patch
 from main import app
 from datetime import datetime, timedelta
 import pytest
-import pandas as pd
+import asyncio
 import json
 
 # 최초기준가격 대비 현재 기초자산가격 비율 - 상품 API 호출이 성공할 때의 최초기준가격 대비 현재 기초자산가격 비율 테스트 케이스
 @pytest.mark.asyncio
-async def test_get_price_ratio_success(mock_do_service_async, mock_product_response, mock_ticker):
+async def test_get_price_ratio_success(mock_do_service_async, mock_product_response):
     # given
-    initial_date =(datetime.now().date() - timedelta(days=7)).strftime("%Y-%m-%d")
-    mock_product_response["initialBasePriceEvaluationDate"] = initial_date
+    # 최초기준가격평가일(2024-07-12)의 종가와 가장 최근 종가(2024-07-19)는 tests/fixtures/daily_closes.csv 기준
     mock_do_service_async.return_value = json.dumps(mock_product_response)
 
-    mock_ticker_instance = mock_ticker.return_value
-    # 요청에 따라 순서 대로 반환
-    mock_ticker_instance.history.side_effect = [
-        pd.DataFrame({"Close": [150.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [280.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [300.0]}, index=pd.to_datetime([initial_date])),
-
-        pd.DataFrame({"Close": [160.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [300.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [100.0]}, index=pd.to_datetime([initial_date]))
-    ]
-
     # when
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         response = await ac.get("/v1/product/price/ratio/1")
@@ -67,23 +55,12 @@ async def test_get_price_ratio_failure_due_to_product_service(mock_do_service_as
 @pytest.mark.asyncio
 async def test_get_price_ratio_failure_due_to_base_price_evaluation_date(mock_do_service_async,
                                                                          mock_product_response,
-                                                                         mock_ticker):
+                                                                         market_data_source):
     # given
     initial_date =(datetime.now().date() + timedelta(days=7)).strftime("%Y-%m-%d")
     mock_product_response["initialBasePriceEvaluationDate"] = initial_date
     mock_do_service_async.return_value = json.dumps(mock_product_response)
 
-    mock_ticker_instance = mock_ticker.return_value
-    mock_ticker_instance.history.side_effect = [
-        pd.DataFrame({"Close": [150.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [280.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [300.0]}, index=pd.to_datetime([initial_date])),
-
-        pd.DataFrame({"Close": [160.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [300.0]}, index=pd.to_datetime([initial_date])),
-        pd.DataFrame({"Close": [100.0]}, index=pd.to_datetime([initial_date]))
-    ]
-
     # when
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         response = await ac.get("/v1/product/price/ratio/1")
@@ -96,3 +73,152 @@ async def test_get_price_ratio_failure_due_to_base_price_evaluation_date(mock_do
     assert response_json["message"] == "최초기준가격평가일이 계산하고자 하는 현재 시점 보다 미래의 날짜이므로 종가 데이터를 가져올 수 없습니다."
     assert "timestamp" in response_json
     assert "trackingId" in response_json
+    assert market_data_source.calls == []
+
+
+# 최초기준가격 대비 현재 기초자산가격 비율 - 시세 조회가 제한 시간을 넘길 때 이벤트 루프를 막지 않고 에러 처리가 잘 되는지 확인
+@pytest.mark.asyncio
+async def test_get_price_ratio_failure_due_to_market_data_timeout(mock_do_service_async,
+                                                                  mock_product_response,
+                                                                  market_data_source):
+    # given
+    mock_do_service_async.return_value = json.dumps(mock_product_response)
+    market_data_source.delay = 0.5
+
+    # when
+    with patch("core.market_data.MARKET_DATA_TIMEOUT", 0.05):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.get("/v1/product/price/ratio/1")
+
+    # then
+    assert response.status_code == 504
+    response_json = response.json()
+    assert response_json["status_code"] == 504
+    assert response_json["code"] == "MarketDataTimeoutException"
+    assert "timestamp" in response_json
+    assert "trackingId" in response_json
+
+
+# 최초기준가격 대비 현재 기초자산가격 비율 리스트 - 상품들이 공유하는 기초자산을 중복 없이 한 번에 조회하는지 확인
+@pytest.mark.asyncio
+async def test_get_price_ratio_list_success(mock_do_service_async, mock_product_response, market_data_source):
+    # given
+    future_date = (datetime.now().date() + timedelta(days=7)).strftime("%Y-%m-%d")
+    products = {
+        1: {**mock_product_response, "id": 1},
+        2: {**mock_product_response, "id": 2, "initialBasePriceEvaluationDate": "2024-07-15"},
+        3: {**mock_product_response, "id": 3, "initialBasePriceEvaluationDate": future_date}
+    }
+    mock_do_service_async.side_effect = lambda service, path, **kwargs: json.dumps(products[int(path.rsplit("/", 1)[-1])])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/product/price/ratio/list", json={"productIdList": [1, 2, 3]})
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "recentAndInitialPriceRatio": -66.67},
+        {"id": 2, "recentAndInitialPriceRatio": -60.0},
+        {"id": 3, "recentAndInitialPriceRatio": None}
+    ]
+    assert len(market_data_source.calls) == 1
+    assert market_data_source.calls[0]["tickers"] == ["^GSPC", "^KS200", "^STOXX50E"]
+    assert market_data_source.calls[0]["start"] == "2024-07-12"
+
+
+# 최초기준가격 대비 현재 기초자산가격 비율 리스트 - 이미 조회한 종가는 캐시에서 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_price_ratio_list_served_from_cache(mock_do_service_async, mock_product_response, market_data_source):
+    # given
+    mock_do_service_async.return_value = json.dumps({**mock_product_response, "id": 1})
+
+    # when
+    with patch("core.price_cache.PRICE_CACHE_INTRADAY_TTL", 60):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            first = await ac.post("/v1/product/price/ratio/list", json={"productIdList": [1]})
+            second = await ac.post("/v1/product/price/ratio/list", json={"productIdList": [1]})
+            stats = await ac.get("/v1/product/price/stats")
+
+    # then
+    assert first.json() == second.json() == [{"id": 1, "recentAndInitialPriceRatio": -66.67}]
+    assert len(market_data_source.calls) == 1
+    assert stats.json()["cache"]["historicalHits"] == 3
+    assert stats.json()["cache"]["recentHits"] == 3
+
+
+# 최초기준가격 대비 현재 기초자산가격 비율 - 같은 상품에 대한 동시 요청들이 하나의 계산 결과를 함께 사용하는지 확인
+@pytest.mark.asyncio
+async def test_get_price_ratio_coalesces_concurrent_requests(mock_do_service_async, mock_product_response,
+                                                             market_data_source):
+    # given
+    mock_do_service_async.return_value = json.dumps(mock_product_response)
+    market_data_source.delay = 0.1
+
+    # when
+    with patch("api.routes.product.PRICE_RATIO_COALESCE_WINDOW", 60):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            responses = await asyncio.gather(*[ac.get("/v1/product/price/ratio/1") for _ in range(5)])
+            stats = await ac.get("/v1/product/price/stats")
+
+    # then
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json()["recentAndInitialPriceRatio"] == -66.67 for response in responses)
+    assert mock_do_service_async.await_count == 1
+    assert len(market_data_source.calls) == 1
+    assert stats.json()["priceRatioCoalescing"]["calls"] == 1
+    assert stats.json()["priceRatioCoalescing"]["coalesced"] == 4
+
+
+# 최초기준가격 대비 현재 기초자산가격 비율 리스트 - NDJSON을 요청하면 상품별 결과를 한 줄씩 스트리밍하는지 확인
+@pytest.mark.asyncio
+async def test_get_price_ratio_list_streaming(mock_do_service_async, mock_product_response, market_data_source):
+    # given
+    future_date = (datetime.now().date() + timedelta(days=7)).strftime("%Y-%m-%d")
+    products = {
+        1: {**mock_product_response, "id": 1},
+        2: {**mock_product_response, "id": 2, "initialBasePriceEvaluationDate": "2024-07-15"},
+        3: {**mock_product_response, "id": 3, "initialBasePriceEvaluationDate": future_date}
+    }
+    mock_do_service_async.side_effect = lambda service, path, **kwargs: json.dumps(products[int(path.rsplit("/", 1)[-1])])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/v1/product/price/ratio/list", json={"productIdList": [1, 2, 3]},
+                                 headers={"Accept": "application/x-ndjson"})
+
+    # then
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda record: record["id"])
+    assert records == [
+        {"id": 1, "recentAndInitialPriceRatio": -66.67},
+        {"id": 2, "recentAndInitialPriceRatio": -60.0},
+        {"id": 3, "recentAndInitialPriceRatio": None}
+    ]
+    # 동시에 계산되는 상품들이 같은 기초자산을 중복해서 내려받지 않음
+    assert len(market_data_source.calls) == 1
+
+
+# 낙인 상품 리스트 - 감시 대상으로 등록된 상품 중 낙인 배리어 아래로 내려간 상품만 조회되는지 확인
+@pytest.mark.asyncio
+async def test_get_knock_in_products(mock_do_service_async, mock_product_response):
+    # given
+    # 2024-07-19 기준 Euro Stoxx 50 Index는 최초기준가격 대비 33.33%
+    products = {
+        1: {**mock_product_response, "id": 1, "knockIn": 45},
+        2: {**mock_product_response, "id": 2, "knockIn": 30}
+    }
+    mock_do_service_async.side_effect = lambda service, path, **kwargs: json.dumps(products[int(path.rsplit("/", 1)[-1])])
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        registered = await ac.post("/v1/product/knock-in/monitor", json={"productIdList": [1, 2]})
+        response = await ac.get("/v1/product/knock-in")
+
+    # then
+    assert registered.status_code == 200
+    assert registered.json() == {"registered": [1, 2]}
+    assert response.status_code == 200
+    assert [(item["id"], item["recentAndInitialPriceRatio"], item["knockInBarrier"]) for item in response.json()] == \
+           [(1, -66.67, 45.0)]
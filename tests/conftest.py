@@ -1,5 +1,160 @@
+import os
+
+# 테스트 중에는 로컬 종가 저장소를 메모리에만 생성
+os.environ.setdefault('PRICE_STORE_PATH', ':memory:')
+
 from unittest.mock import patch, AsyncMock
+from sqlalchemy import BigInteger, create_engine
+from sqlalchemy.dialects.mysql.dml import OnDuplicateClause
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnClause
+from core.database import Base
+from dependencies import get_db, get_read_db
+from core.price_cache import price_cache
+from core.price_store import price_store
+from core.product_client import product_client
+from core.barrier_monitor import barrier_monitor
+from simulation.result_cache import result_cache
+from core.propensity_index import propensity_index
+from core.result_read_cache import result_read_cache
+from core.startup import readiness
+from api.routes.product import price_ratio_flight
+from core.market_data import set_market_data_source
+import core.market_data as market_data
+import models  # Base.metadata에 결과 테이블 등록
+import pandas as pd
 import pytest
+import time
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+# 테스트 간에 캐시된 값이 공유되지 않도록 매 테스트마다 캐시 초기화
+@pytest.fixture(autouse=True)
+def clear_caches():
+    price_cache.clear()
+    price_store.clear()
+    product_client.clear()
+    price_ratio_flight.clear()
+    barrier_monitor.clear()
+    result_cache.clear()
+    propensity_index.clear()
+    result_read_cache.clear()
+    readiness.clear()
+    yield
+    price_cache.clear()
+    price_store.clear()
+    product_client.clear()
+    price_ratio_flight.clear()
+    barrier_monitor.clear()
+    result_cache.clear()
+    propensity_index.clear()
+    result_read_cache.clear()
+    readiness.clear()
+
+
+# 고정된 종가 데이터(tests/fixtures/daily_closes.csv)로 응답하는 시세 조회 소스
+class FixtureMarketDataSource:
+    def __init__(self, path: str):
+        self.closes = pd.read_csv(path, index_col="Date", parse_dates=True)
+        self.calls = []
+        self.delay = 0
+
+    def download_closes(self, tickerSymbols, start, end):
+        self.calls.append({"tickers": list(tickerSymbols), "start": start, "end": end})
+        time.sleep(self.delay)
+        closes = self.closes[(self.closes.index >= pd.Timestamp(start)) & (self.closes.index < pd.Timestamp(end))]
+        return closes.reindex(columns=list(tickerSymbols))
+
+
+# 테스트는 yfinance를 호출하지 않고 고정된 종가 데이터로만 실행
+@pytest.fixture(autouse=True)
+def market_data_source():
+    previous = market_data.market_data_source
+    source = FixtureMarketDataSource(os.path.join(FIXTURE_DIR, "daily_closes.csv"))
+    set_market_data_source(source)
+    yield source
+    set_market_data_source(previous)
+
+
+# sqlite에서 BIGINT 기본 키는 자동 증가하지 않으므로 INTEGER로 생성 (테스트 DB 전용)
+@compiles(BigInteger, "sqlite")
+def _compile_big_integer_for_sqlite(type_, compiler, **kw):
+    return "INTEGER"
+
+
+# MySQL INSERT ... ON DUPLICATE KEY UPDATE를 sqlite의 ON CONFLICT (product_id) DO UPDATE로 실행 (테스트 DB 전용)
+# 결과 테이블의 유일 키는 product_id 하나이므로 충돌 대상을 product_id로 지정
+@compiles(OnDuplicateClause, "sqlite")
+def _compile_on_duplicate_key_update_for_sqlite(clause, compiler, **kw):
+    assignments = []
+    for column, value in clause.update.items():
+        if isinstance(value, ColumnClause) and value.table is clause.inserted_alias:
+            assignments.append(f"{column} = excluded.{value.name}")
+        else:
+            assignments.append(f"{column} = {compiler.process(value, **kw)}")
+    return "ON CONFLICT (product_id) DO UPDATE SET " + ", ".join(assignments)
+
+
+# 비동기 세션 대신 sqlite 동기 세션으로 쿼리를 실행하는 세션
+# 세션 팩토리(AsyncSessionLocal, ReadOnlySessionLocal) 대신 써도 같은 세션을 반환하고, 실행한 쿼리 수와 커밋 횟수를 기록
+# failAt: 지정한 번째 쿼리에서 DB 오류를 냄
+class SqliteAsyncSession:
+    def __init__(self, engine, failAt=None):
+        self.engine = engine
+        self.session = Session(engine)
+        self.failAt = failAt
+        self.queries = 0
+        self.commits = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def execute(self, statement, parameters=None):
+        self.queries += 1
+        if self.queries == self.failAt:
+            raise OperationalError(str(statement), {}, Exception("connection lost"))
+        return self.session.execute(statement, parameters)
+
+    async def commit(self):
+        self.commits += 1
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
+
+    def close(self):
+        self.session.close()
+
+
+# 모든 테이블을 만든 메모리 sqlite DB와 세션
+# 라우트의 쓰기용/조회 전용 세션(get_db, get_read_db)과 일괄 조회 세션 팩토리를 모두 이 세션으로 대체
+@pytest.fixture
+def sqlite_session():
+    from main import app
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = SqliteAsyncSession(engine)
+
+    async def override_db():
+        yield session
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    with patch('core.bulk_lookup.ReadOnlySessionLocal', session):
+        yield session
+    app.dependency_overrides.pop(get_db)
+    app.dependency_overrides.pop(get_read_db)
+    session.close()
+    engine.dispose()
+
 
 # 최초기준가격 대비 현재 기초자산가격 비율 api 테스트 데이터를 위한 fixture
 @pytest.fixture
@@ -14,16 +169,9 @@ def mock_product_response():
         }
     }
 
-# yfinance Ticker 클래스의 모킹을 위한 fixture
-# 내부에서 yfinance.Ticker 구문이 실행되면 mock 객체로 전환
-@pytest.fixture
-def mock_ticker():
-    with patch('yfinance.Ticker') as mock:
-        yield mock
-
 # eureka_client의 do_service_async를 모킹하기 위한 fixture
 # 내부에서 py_eureka_client.eureka_client.do_service_async 구문이 실행되면 mock 객체로 전환
 @pytest.fixture
 def mock_do_service_async():
     with patch('py_eureka_client.eureka_client.do_service_async', new_callable=AsyncMock) as mock:
-        yield mock
\ No newline at end of file
+        yield mock
@@ -0,0 +1,185 @@
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import insert
+from core.barrier_monitor import BarrierMonitor, monitor_products, register_requested_products, \
+    publish_knocked_in_products, get_knocked_in_products, seed_monitored_products, retire_finished_products, \
+    _encode_knocked_in_products, _decode_knocked_in_products
+from core.shared_cache import SharedMemoryCacheBackend, LocalCacheBackend
+from models import MonteCarloResult
+import pytest
+
+
+def product(productId, equityTickerSymbols, knockIn=50):
+    return {
+        "id": productId,
+        "initialBasePriceEvaluationDate": "2024-07-12",
+        "equities": " / ".join(equityTickerSymbols),
+        "equityTickerSymbols": equityTickerSymbols,
+        "knockIn": knockIn
+    }
+
+
+INITIAL_CLOSES = {("^KS200", "2024-07-12"): 150.0, ("^GSPC", "2024-07-12"): 280.0, ("^STOXX50E", "2024-07-12"): 300.0}
+
+
+# 낙인 배리어 감시 - 가격이 바뀐 기초자산을 가진 상품들만 다시 계산하는지 확인
+def test_update_quotes_reevaluates_only_affected_products():
+    # given
+    monitor = BarrierMonitor()
+    monitor.update_quotes({"^KS200": 150.0, "^GSPC": 280.0, "^STOXX50E": 300.0})
+    monitor.register(product(1, {"KOSPI200 Index": "^KS200", "S&P500 Index": "^GSPC"}), INITIAL_CLOSES)
+    monitor.register(product(2, {"S&P500 Index": "^GSPC"}), INITIAL_CLOSES)
+    monitor.register(product(3, {"Euro Stoxx 50 Index": "^STOXX50E"}), INITIAL_CLOSES)
+    evaluations = monitor.stats()["evaluations"]
+
+    # when
+    affected = monitor.update_quotes({"^KS200": 120.0, "^GSPC": 280.0, "^STOXX50E": 300.0})
+
+    # then
+    assert affected == {1}
+    assert monitor.stats()["evaluations"] == evaluations + 1
+    assert monitor.knocked_in_products() == []
+
+
+# 낙인 배리어 감시 - 낙인 배리어 아래로 내려간 상품은 가격이 회복되어도 낙인 상품으로 유지되는지 확인
+def test_knock_in_is_flagged_and_kept():
+    # given
+    monitor = BarrierMonitor()
+    monitor.register(product(1, {"KOSPI200 Index": "^KS200", "Euro Stoxx 50 Index": "^STOXX50E"}, knockIn=45), INITIAL_CLOSES)
+    monitor.register(product(2, {"Euro Stoxx 50 Index": "^STOXX50E"}, knockIn=None), INITIAL_CLOSES)
+
+    # when
+    monitor.update_quotes({"^KS200": 160.0, "^STOXX50E": 120.0})
+    monitor.update_quotes({"^STOXX50E": 290.0})
+
+    # then
+    knockedIn = monitor.knocked_in_products()
+    assert [(item["id"], item["knockInBarrier"]) for item in knockedIn] == [(1, 45.0)]
+    assert knockedIn[0]["recentAndInitialPriceRatio"] == -3.33
+    assert monitor.stats()["knockedIn"] == 1
+
+
+# 낙인 배리어 감시 - 만기 평가일이 지난 상품은 감시 대상과 역색인에서 제외되는지 확인
+def test_matured_products_are_expired():
+    # given
+    monitor = BarrierMonitor()
+    monitor.register({**product(1, {"KOSPI200 Index": "^KS200"}), "earlyRepaymentEvaluationDates": "2098-07-01, 2099-01-02",
+                      "redemptionBarriers": "95, 90"}, INITIAL_CLOSES)
+    monitor.register({**product(2, {"S&P500 Index": "^GSPC"}), "earlyRepaymentEvaluationDates": "2098-07-01, 2099-07-01",
+                      "redemptionBarriers": "95, 90"}, INITIAL_CLOSES)
+
+    # when
+    matured = monitor.expire("2099-01-03")
+
+    # then
+    assert matured == [1]
+    assert monitor.tickers() == ["^GSPC"]
+    assert monitor.stats()["products"] == 1
+    assert monitor.stats()["matured"] == 1
+
+
+# 낙인 배리어 감시 - 지난 조기상환 평가일의 종가가 모두 상환 배리어 이상인 상품만 감시 대상에서 제외되는지 확인
+def test_early_redeemed_products_are_removed():
+    # given
+    monitor = BarrierMonitor()
+    dates = {"earlyRepaymentEvaluationDates": "2024-07-15, 2024-07-16, 2099-01-02", "redemptionBarriers": "100, 95, 90"}
+    monitor.register({**product(1, {"KOSPI200 Index": "^KS200"}), **dates}, INITIAL_CLOSES)
+    monitor.register({**product(2, {"Euro Stoxx 50 Index": "^STOXX50E"}), **dates}, INITIAL_CLOSES)
+    checks = monitor.due_redemption_checks("2024-07-17")
+    closes = {("^KS200", "2024-07-15"): 149.0, ("^KS200", "2024-07-16"): 154.0,
+              ("^STOXX50E", "2024-07-15"): 250.0, ("^STOXX50E", "2024-07-16"): 200.0}
+    closeKeys = monitor.redemption_close_keys(checks)
+
+    # when
+    redeemed = monitor.settle_redemption_checks(checks, closes)
+
+    # then
+    assert closeKeys == set(closes)
+    assert redeemed == [1]
+    assert monitor.tickers() == ["^STOXX50E"]
+    assert monitor.due_redemption_checks("2024-07-17") == {}
+
+
+# 낙인 배리어 감시 - 최대 상품 수를 넘으면 가장 먼저 등록된 상품부터 제외되는지 확인
+def test_registry_is_bounded():
+    # given
+    monitor = BarrierMonitor(maxProducts=2)
+
+    # when
+    for productId in range(1, 4):
+        monitor.register(product(productId, {"KOSPI200 Index": "^KS200"}), INITIAL_CLOSES)
+
+    # then
+    assert monitor.stats()["products"] == 2
+    assert monitor.stats()["evictions"] == 1
+    assert monitor.remove(1) is False
+    assert monitor.remove(2) is True
+
+
+# 워커가 여러 개인 경우 - 다른 워커에서 등록 요청한 상품을 감시하는 워커가 등록하고, 감시 결과인 낙인 상품을 다른 워커에서 조회하는지 확인
+@pytest.mark.asyncio
+async def test_knock_in_products_are_shared_across_workers(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    leader, follower = BarrierMonitor(), BarrierMonitor()
+    follower.active = False
+    knockInProduct = product(1, {"KOSPI200 Index": "^KS200", "Euro Stoxx 50 Index": "^STOXX50E"}, knockIn=45)
+    requests = SharedMemoryCacheBackend("barrierMonitorProduct", 10, path=path)
+    knockIns = SharedMemoryCacheBackend("barrierMonitorKnockIn", 1, path=path, encode=_encode_knocked_in_products,
+                                        decode=_decode_knocked_in_products)
+
+    # when
+    with patch('core.barrier_monitor.monitored_products', requests), patch('core.barrier_monitor.knock_in_store', knockIns), \
+            patch('core.barrier_monitor._publishedKnockedIn', None):
+        with patch('core.barrier_monitor.barrier_monitor', follower):
+            requested = await monitor_products([knockInProduct], INITIAL_CLOSES)
+            before = await get_knocked_in_products()
+        with patch('core.barrier_monitor.barrier_monitor', leader), \
+                patch('core.barrier_monitor.product_client.get_product', AsyncMock(return_value=knockInProduct)), \
+                patch('core.barrier_monitor.get_closes', AsyncMock(return_value=(INITIAL_CLOSES, {}))):
+            await register_requested_products()
+            leader.update_quotes({"^KS200": 160.0, "^STOXX50E": 120.0})
+            await publish_knocked_in_products()
+        with patch('core.barrier_monitor.barrier_monitor', follower):
+            after = await get_knocked_in_products()
+
+    # then
+    assert requested == [1]
+    assert before == []
+    assert not follower.is_registered(1) and leader.is_registered(1)
+    assert after == leader.knocked_in_products()
+    assert [(item["id"], item["knockInBarrier"]) for item in after] == [(1, 45.0)]
+
+
+# 감시 대상 - 시작할 때 몬테카를로 분석 결과가 있는 상품을 등록 요청에 추가하고, 만기가 지난 상품은 등록 요청에서 제거하는지 확인
+@pytest.mark.asyncio
+async def test_seed_and_retire_monitored_products(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId, "product_id": productId,
+                                                               "early_repayment_probability": "",
+                                                               "maturity_repayment_probability": 0, "loss_probability": 0,
+                                                               "under_knockin_barrier_probability": 0}
+                                                              for productId in (1, 2)])
+    monitor, requests = BarrierMonitor(), LocalCacheBackend("barrierMonitorProduct", 10)
+    products = {productId: {**product(productId, {"KOSPI200 Index": "^KS200"}),
+                            "earlyRepaymentEvaluationDates": maturityDate}
+                for productId, maturityDate in {1: "2024-08-01", 2: "2099-01-01"}.items()}
+
+    # when
+    with patch('core.barrier_monitor.ReadOnlySessionLocal', sqlite_session), \
+            patch('core.barrier_monitor.monitored_products', requests), \
+            patch('core.barrier_monitor.barrier_monitor', monitor), \
+            patch('core.barrier_monitor.product_client.get_product',
+                  AsyncMock(side_effect=lambda productId: products[productId])), \
+            patch('core.barrier_monitor.get_closes', AsyncMock(return_value=(INITIAL_CLOSES, {}))):
+        await seed_monitored_products()
+        seeded = set(requests.items())
+        await register_requested_products()
+        registered = [productId for productId in (1, 2) if monitor.is_registered(productId)]
+        await retire_finished_products("2099-01-02")
+
+    # then
+    assert seeded == {1, 2}
+    # 만기 평가일이 지난 상품은 등록하지 않고 등록 요청에서 제거
+    assert registered == [2]
+    assert set(requests.items()) == set()
+    assert monitor.stats()["products"] == 0
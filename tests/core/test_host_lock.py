@@ -0,0 +1,42 @@
+from multiprocessing import get_context
+from core.host_lock import HostLock
+import os
+
+
+def try_acquire_in_worker(directory):
+    return HostLock("leader", directory=directory, enabled=True).try_acquire()
+
+
+# 워커 간 잠금 - 한 워커가 잠금을 가지고 있으면 다른 워커는 얻지 못하고, 잠금을 풀면 다른 워커가 얻는지 확인
+def test_host_lock_is_held_by_one_worker(tmp_path):
+    # given
+    directory = str(tmp_path / "shared")
+    leader = HostLock("leader", directory=directory, enabled=True)
+    pool = get_context("fork").Pool(1)
+
+    # when
+    acquired = leader.try_acquire()
+    acquiredByOther = pool.apply(try_acquire_in_worker, (directory,))
+    leader.release()
+    acquiredAfterRelease = pool.apply(try_acquire_in_worker, (directory,))
+    pool.close()
+    pool.join()
+
+    # then
+    assert acquired and leader.try_acquire()
+    assert acquiredByOther is False
+    assert acquiredAfterRelease is True
+    assert os.stat(tmp_path / "shared").st_mode & 0o777 == 0o700
+
+
+# 워커 간 잠금 - 워커가 하나이면 잠금 파일 없이 항상 얻는지 확인
+def test_host_lock_without_workers(tmp_path):
+    # given
+    lock = HostLock("leader", directory=str(tmp_path / "shared"), enabled=False)
+
+    # when
+    acquired = lock.try_acquire()
+
+    # then
+    assert acquired and HostLock("leader", directory=str(tmp_path / "shared"), enabled=False).try_acquire()
+    assert not (tmp_path / "shared").exists()
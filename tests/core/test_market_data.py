@@ -0,0 +1,34 @@
+from unittest.mock import patch
+from core.market_data import YFinanceMarketDataSource, MARKET_DATA_DOWNLOAD_TIMEOUT
+from exception.errors import MarketDataTimeoutException
+import pandas as pd
+import pytest
+
+
+# yfinance 시세 조회 - yf.download에 제한 시간을 넘겨서 응답이 없는 다운로드가 lock을 계속 잡고 있지 않도록 하는지 확인
+def test_download_closes_passes_timeout():
+    # given
+    source = YFinanceMarketDataSource()
+    data = pd.DataFrame({("Close", "^GSPC"): [280.0]}, index=pd.to_datetime(["2024-07-12"]))
+
+    # when
+    with patch("yfinance.download", return_value=data) as download:
+        closes = source.download_closes(["^GSPC"], "2024-07-12", "2024-07-13")
+
+    # then
+    assert download.call_args.kwargs["timeout"] == MARKET_DATA_DOWNLOAD_TIMEOUT
+    assert closes.at[pd.Timestamp("2024-07-12"), "^GSPC"] == 280.0
+    assert source._download_lock.acquire(blocking=False)
+
+
+# yfinance 시세 조회 - 앞선 다운로드가 끝나지 않으면 조회 제한 시간까지만 기다리고 시세 조회 스레드를 비워주는지 확인
+def test_download_closes_stops_waiting_for_previous_download():
+    # given
+    source = YFinanceMarketDataSource()
+    source._download_lock.acquire()
+
+    # when, then
+    with patch("core.market_data.MARKET_DATA_TIMEOUT", 0.05), patch("yfinance.download") as download:
+        with pytest.raises(MarketDataTimeoutException):
+            source.download_closes(["^GSPC"], "2024-07-12", "2024-07-13")
+    assert download.call_count == 0
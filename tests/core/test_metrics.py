@@ -0,0 +1,99 @@
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from core.metrics import instrument_engine, observe_upstream, statement_operation, PRODUCT_SERVICE
+from main import app
+import core.metrics as metrics
+import subprocess
+import logging
+import pytest
+import sys
+import os
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+# 지표 조회 - 요청 처리 시간이 경로 값이 아닌 라우트 경로 템플릿별로 기록되는지 확인
+@pytest.mark.asyncio
+async def test_metrics_records_request_duration_by_route_template():
+    # given
+    labels = {"method": "GET", "route": "/v1/monte-carlo/cache/stats", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/v1/monte-carlo/cache/stats")
+        response = await ac.get("/metrics")
+
+    # then
+    assert response.status_code == 200
+    assert 'route="/v1/monte-carlo/cache/stats"' in response.text
+    assert "db_pool_wait_seconds" in response.text
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+
+
+# SQL 문 실행 시간 - 문 종류별로 기록하고, 기준 시간 이상 걸린 문은 느린 쿼리 로그로 남기는지 확인
+def test_instrument_engine_records_statements_and_logs_slow_queries(monkeypatch, caplog):
+    # given
+    engine = create_engine("sqlite://", poolclass=QueuePool)
+    instrument_engine(engine, "test")
+    monkeypatch.setattr(metrics, "DATABASE_SLOW_QUERY_THRESHOLD", 0)
+    before = sample("db_statement_duration_seconds_count", operation="SELECT")
+
+    # when
+    with caplog.at_level(logging.WARNING, logger="core.metrics"):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            checkedOut = sample("db_pool_checked_out_connections", engine="test")
+
+    # then
+    assert sample("db_statement_duration_seconds_count", operation="SELECT") == before + 1
+    assert checkedOut == 1
+    assert sample("db_pool_checked_out_connections", engine="test") == 0
+    assert any("SELECT 1" in record.getMessage() for record in caplog.records)
+    assert statement_operation("  insert into ai_result values (1)") == "INSERT"
+    assert statement_operation("PRAGMA table_info(ai_result)") == "OTHER"
+
+
+# 외부 호출 - 실패하면 예외 종류별 실패 수를 늘리고 예외는 그대로 전달하는지 확인
+def test_observe_upstream_counts_errors():
+    # given
+    before = sample("upstream_errors_total", upstream=PRODUCT_SERVICE, error="ConnectionError")
+    durationBefore = sample("upstream_request_duration_seconds_count", upstream=PRODUCT_SERVICE)
+
+    # when
+    with pytest.raises(ConnectionError):
+        with observe_upstream(PRODUCT_SERVICE):
+            raise ConnectionError()
+
+    # then
+    assert sample("upstream_errors_total", upstream=PRODUCT_SERVICE, error="ConnectionError") == before + 1
+    assert sample("upstream_request_duration_seconds_count", upstream=PRODUCT_SERVICE) == durationBefore + 1
+
+
+# 워커가 여러 개인 경우 - /metrics가 요청을 받은 워커가 아니라 모든 워커의 지표 파일을 합쳐서 응답하는지 확인
+@pytest.mark.asyncio
+async def test_metrics_merges_worker_metrics(tmp_path, monkeypatch):
+    # given
+    directory = tmp_path / "metrics"
+    directory.mkdir(mode=0o700)
+    # 이전 실행에서 남은 지표 파일
+    (directory / "counter_1.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(directory))
+    metrics.prepare_multiprocess_metrics(str(directory))
+    monkeypatch.setattr(metrics, "PROMETHEUS_MULTIPROC_DIR", str(directory))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", "from core.metrics import UPSTREAM_ERRORS; "
+                        "UPSTREAM_ERRORS.labels(upstream='yfinance', error='Timeout').inc()"],
+                       cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))), check=True)
+
+    # when
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+
+    # then
+    assert response.status_code == 200
+    assert 'upstream_errors_total{error="Timeout",upstream="yfinance"} 2.0' in response.text
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from unittest.mock import patch
+from core.price_cache import PriceCache, MISSING, recent_ttl
+
+
+# 과거 종가 캐시 - 최대 크기를 넘어서면 가장 오래 사용되지 않은 값부터 제거되는지 확인
+def test_historical_lru_eviction():
+    # given
+    cache = PriceCache(maxSize=2)
+    cache.put_historical("^GSPC", "2024-07-10", 5500.0)
+    cache.put_historical("^GSPC", "2024-07-11", 5580.0)
+    cache.get_historical("^GSPC", "2024-07-10")
+
+    # when
+    cache.put_historical("^GSPC", "2024-07-12", 5600.0)
+
+    # then
+    assert cache.get_historical("^GSPC", "2024-07-11") is MISSING
+    assert cache.get_historical("^GSPC", "2024-07-10") == 5500.0
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["historicalHits"] == 2
+    assert stats["historicalMisses"] == 1
+
+
+# 과거 종가 캐시 - 아직 확정되지 않은 당일 종가는 저장하지 않는지 확인
+def test_unsettled_close_is_not_cached():
+    # given
+    cache = PriceCache(maxSize=10)
+    today = datetime.now(ZoneInfo("Asia/Seoul")).date().strftime("%Y-%m-%d")
+
+    # when
+    cache.put_historical("^KS200", today, 350.0)
+
+    # then
+    assert cache.get_historical("^KS200", today) is MISSING
+
+
+# 최근 가격 캐시 - 장중에는 짧은 TTL, 장 마감 후에는 다음 장 시작까지의 TTL을 사용하는지 확인
+def test_recent_ttl_depends_on_market_session():
+    # given
+    # 2024-07-12(금) 10:00 KST 장중, 2024-07-12(금) 20:00 KST 장 마감 후
+    intraday = datetime(2024, 7, 12, 10, 0, tzinfo=ZoneInfo("Asia/Seoul"))
+    closed = datetime(2024, 7, 12, 20, 0, tzinfo=ZoneInfo("Asia/Seoul"))
+
+    # when
+    with patch("core.price_cache.PRICE_CACHE_INTRADAY_TTL", 5):
+        intraday_ttl = recent_ttl("^KS200", intraday)
+        closed_ttl = recent_ttl("^KS200", closed)
+
+    # then
+    assert intraday_ttl == 5
+    # 다음 장 시작은 2024-07-15(월) 09:00 KST
+    assert closed_ttl == timedelta(days=2, hours=13).total_seconds()
@@ -0,0 +1,51 @@
+from core.price_ratio import build_price_matrix, compute_price_ratios, to_price_ratio_records
+from datetime import datetime, timedelta
+import numpy as np
+
+
+def product(productId, equityTickerSymbols, initial_date="2024-07-12"):
+    return {
+        "id": productId,
+        "initialBasePriceEvaluationDate": initial_date,
+        "equities": " / ".join(equityTickerSymbols),
+        "equityTickerSymbols": equityTickerSymbols
+    }
+
+
+# 비율 계산 - 기초자산 수가 다른 상품들과 계산할 수 없는 상품들을 한 번에 계산하는지 확인
+def test_compute_price_ratios_with_mixed_underlyings():
+    # given
+    future_date = (datetime.now().date() + timedelta(days=7)).strftime("%Y-%m-%d")
+    products = [
+        product(1, {"KOSPI200 Index": "^KS200", "S&P500 Index": "^GSPC", "Euro Stoxx 50 Index": "^STOXX50E"}),
+        product(2, {"S&P500 Index": "^GSPC"}),
+        product(3, {"KOSPI200 Index": "^KS200", "Nikkei 225": "^N225"}),
+        product(4, {"S&P500 Index": "^GSPC"}, future_date)
+    ]
+    initialCloses = {("^KS200", "2024-07-12"): 150.0, ("^GSPC", "2024-07-12"): 280.0, ("^STOXX50E", "2024-07-12"): 300.0}
+    recentCloses = {"^KS200": 160.0, "^GSPC": 300.0, "^STOXX50E": 100.0, "^N225": 40000.0}
+
+    # when
+    matrix = build_price_matrix(products, initialCloses, recentCloses)
+    ratio, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+
+    # then
+    assert ratio.shape == (4, 3)
+    assert ratio[0].tolist() == [106.67, 107.14, 33.33]
+    assert ratio[1].tolist() == [107.14, None, None]
+    assert to_price_ratio_records(matrix, recentAndInitialPriceRatio) == [
+        {"id": 1, "recentAndInitialPriceRatio": -66.67},
+        {"id": 2, "recentAndInitialPriceRatio": 7.14},
+        {"id": 3, "recentAndInitialPriceRatio": None},
+        {"id": 4, "recentAndInitialPriceRatio": None}
+    ]
+
+
+# 비율 계산 - 상품이 없는 경우 빈 결과를 반환하는지 확인
+def test_compute_price_ratios_without_products():
+    # when
+    matrix = build_price_matrix([], {}, {})
+    _, recentAndInitialPriceRatio = compute_price_ratios(matrix)
+
+    # then
+    assert to_price_ratio_records(matrix, recentAndInitialPriceRatio) == []
@@ -0,0 +1,128 @@
+from core.price_cache import price_cache, MISSING
+from core.price_store import PriceStore, price_store, _next_date
+from core.market_data import get_closes, refresh_price_store, backfill
+import pandas as pd
+import threading
+import asyncio
+import pytest
+
+
+# 종가 저장소 - 저장된 기간 안의 휴장일은 None, 저장된 기간 밖의 날짜는 MISSING을 반환하는지 확인
+def test_get_close_within_and_outside_coverage():
+    # given
+    store = PriceStore(":memory:")
+    store.append("^GSPC", {"2024-07-12": 280.0, "2024-07-15": 284.0}, "2024-07-12", "2024-07-15")
+
+    # when, then
+    assert store.get_close("^GSPC", "2024-07-12") == 280.0
+    assert store.get_close("^GSPC", "2024-07-13") is None
+    assert store.get_close("^GSPC", "2024-07-16") is MISSING
+    assert store.coverage("^GSPC") == ("2024-07-12", "2024-07-15")
+
+
+# 종가 저장소 - 저장소 파일은 생성 시점이 아니라 처음 사용할 때 만들어지는지 확인
+def test_store_file_created_on_first_use(tmp_path):
+    # given
+    path = tmp_path / "price_store.sqlite3"
+    store = PriceStore(str(path))
+
+    # when
+    created_before_use = path.exists()
+    store.append("^GSPC", {"2024-07-12": 280.0}, "2024-07-12", "2024-07-12")
+
+    # then
+    assert not created_before_use
+    assert path.exists()
+    assert store.get_close("^GSPC", "2024-07-12") == 280.0
+
+
+# 종가 저장소 - 이어지는 기간을 저장하면 저장된 기간이 넓어지는지 확인
+def test_append_extends_contiguous_coverage():
+    # given
+    store = PriceStore(":memory:")
+    store.append("^GSPC", {"2024-07-12": 280.0}, "2024-07-12", "2024-07-12")
+
+    # when
+    store.append("^GSPC", {"2024-07-15": 284.0}, "2024-07-13", "2024-07-15")
+
+    # then
+    assert store.coverage("^GSPC") == ("2024-07-12", "2024-07-15")
+    assert store.last_close("^GSPC") == 284.0
+
+
+# 종가 저장소 - 재시작으로 메모리 캐시가 비어도 저장소에서 응답하고, 갱신 시 마지막 저장 날짜 이후만 조회하는지 확인
+@pytest.mark.asyncio
+async def test_restart_served_from_store_and_incremental_refresh(market_data_source):
+    # given
+    await get_closes([("^GSPC", "2024-07-12")], [])
+    price_cache.clear()
+
+    # when
+    closes, _ = await get_closes([("^GSPC", "2024-07-12"), ("^GSPC", "2024-07-16")], [])
+    last_date = price_store.coverage("^GSPC")[1]
+    await refresh_price_store()
+
+    # then
+    assert closes == {("^GSPC", "2024-07-12"): 280.0, ("^GSPC", "2024-07-16"): 288.75}
+    assert len(market_data_source.calls) == 2
+    assert market_data_source.calls[1]["start"] == _next_date(last_date)
+
+
+# 종가 저장소 - 새 티커를 함께 조회해도 이미 저장된 티커는 마지막 저장 날짜 다음 날부터만 조회하는지 확인
+@pytest.mark.asyncio
+async def test_backfill_fetches_each_ticker_from_its_own_start(market_data_source):
+    # given
+    await backfill({"^GSPC": "2024-07-10"})
+    gspc_start = _next_date(price_store.coverage("^GSPC")[1])
+
+    # when
+    frame = await backfill({"^GSPC": "2024-07-10", "^KS200": "2024-07-10"})
+
+    # then
+    assert sorted((call["start"], tuple(call["tickers"])) for call in market_data_source.calls[1:]) == \
+        sorted([("2024-07-10", ("^KS200",)), (gspc_start, ("^GSPC",))])
+    assert price_store.coverage("^KS200")[0] == "2024-07-10"
+    assert frame.at[pd.Timestamp("2024-07-10"), "^KS200"] == 148.0
+
+
+# 종가 조회 - 같은 티커를 동시에 조회하면 한 번만 내려받는지 확인
+@pytest.mark.asyncio
+async def test_concurrent_lookups_for_same_ticker_download_once(market_data_source):
+    # given
+    market_data_source.delay = 0.05
+
+    # when
+    results = await asyncio.gather(*[get_closes([("^GSPC", "2024-07-12")], ["^GSPC"]) for _ in range(5)])
+
+    # then
+    assert len(market_data_source.calls) == 1
+    assert all(result == ({("^GSPC", "2024-07-12"): 280.0}, {"^GSPC": 300.0}) for result in results)
+
+
+# 종가 조회 - 한 티커의 다운로드가 늦어져도 다른 티커의 조회는 기다리지 않는지 확인
+@pytest.mark.asyncio
+async def test_slow_download_does_not_block_other_tickers(market_data_source):
+    # given
+    entered, released = threading.Event(), threading.Event()
+    download_closes = market_data_source.download_closes
+
+    def blocking_download_closes(tickerSymbols, start, end):
+        if "^GSPC" in tickerSymbols:
+            entered.set()
+            released.wait(5)
+        return download_closes(tickerSymbols, start, end)
+
+    market_data_source.download_closes = blocking_download_closes
+    slow = asyncio.create_task(get_closes([("^GSPC", "2024-07-12")], []))
+    assert await asyncio.to_thread(entered.wait, 5)
+
+    # when
+    try:
+        closes, _ = await asyncio.wait_for(get_closes([("^KS200", "2024-07-12")], []), timeout=2)
+    finally:
+        released.set()
+    slow_closes, _ = await slow
+
+    # then
+    assert closes == {("^KS200", "2024-07-12"): 150.0}
+    assert slow_closes == {("^GSPC", "2024-07-12"): 280.0}
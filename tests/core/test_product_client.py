@@ -0,0 +1,84 @@
+from core.product_client import ProductClient
+from exception.errors import ProductServiceServerException
+from datetime import datetime, timedelta
+import urllib.error
+import asyncio
+import pytest
+import json
+
+
+def product_response(productId, initial_date="2024-07-12"):
+    return json.dumps({"id": productId, "initialBasePriceEvaluationDate": initial_date})
+
+
+# 상품 정보 조회 - 동시에 들어온 같은 상품 조회는 product-service를 한 번만 호출하고 이후에는 캐시에서 응답하는지 확인
+@pytest.mark.asyncio
+async def test_get_product_coalesces_concurrent_misses(mock_do_service_async):
+    # given
+    async def slow_response(service, path, **kwargs):
+        await asyncio.sleep(0.01)
+        return product_response(1)
+    mock_do_service_async.side_effect = slow_response
+    client = ProductClient()
+
+    # when
+    products = await asyncio.gather(*[client.get_product(1) for _ in range(10)])
+    cached = await client.get_product(1)
+
+    # then
+    assert all(product["id"] == 1 for product in products)
+    assert cached["id"] == 1
+    assert mock_do_service_async.await_count == 1
+    assert client.stats()["coalesced"] == 9
+    assert client.stats()["hits"] == 1
+
+
+# 상품 정보 조회 - 최초기준가격평가일이 지나지 않은 상품은 조건이 바뀔 수 있으므로 캐시하지 않는지 확인
+@pytest.mark.asyncio
+async def test_get_product_does_not_cache_unissued_product(mock_do_service_async):
+    # given
+    future_date = (datetime.now().date() + timedelta(days=7)).strftime("%Y-%m-%d")
+    mock_do_service_async.return_value = product_response(1, future_date)
+    client = ProductClient()
+
+    # when
+    await client.get_product(1)
+    await client.get_product(1)
+
+    # then
+    assert mock_do_service_async.await_count == 2
+
+
+# 여러 상품 정보 조회 - 중복 id는 한 번만 조회하고 요청 순서대로 반환하는지 확인
+@pytest.mark.asyncio
+async def test_get_products_deduplicates_ids(mock_do_service_async):
+    # given
+    mock_do_service_async.side_effect = lambda service, path, **kwargs: product_response(int(path.rsplit("/", 1)[-1]))
+    client = ProductClient(maxConcurrency=2)
+
+    # when
+    products = await client.get_products([3, 1, 3, 2])
+
+    # then
+    assert [product["id"] for product in products] == [3, 1, 3, 2]
+    assert mock_do_service_async.await_count == 3
+
+
+# 여러 상품 정보 조회 - 조회에 실패한 상품 id들을 모아서 예외를 발생시키는지 확인
+@pytest.mark.asyncio
+async def test_get_products_collects_failed_ids(mock_do_service_async):
+    # given
+    def response(service, path, **kwargs):
+        productId = int(path.rsplit("/", 1)[-1])
+        if productId % 2 == 0:
+            raise urllib.error.URLError("product-service unavailable")
+        return product_response(productId)
+    mock_do_service_async.side_effect = response
+    client = ProductClient()
+
+    # when
+    with pytest.raises(ProductServiceServerException) as exc_info:
+        await client.get_products([1, 2, 3, 4])
+
+    # then
+    assert exc_info.value.productIdList == [2, 4]
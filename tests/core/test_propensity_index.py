@@ -0,0 +1,80 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
+from core.config import PropensityBoundaries
+from core.propensity_index import PropensityIndex
+from util.repayment_option import RepaymentOption
+from util.risk_propensity import RiskPropensity
+from models import AIResult, MonteCarloResult
+import pytest
+
+boundaries = PropensityBoundaries(extremeAndHighRisk=0.3, highAndMediumRisk=0.6, mediumAndLowRisk=0.8,
+                                  earlyRepayment=50, maturityRepayment=10)
+
+
+# 투자 성향 분류 색인 - 위험 성향 비트맵과 상환 성향 비트맵의 교집합으로 요청 상품 중 조건을 만족하는 상품만 찾는지 확인
+def test_query_intersects_risk_and_repayment_bitmaps():
+    # given
+    # 색인 크기보다 많은 상품을 등록
+    index = PropensityIndex(boundaries, capacity=2)
+    index.update_ai_results({1: [0.7], 2: [0.65], 3: [0.9], 4: [0.7]})
+    index.update_monte_carlo_results({1: [5.0], 2: [20.0], 3: [5.0], 4: [8.0]},
+                                     {1: [60.0], 2: [20.0], 3: [70.0], 4: [40.0]})
+
+    # when
+    early = index.query([4, 3, 2, 1, 99], RiskPropensity.MEDIUM_RISK, RepaymentOption.EARLY_REPAYMENT)
+    maturity = index.query([4, 3, 2, 1, 99], RiskPropensity.MEDIUM_RISK, RepaymentOption.MATURITY_REPAYMENT)
+    noPreference = index.query([4, 3, 2, 1, 99], RiskPropensity.MEDIUM_RISK, RepaymentOption.NO_PREFERENCE)
+
+    # then
+    assert early == [1]
+    assert maturity == [4, 1]
+    assert noPreference == [4, 2, 1]
+
+
+# 투자 성향 분류 색인 - 결과가 바뀐 상품만 다시 분류하고, 결과 행이 여러 개이면 하나라도 만족할 때 포함하는지 확인
+def test_update_reclassifies_changed_products():
+    # given
+    index = PropensityIndex(boundaries)
+    index.update_ai_results({1: [0.7], 2: [0.7]})
+    index.update_monte_carlo_results({1: [5.0], 2: [5.0]}, {})
+
+    # when
+    index.update_ai_results({1: [0.2], 2: [0.2, 0.7]})
+    index.update_monte_carlo_results({2: []}, {})
+
+    # then
+    assert index.query([1, 2], RiskPropensity.EXTREME_RISK, RepaymentOption.MATURITY_REPAYMENT) == [1]
+    assert index.query([1, 2], RiskPropensity.MEDIUM_RISK, RepaymentOption.NO_PREFERENCE) == [2]
+    assert index.stats()["products"] == 2
+
+
+# 투자 성향 분류 색인 - 다시 읽는 중에 실패하면 watermark를 옮기지 않아서, 다시 시도할 때 빠진 상품 없이 준비되는지 확인
+@pytest.mark.asyncio
+async def test_refresh_keeps_watermarks_when_reload_fails(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(AIResult), [{"ai_result_id": productId, "product_id": productId,
+                                                       "repayment_prediction": True, "safety_score": 0.7,
+                                                       "last_modified_at": datetime(2024, 7, 12)}
+                                                      for productId in (1, 2)])
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": productId, "product_id": productId,
+                                                               "early_repayment_probability": "60.0000",
+                                                               "maturity_repayment_probability": 0, "loss_probability": 5.0,
+                                                               "under_knockin_barrier_probability": 0,
+                                                               "last_modified_at": datetime(2024, 7, 12)}
+                                                              for productId in (1, 2)])
+    index = PropensityIndex(boundaries)
+
+    # when
+    # 수정된 상품 id를 조회한 뒤 결과를 다시 읽는 중에 실패
+    sqlite_session.failAt = 4
+    with pytest.raises(OperationalError):
+        await index.refresh(sqlite_session)
+    watermarksAfterFailure = index.stats()["watermarks"]
+    sqlite_session.failAt = None
+    await index.refresh(sqlite_session)
+
+    # then
+    assert all(watermark is None for watermark in watermarksAfterFailure.values())
+    assert index.ready
+    assert index.query([1, 2], RiskPropensity.MEDIUM_RISK, RepaymentOption.EARLY_REPAYMENT) == [1, 2]
@@ -0,0 +1,60 @@
+from unittest.mock import patch
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql
+from sqlalchemy.future import select
+from core.result_ingestion import upsert_statement, upsert_monte_carlo_results
+from models import MonteCarloResult, MonteCarloResultHistory, MonteCarloEarlyRepayment
+import pytest
+
+
+# 결과 저장 쿼리 - 여러 행을 하나의 INSERT ... ON DUPLICATE KEY UPDATE 문으로 저장하고 수정 시각을 갱신하는지 확인
+def test_upsert_statement():
+    # when
+    statement = upsert_statement(MonteCarloResult.__table__, [
+        {"product_id": 1, "early_repayment_probability": "10.0000", "loss_probability": 5},
+        {"product_id": 2, "early_repayment_probability": "20.0000", "loss_probability": 6}])
+    sql = str(statement.compile(dialect=mysql.dialect()))
+
+    # then
+    assert sql.count("INSERT INTO monte_carlo_result") == 1
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    assert "loss_probability = VALUES(loss_probability)" in sql
+    assert "last_modified_at = now()" in sql
+    assert "product_id = VALUES(product_id)" not in sql
+
+
+# 몬테카를로 분석 결과 일괄 저장 - 상품 id를 나눠서 이전 결과를 이력에 남긴 뒤 저장하고, 평가일별 조기상환 확률 행을 교체하는지 확인
+@pytest.mark.asyncio
+async def test_upsert_monte_carlo_results(sqlite_session):
+    # given
+    sqlite_session.session.execute(insert(MonteCarloResult), [{"monte_carlo_result_id": 101, "product_id": 1,
+                                                               "early_repayment_probability": "90.0000",
+                                                               "maturity_repayment_probability": 0, "loss_probability": 1,
+                                                               "under_knockin_barrier_probability": 0}])
+    sqlite_session.session.execute(insert(MonteCarloEarlyRepayment), [{"monte_carlo_result_id": 101, "product_id": 1,
+                                                                       "redemption_index": 0, "probability": 90.0}])
+    rows = [{"product_id": productId, "early_repayment_probability": probabilities, "maturity_repayment_probability": 30,
+             "loss_probability": 5, "under_knockin_barrier_probability": 8}
+            for productId, probabilities in [(1, "10.0000,20.0000"), (2, "30.0000"), (3, "5.0000"), (1, "40.0000")]]
+
+    # when
+    with patch('core.result_ingestion.RESULT_UPSERT_CHUNK_SIZE', 2):
+        productIds = await upsert_monte_carlo_results(sqlite_session, rows)
+
+    # then
+    assert productIds == [1, 2, 3]
+    # 상품 id 2개씩 (이력 저장, 결과 저장) → (결과 id 조회, 평가일별 행 삭제, 추가)
+    assert sqlite_session.queries == 10
+    history = sqlite_session.session.execute(select(MonteCarloResultHistory.product_id,
+                                                    MonteCarloResultHistory.early_repayment_probability)).all()
+    assert history == [(1, "90.0000")]
+    # 같은 상품 id가 여러 번 들어오면 마지막 결과를 저장
+    results = dict(sqlite_session.session.execute(select(MonteCarloResult.product_id,
+                                                         MonteCarloResult.early_repayment_probability)).all())
+    assert results == {1: "40.0000", 2: "30.0000", 3: "5.0000"}
+    earlyRepayments = sqlite_session.session.execute(select(MonteCarloEarlyRepayment.product_id,
+                                                            MonteCarloEarlyRepayment.redemption_index,
+                                                            MonteCarloEarlyRepayment.probability)
+                                                     .order_by(MonteCarloEarlyRepayment.product_id)).all()
+    assert [(productId, index, float(probability)) for productId, index, probability in earlyRepayments] == \
+        [(1, 0, 40.0), (2, 0, 30.0), (3, 0, 5.0)]
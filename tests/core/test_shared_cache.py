@@ -0,0 +1,142 @@
+from multiprocessing import get_context
+from unittest.mock import patch, AsyncMock
+from core.shared_cache import SharedMemoryCacheBackend, MISSING, SHARED_MEMORY
+from core.result_read_cache import ResultReadCache, CachedResult, MONTE_CARLO_RESULT
+from api.routes.monte_carlo import MonteCarloResponse
+import sqlite3
+import pytest
+import time
+import os
+
+
+# 다른 워커가 쓰는 중이면 기다렸다가 저장 (잠금 대기 시간 초과로 저장을 건너뛰지 않도록 충분히 기다림)
+def put_products(path, start):
+    cache = SharedMemoryCacheBackend("product", 1000, path=path, busyTimeout=30)
+    for productId in range(start, start + 50):
+        cache.put(productId, {"id": productId})
+
+
+# 공유 캐시 - 같은 파일을 사용하는 다른 워커(인스턴스)가 저장하거나 제거한 값을 바로 보는지 확인
+def test_shared_cache_is_visible_across_workers(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    worker1 = SharedMemoryCacheBackend("result", 10, path=path)
+    worker2 = SharedMemoryCacheBackend("result", 10, path=path)
+    cached = {"productId": 1, "etag": '"10-0"'}
+
+    # when
+    worker1.put(("monteCarlo", 1), cached)
+    worker1.put(("monteCarlo", 2), None)
+    fromWorker2 = worker2.get(("monteCarlo", 1))
+    noneValue = worker2.get(("monteCarlo", 2))
+    deleted = worker2.delete(("monteCarlo", 1))
+
+    # then
+    assert fromWorker2 == cached
+    assert noneValue is None
+    assert deleted is True
+    assert worker1.get(("monteCarlo", 1)) is MISSING
+    assert SharedMemoryCacheBackend("product", 10, path=path).get(("monteCarlo", 2)) is MISSING
+
+
+# 공유 캐시 - 최대 크기를 넘으면 가장 오래전에 사용한 항목을 제거하고, TTL이 지난 항목은 없는 것으로 처리하는지 확인
+def test_shared_cache_lru_eviction_and_ttl(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SharedMemoryCacheBackend("historicalClose", 2, path=path, touchInterval=0, evictionInterval=1)
+    recentCache = SharedMemoryCacheBackend("recentClose", 2, path=path)
+
+    # when
+    cache.put(("^GSPC", "2024-07-10"), 5500.0)
+    cache.put(("^GSPC", "2024-07-11"), 5580.0)
+    cache.get(("^GSPC", "2024-07-10"))
+    cache.put(("^GSPC", "2024-07-12"), 5600.0)
+    recentCache.put("^KS200", 350.0, ttl=0.01)
+    time.sleep(0.02)
+
+    # then
+    assert cache.get(("^GSPC", "2024-07-11")) is MISSING
+    assert cache.get(("^GSPC", "2024-07-10")) == 5500.0
+    assert recentCache.get("^KS200") is MISSING
+    assert cache.stats() == {"size": 2, "evictions": 1}
+
+
+# 공유 캐시 - 여러 프로세스가 동시에 저장해도 모든 값이 저장되는지 확인
+def test_shared_cache_concurrent_writers(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    SharedMemoryCacheBackend("product", 1000, path=path).stats()
+
+    # when
+    context = get_context("fork")
+    processes = [context.Process(target=put_products, args=(path, start)) for start in (0, 50, 100, 150)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    # then
+    cache = SharedMemoryCacheBackend("product", 1000, path=path)
+    assert all(process.exitcode == 0 for process in processes)
+    assert cache.stats()["size"] == 200
+    assert cache.get(199) == {"id": 199}
+
+
+# 공유 캐시 - 읽지 못하는 값(직렬화할 수 없는 값, 손상된 값)은 캐시에 없는 것으로 처리하는지 확인
+def test_shared_cache_treats_unreadable_values_as_missing(tmp_path):
+    # given
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SharedMemoryCacheBackend("result", 10, path=path)
+
+    # when
+    cache.put("object", object())
+    cache.put("corrupted", 1)
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE cache_entry SET value = ? WHERE key = ?", (b"\xc1", '"corrupted"'))
+
+    # then
+    assert cache.get("object") is MISSING
+    assert cache.get("corrupted") is MISSING
+    assert cache.stats()["size"] == 1
+
+
+# 공유 캐시 - 다른 사용자에게 권한이 열린 디렉터리는 사용하지 않고, 새로 만든 디렉터리(상위 디렉터리 포함)와 파일은 서비스 사용자만 접근할 수 있는지 확인
+def test_shared_cache_requires_private_directory(tmp_path):
+    # given
+    openDirectory = tmp_path / "open"
+    openDirectory.mkdir()
+    os.chmod(openDirectory, 0o777)
+    openCache = SharedMemoryCacheBackend("product", 10, path=str(openDirectory / "cache.sqlite3"))
+    privateCache = SharedMemoryCacheBackend("product", 10, path=str(tmp_path / "private" / "cache" / "cache.sqlite3"))
+
+    # when
+    openCache.put(1, {"id": 1})
+    privateCache.put(1, {"id": 1})
+
+    # then
+    assert openCache.get(1) is MISSING
+    assert not (openDirectory / "cache.sqlite3").exists()
+    assert privateCache.get(1) == {"id": 1}
+    assert os.stat(tmp_path / "private").st_mode & 0o777 == 0o700
+    assert os.stat(tmp_path / "private" / "cache").st_mode & 0o777 == 0o700
+    assert os.stat(tmp_path / "private" / "cache" / "cache.sqlite3").st_mode & 0o777 == 0o600
+
+
+# 상품 단건 조회 캐시 - 공유 메모리 캐시에는 응답 모델을 필드 값으로 저장하고, 다른 워커에서 같은 결과를 조회하는지 확인
+@pytest.mark.asyncio
+async def test_result_read_cache_shares_response_body(tmp_path):
+    # given
+    body = MonteCarloResponse(monteCarloResultId=10, productId=1, earlyRepaymentProbability="40.0000",
+                              maturityRepaymentProbability=30.0, lossProbability=10.0, underKnockInBarrierProbability=12.0)
+    with patch('core.shared_cache.SHARED_CACHE_BACKEND', SHARED_MEMORY), \
+            patch('core.shared_cache.SHARED_CACHE_PATH', str(tmp_path / "cache.sqlite3")):
+        worker1, worker2 = ResultReadCache(), ResultReadCache()
+
+    # when
+    await worker1.get(MONTE_CARLO_RESULT, 1, AsyncMock(return_value=CachedResult(body=body, etag='"10-0"')))
+    load = AsyncMock()
+    cached = await worker2.get(MONTE_CARLO_RESULT, 1, load)
+
+    # then
+    load.assert_not_called()
+    assert cached == CachedResult(body=body.model_dump(), etag='"10-0"')
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+from core.startup import readiness, run_startup_step, READY
+from core.opentelemetry import DeferredTracingMiddleware
+import pytest
+
+
+# 시작 단계 - 실패하면 다시 시도하고, 성공해야 준비 상태로 바뀌는지 확인
+@pytest.mark.asyncio
+async def test_run_startup_step_retries_until_ready():
+    # given
+    readiness.start(["database"])
+    calls = []
+
+    async def prepare_database():
+        calls.append(readiness.is_ready())
+        if len(calls) < 3:
+            raise ConnectionError("db unavailable")
+
+    # when
+    await run_startup_step("database", prepare_database, retryInterval=0)
+
+    # then
+    assert calls == [False, False, False]
+    assert readiness.stats()["steps"]["database"]["status"] == READY
+    assert readiness.stats()["steps"]["database"]["attempts"] == 3
+    assert readiness.stats()["steps"]["database"]["error"] is None
+    assert readiness.is_ready()
+
+
+# 트레이싱 미들웨어 - 트레이싱 설정이 끝나기 전의 요청은 그대로 처리하고, 설정이 끝난 뒤의 요청부터 추적 미들웨어로 처리하는지 확인
+@pytest.mark.asyncio
+async def test_tracing_middleware_traces_after_setup():
+    # given
+    handled, traced = [], []
+
+    async def app(scope, receive, send):
+        handled.append(scope["path"])
+
+    def traced_app_factory(inner):
+        async def tracedApp(scope, receive, send):
+            traced.append(scope["path"])
+            await inner(scope, receive, send)
+        return tracedApp
+    middleware = DeferredTracingMiddleware(app)
+
+    # when
+    await middleware({"type": "http", "path": "/before"}, None, None)
+    with patch('core.opentelemetry._tracedAppFactory', traced_app_factory):
+        await middleware({"type": "http", "path": "/after"}, None, None)
+
+    # then
+    assert handled == ["/before", "/after"]
+    assert traced == ["/after"]
@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine, inspect, text
+from migrations import run_migrations, get_migrations, get_pending_migrations, upgrade_schema
+
+
+# 마이그레이션 - 기존 스키마의 DB에 순서대로 적용되고, 다시 실행해도 이미 적용된 마이그레이션은 건너뛰는지 확인
+def test_run_migrations_is_idempotent():
+    # given
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE monte_carlo_result (monte_carlo_result_id INTEGER PRIMARY KEY, "
+                                "product_id BIGINT NOT NULL, early_repayment_probability TEXT NOT NULL, "
+                                "maturity_repayment_probability DECIMAL(8,4) NOT NULL, loss_probability DECIMAL(8,4) NOT NULL, "
+                                "under_knockin_barrier_probability DECIMAL(8,4) NOT NULL, last_modified_at DATETIME)"))
+        connection.execute(text("INSERT INTO monte_carlo_result VALUES (1, 10, '12.5000,30.0000,7.2500', 40.0, 5.0, 8.0, NULL)"))
+        # 같은 상품의 이전 결과 (유일 키를 만들기 전에 이력 테이블로 옮겨짐)
+        connection.execute(text("INSERT INTO monte_carlo_result VALUES (0, 10, '1.0000', 30.0, 50.0, 60.0, NULL)"))
+
+    # when
+    with engine.begin() as connection:
+        run_migrations(connection)
+    with engine.begin() as connection:
+        run_migrations(connection)
+
+    # then
+    with engine.connect() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("monte_carlo_result")}
+        indexes = {index["name"] for index in inspect(connection).get_indexes("monte_carlo_result")}
+        versions = connection.execute(text("SELECT version FROM schema_migration")).scalars().all()
+    assert {"maturity_repayment_standard_error", "loss_standard_error", "input_hash", "seed", "volatilities"} <= columns
+    assert {"ix_monte_carlo_result_product_loss", "ix_monte_carlo_result_last_modified_at"} <= indexes
+    assert sorted(versions) == [migration.__name__.rsplit(".", 1)[-1] for migration in get_migrations()]
+    with engine.connect() as connection:
+        earlyRepayments = connection.execute(text("SELECT product_id, redemption_index, probability "
+                                                  "FROM monte_carlo_early_repayment ORDER BY redemption_index")).all()
+    assert [(productId, index, float(probability)) for productId, index, probability in earlyRepayments] == \
+           [(10, 0, 12.5), (10, 1, 30.0), (10, 2, 7.25)]
+    with engine.connect() as connection:
+        remaining = connection.execute(text("SELECT monte_carlo_result_id FROM monte_carlo_result")).scalars().all()
+        archived = connection.execute(text("SELECT monte_carlo_result_id, loss_probability "
+                                           "FROM monte_carlo_result_history")).all()
+        uniqueIndexes = [index["name"] for index in inspect(connection).get_indexes("monte_carlo_result") if index["unique"]]
+    assert remaining == [1]
+    assert [(monteCarloResultId, float(loss)) for monteCarloResultId, loss in archived] == [(0, 50.0)]
+    assert uniqueIndexes == ["ux_monte_carlo_result_product_id"]
+
+
+# 적용되지 않은 마이그레이션 - 마이그레이션 기록 테이블이 없으면 모든 마이그레이션을, 적용한 뒤에는 빈 목록을 반환하는지 확인
+def test_get_pending_migrations():
+    # given
+    engine = create_engine("sqlite://")
+    versions = [migration.__name__.rsplit(".", 1)[-1] for migration in get_migrations()]
+
+    # when
+    with engine.begin() as connection:
+        pendingBefore = get_pending_migrations(connection)
+        upgrade_schema(connection)
+        pendingAfter = get_pending_migrations(connection)
+
+    # then
+    assert pendingBefore == versions
+    assert pendingAfter == []
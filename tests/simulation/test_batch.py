@@ -0,0 +1,84 @@
+from simulation.batch import ProductTerms, SharedMarketSnapshot, parse_product_terms, \
+    estimate_volatility_and_correlation, run_simulations
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def product_terms(productId, tickerIndices, evaluationSteps=(126, 252, 378), knockInBarrier=50.0):
+    return ProductTerms(productId=productId, tickerIndices=list(tickerIndices),
+                        initialCloses=[100.0] * len(tickerIndices),
+                        evaluationSteps=list(evaluationSteps),
+                        redemptionBarriers=[90.0, 85.0, 80.0][:len(evaluationSteps)],
+                        knockInBarrier=knockInBarrier)
+
+
+# 변동성, 상관계수 추정 - 일별 종가로 연 변동성과 상관계수를 추정하는지 확인
+def test_estimate_volatility_and_correlation():
+    # given
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2023-01-02", periods=1000).strftime("%Y-%m-%d")
+    shocks = rng.multivariate_normal([0, 0], [[1, 0.6], [0.6, 1]], size=len(dates)) * (0.2 / np.sqrt(252))
+    prices = 100 * np.exp(np.cumsum(shocks, axis=0))
+    histories = {"^KS200": list(zip(dates, prices[:, 0])),
+                 # 휴장일이 다른 기초자산
+                 "^GSPC": list(zip(dates[::2], prices[::2, 1]))}
+
+    # when
+    volatilities, correlation = estimate_volatility_and_correlation(["^KS200", "^GSPC"], histories)
+
+    # then
+    assert volatilities[0] == pytest.approx(0.2, abs=0.02)
+    assert correlation.shape == (2, 2)
+    assert correlation[0, 0] == pytest.approx(1.0)
+    assert np.linalg.eigvalsh(correlation).min() > 0
+
+
+# 몬테카를로 계산 조건 - 지난 평가일은 제외하고 남은 평가일까지의 영업일 수로 변환하는지 확인
+def test_parse_product_terms_skips_past_evaluation_dates(mock_product_response):
+    # given
+    product = {**mock_product_response,
+               "earlyRepaymentEvaluationDates": "2024-07-01, 2024-08-01, 2024-09-02",
+               "redemptionBarriers": [95, 90, 85],
+               "knockIn": 45}
+    tickerIndex = {"^GSPC": 0, "^KS200": 1, "^STOXX50E": 2}
+    initialCloses = {("^KS200", "2024-07-12"): 150.0, ("^GSPC", "2024-07-12"): 280.0, ("^STOXX50E", "2024-07-12"): 300.0}
+
+    # when
+    terms = parse_product_terms(1, product, tickerIndex, initialCloses, date(2024, 7, 19))
+
+    # then
+    assert terms.tickerIndices == [1, 0, 2]
+    assert terms.initialCloses == [150.0, 280.0, 300.0]
+    assert terms.evaluationSteps == [9, 31]
+    assert terms.redemptionBarriers == [90.0, 85.0]
+    assert terms.knockInBarrier == 45.0
+
+
+# 일괄 계산 - 공유 메모리 시장 데이터로 여러 프로세스에서 계산하고, 실패한 상품은 따로 반환하는지 확인
+@pytest.mark.asyncio
+async def test_run_simulations_in_process_pool():
+    # given
+    spots = np.array([100.0, 95.0, 110.0])
+    volatilities = np.array([0.2, 0.25, 0.3])
+    correlation = np.array([[1.0, 0.5, 0.4], [0.5, 1.0, 0.6], [0.4, 0.6, 1.0]])
+    productTerms = [product_terms(1, [0, 1, 2]),
+                    product_terms(2, [1]),
+                    product_terms(3, [2, 0], knockInBarrier=None),
+                    # 평가일이 없는 상품은 계산에 실패
+                    product_terms(4, [0], evaluationSteps=())]
+    progressed = []
+
+    # when
+    with SharedMarketSnapshot(spots, volatilities, correlation) as snapshot:
+        results = await run_simulations(productTerms, snapshot, paths=2_000, maxWorkers=2, progress=progressed.append)
+
+    # then
+    estimates = {productId: estimate for productId, estimate, _ in results}
+    errors = {productId: error for productId, _, error in results if error is not None}
+    assert sorted(estimates) == [1, 2, 3, 4]
+    assert list(errors) == [4]
+    assert sum(progressed) == 4
+    assert len(estimates[1].earlyRepaymentProbabilities) == 2
+    assert estimates[3].underKnockInBarrierProbability == 0.0
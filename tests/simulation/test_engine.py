@@ -0,0 +1,190 @@
+from simulation.engine import MonteCarloInputs, simulate, format_early_repayment_probability
+from simulation.sampling import brownian_bridge, bridge_order
+from simulation.result_writer import to_monte_carlo_result
+from math import erf, log, sqrt
+import numpy as np
+import pytest
+import tracemalloc
+
+
+def step_down_inputs(knockInBarrier=50.0):
+    return MonteCarloInputs(
+        initialRatios=np.array([1.0, 1.0, 1.0]),
+        volatilities=np.array([0.2, 0.25, 0.3]),
+        correlation=np.array([[1.0, 0.5, 0.4], [0.5, 1.0, 0.6], [0.4, 0.6, 1.0]]),
+        riskFreeRate=0.03,
+        evaluationSteps=np.arange(1, 7) * 126,
+        redemptionBarriers=np.array([90, 90, 85, 85, 80, 75]),
+        knockInBarrier=knockInBarrier
+    )
+
+
+# 몬테카를로 시뮬레이션 - 변동성이 거의 없으면 첫 번째 평가일에 모두 조기상환되는지 확인
+def test_simulate_without_volatility_redeems_on_first_evaluation():
+    # given
+    inputs = step_down_inputs()
+    inputs.initialRatios = np.array([1.0, 0.95, 0.92])
+    inputs.volatilities = np.array([1e-8, 1e-8, 1e-8])
+    inputs.riskFreeRate = 0.0
+
+    # when
+    estimate = simulate(inputs, paths=1_000, seed=0)
+
+    # then
+    assert estimate.earlyRepaymentProbabilities == [100.0, 0.0, 0.0, 0.0, 0.0]
+    assert estimate.lossProbability == 0.0
+    assert estimate.underKnockInBarrierProbability == 0.0
+
+
+# 몬테카를로 시뮬레이션 - 기초자산 1개, 만기 평가일 1개인 경우 만기상환 확률이 해석해 N(d2)와 일치하는지 확인
+def test_simulate_single_asset_matches_closed_form():
+    # given
+    volatility, riskFreeRate, steps = 0.25, 0.03, 252
+    inputs = MonteCarloInputs(initialRatios=np.array([1.0]), volatilities=np.array([volatility]),
+                              correlation=np.array([[1.0]]), riskFreeRate=riskFreeRate,
+                              evaluationSteps=np.array([steps]), redemptionBarriers=np.array([100.0]))
+
+    # when
+    estimate = simulate(inputs, paths=200_000, seed=1)
+
+    # then
+    d2 = (log(1.0) + (riskFreeRate - 0.5 * volatility ** 2)) / volatility
+    expected = 0.5 * (1 + erf(d2 / sqrt(2))) * 100
+    assert abs(estimate.maturityRepaymentProbability - expected) < 0.5
+    assert estimate.earlyRepaymentProbabilities == []
+
+
+# 몬테카를로 시뮬레이션 - 상환/손실 확률의 합이 100%이고, 손실은 낙인이 발생한 경로에서만 생기는지 확인
+def test_simulate_step_down_with_knock_in():
+    # given
+    inputs = step_down_inputs()
+
+    # when
+    estimate = simulate(inputs, paths=20_000, seed=2)
+    withoutKnockIn = simulate(step_down_inputs(knockInBarrier=None), paths=20_000, seed=2)
+
+    # then
+    total = sum(estimate.earlyRepaymentProbabilities) + estimate.maturityRepaymentProbability + estimate.lossProbability
+    assert abs(total - 100) < 1e-9
+    assert len(estimate.earlyRepaymentProbabilities) == 5
+    assert 0 < estimate.lossProbability <= estimate.underKnockInBarrierProbability
+    # 낙인 조건이 있으면 낙인이 발생하지 않은 경로는 만기상환되므로 손실 확률이 낮아짐
+    assert estimate.lossProbability < withoutKnockIn.lossProbability
+    assert withoutKnockIn.underKnockInBarrierProbability == 0.0
+
+
+# 몬테카를로 시뮬레이션 결과 - monte_carlo_result 형식으로 변환되는지 확인
+def test_to_monte_carlo_result():
+    # given
+    estimate = simulate(step_down_inputs(), paths=5_000, seed=3)
+
+    # when
+    monteCarloResult = to_monte_carlo_result(1, estimate)
+
+    # then
+    assert monteCarloResult.product_id == 1
+    assert monteCarloResult.early_repayment_probability == format_early_repayment_probability(estimate.earlyRepaymentProbabilities)
+    assert len(monteCarloResult.early_repayment_probability.split(",")) == 5
+    assert monteCarloResult.loss_probability == round(estimate.lossProbability, 4)
+
+
+# 분산 감소 - 대조 변량, Sobol 준난수 + 브라운 브리지, 제어 변량을 사용해도 같은 확률을 추정하고 표준오차를 함께 반환하는지 확인
+@pytest.mark.parametrize("sampling, controlVariate", [("antithetic", False), ("sobol", False), ("antithetic", True)])
+def test_simulate_with_variance_reduction(sampling, controlVariate):
+    # given
+    inputs = step_down_inputs()
+    inputs.evaluationSteps = np.arange(1, 7) * 21
+    reference = simulate(inputs, paths=100_000, seed=4)
+
+    # when
+    estimate = simulate(inputs, paths=16_384, seed=5, sampling=sampling, controlVariate=controlVariate)
+
+    # then
+    total = sum(estimate.earlyRepaymentProbabilities) + estimate.maturityRepaymentProbability + estimate.lossProbability
+    assert total == pytest.approx(100)
+    assert 0 < estimate.lossStandardError < 1
+    assert len(estimate.earlyRepaymentStandardErrors) == 5
+    assert abs(estimate.lossProbability - reference.lossProbability) < 4 * (estimate.lossStandardError + reference.lossStandardError)
+    assert abs(estimate.earlyRepaymentProbabilities[0] - reference.earlyRepaymentProbabilities[0]) < \
+           4 * (estimate.earlyRepaymentStandardErrors[0] + reference.earlyRepaymentStandardErrors[0])
+
+
+# 적응형 계산 - 모든 확률의 신뢰구간 반폭이 허용 오차 이하가 되면 최대 경로 수보다 먼저 멈추는지 확인
+def test_simulate_adaptive_stops_at_tolerance():
+    # given
+    inputs = step_down_inputs(knockInBarrier=None)
+
+    # when
+    estimate = simulate(inputs, paths=1_000_000, seed=6, sampling="antithetic", controlVariate=True, tolerance=1.0)
+
+    # then
+    assert estimate.paths < 1_000_000
+    standardErrors = estimate.earlyRepaymentStandardErrors + [estimate.maturityRepaymentStandardError, estimate.lossStandardError]
+    assert 1.96 * max(standardErrors) <= 1.0
+
+
+# 브라운 브리지 - 만기 시점을 먼저 정하는 순서로 만든 증분이 표준정규분포를 따르는지 확인
+def test_brownian_bridge_increments_are_standard_normal():
+    # given
+    rng = np.random.default_rng(7)
+    gridTimes = np.arange(1, 11) / 252
+    normals = rng.standard_normal((10, 1, 200_000))
+
+    # when
+    increments = brownian_bridge(normals, gridTimes)
+
+    # then
+    assert bridge_order(10)[0] == (9, -1, None)
+    assert sorted(index for index, _, _ in bridge_order(10)) == list(range(10))
+    assert np.abs(increments.mean(axis=2)).max() < 0.02
+    assert np.abs(increments.std(axis=2) - 1).max() < 0.02
+    assert np.abs(np.corrcoef(increments[:, 0, :])[np.triu_indices(10, 1)]).max() < 0.02
+
+
+# 메모리 사용량 - 최대 메모리 사용량이 전체 경로 수와 관계없이 경로 묶음 크기로 제한되는지 확인
+@pytest.mark.parametrize("dtype, ceiling", [(np.float64, 8_000_000), (np.float32, 4_000_000)])
+def test_simulate_peak_memory_is_bounded_by_batch_size(dtype, ceiling):
+    # given
+    # 만기 3년, 매일 낙인 감시, 기초자산 3개 (경로 전체를 float64로 보관하면 경로 1만 개당 약 180MB)
+    inputs = step_down_inputs()
+    peaks = []
+
+    # when
+    for paths in (8_192, 32_768):
+        tracemalloc.start()
+        simulate(inputs, paths=paths, seed=8, batchPaths=4_096, dtype=dtype)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    # then
+    assert max(peaks) < ceiling
+    assert peaks[1] < peaks[0] * 1.2
+
+
+# float32 - 정밀도를 낮춰도 float64와 같은 확률을 추정하는지 확인
+def test_simulate_float32_matches_float64():
+    # given
+    inputs = step_down_inputs()
+
+    # when
+    estimate64 = simulate(inputs, paths=20_000, seed=9)
+    estimate32 = simulate(inputs, paths=20_000, seed=9, dtype=np.float32)
+
+    # then
+    assert estimate32.lossProbability == pytest.approx(estimate64.lossProbability, abs=4 * estimate64.lossStandardError)
+    assert estimate32.earlyRepaymentProbabilities[0] == pytest.approx(estimate64.earlyRepaymentProbabilities[0],
+                                                                      abs=4 * estimate64.earlyRepaymentStandardErrors[0])
+
+
+# 경로 수 - 대조 변량과 Sobol 준난수도 요청한 경로 수를 넘지 않고, 실제로 계산한 경로 수를 반환하는지 확인
+@pytest.mark.parametrize("sampling, paths, expected", [("pseudo", 10_001, 10_001), ("antithetic", 10_001, 10_000),
+                                                        ("sobol", 10_000, 8_192), ("sobol", 3_000, 2_048)])
+def test_simulate_never_exceeds_requested_paths(sampling, paths, expected):
+    # given
+    inputs = step_down_inputs(knockInBarrier=None)
+
+    # when
+    estimate = simulate(inputs, paths=paths, seed=10, sampling=sampling)
+
+    # then
+    assert estimate.paths == expected
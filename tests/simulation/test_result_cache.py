@@ -0,0 +1,106 @@
+from simulation.batch import ProductTerms, simulation_options, estimate_volatility_and_correlation
+from simulation.result_cache import ResultCache, cache_key, HIT, WARM_START, MISS
+from models import MonteCarloResult
+import numpy as np
+import pandas as pd
+
+volatilities = np.array([0.2, 0.25, 0.3])
+correlation = np.array([[1.0, 0.5, 0.4], [0.5, 1.0, 0.6], [0.4, 0.6, 1.0]])
+terms = ProductTerms(productId=1, tickerIndices=[2, 0], initialCloses=[100.0, 200.0],
+                     evaluationSteps=[126, 252], redemptionBarriers=[90.0, 85.0], knockInBarrier=50.0)
+
+
+def key_for(spots, riskFreeRate=0.03):
+    return cache_key(terms, np.asarray(spots), volatilities, correlation, 10_000, riskFreeRate, simulation_options())
+
+
+def stored_result(key, seed):
+    return MonteCarloResult(product_id=1, **key.to_values(seed))
+
+
+# 입력 해시 - 입력이 같으면 같은 해시, 현재가만 바뀌면 상품 조건 해시는 그대로인지 확인
+def test_cache_key_separates_spot_from_terms():
+    # given
+    spots = [190.0, 50.0, 95.0]
+
+    # when
+    key = key_for(spots)
+    sameKey = key_for(list(spots))
+    movedKey = key_for([192.0, 50.0, 95.0])
+    rateKey = key_for(spots, riskFreeRate=0.035)
+
+    # then
+    assert key == sameKey
+    assert key.spotRatios == [0.95, 0.95]
+    assert movedKey.inputHash != key.inputHash and movedKey.termsHash == key.termsHash
+    assert rateKey.termsHash != key.termsHash
+
+
+# 결과 재사용 분류 - 입력이 같으면 hit, 현재가만 조금 바뀌면 warm start, 그 외에는 miss로 분류하고 적중률을 집계하는지 확인
+def test_classify_and_hit_rate():
+    # given
+    cache = ResultCache()
+    key = key_for([190.0, 50.0, 95.0])
+    previous = stored_result(key, seed=42)
+
+    # when
+    decisions = [cache.classify(key, previous),
+                 cache.classify(key_for([192.0, 50.0, 96.0]), previous),
+                 # 현재가가 크게 바뀐 경우
+                 cache.classify(key_for([250.0, 50.0, 95.0]), previous),
+                 # 입력 해시가 없는 이전 결과
+                 cache.classify(key, MonteCarloResult(product_id=1)),
+                 cache.classify(key, None)]
+
+    # then
+    assert decisions == [HIT, WARM_START, MISS, MISS, MISS]
+    assert cache.stats() == {"hits": 1, "warmStarts": 1, "misses": 3, "hitRate": 0.2}
+
+
+# 결과 재사용 분류 - 변동성과 상관계수 추정 기간이 하루씩 밀리는 연속된 두 일괄 계산에서 이전 난수 시드를 재사용하는지 확인
+def test_consecutive_daily_batches_warm_start():
+    # given
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2023-01-02", periods=400).strftime("%Y-%m-%d")
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 3)), axis=0))
+    tickerSymbols = ["^GSPC", "^KS200", "^STOXX50E"]
+
+    def daily_key(day, spots):
+        window = slice(day, day + 365)
+        histories = {tickerSymbol: list(zip(dates[window], closes[window, index]))
+                     for index, tickerSymbol in enumerate(tickerSymbols)}
+        dailyVolatilities, dailyCorrelation = estimate_volatility_and_correlation(tickerSymbols, histories)
+        return cache_key(terms, np.asarray(spots), dailyVolatilities, dailyCorrelation, 10_000, 0.03, simulation_options())
+
+    cache = ResultCache()
+    firstKey = daily_key(0, [190.0, 50.0, 95.0])
+    previous = stored_result(firstKey, seed=42)
+
+    # when
+    secondKey = daily_key(1, [191.0, 50.0, 95.5])
+
+    # then
+    assert secondKey.volatilities != firstKey.volatilities
+    assert secondKey.inputHash != firstKey.inputHash
+    assert secondKey.termsHash == firstKey.termsHash
+    assert cache.classify(secondKey, previous) == WARM_START
+
+
+# 결과 재사용 분류 - 변동성이나 상관계수가 허용 범위보다 크게 바뀌면 새로 계산하는지 확인
+def test_classify_misses_when_volatility_or_correlation_moves():
+    # given
+    cache = ResultCache()
+    key = key_for([190.0, 50.0, 95.0])
+    previous = stored_result(key, seed=42)
+    movedCorrelation = correlation.copy()
+    movedCorrelation[0, 2] = movedCorrelation[2, 0] = 0.1
+
+    # when
+    volatilityKey = cache_key(terms, np.asarray([190.0, 50.0, 95.0]), volatilities * 1.5, correlation, 10_000, 0.03,
+                              simulation_options())
+    correlationKey = cache_key(terms, np.asarray([190.0, 50.0, 95.0]), volatilities, movedCorrelation, 10_000, 0.03,
+                               simulation_options())
+
+    # then
+    assert cache.classify(volatilityKey, previous) == MISS
+    assert cache.classify(correlationKey, previous) == MISS
@@ -1,5 +1,8 @@
 from fastapi.testclient import TestClient
-from main import app
+from main import app, DATABASE_STEP, EUREKA_STEP
+from core.startup import readiness
+import subprocess
+import sys
 import os
 
 client = TestClient(app)
@@ -7,4 +10,38 @@ client = TestClient(app)
 def test_health_check():
     response = client.get("/health_check")
     assert response.status_code == 200
-    assert response.json() == {"status": "It's Working in " + os.getenv('APPLICATION_NAME')}
\ No newline at end of file
+    assert response.json() == {"status": "It's Working in " + os.getenv('APPLICATION_NAME')}
+
+
+# liveness, readiness - 시작 단계가 끝나기 전에도 liveness는 200이고, readiness는 모든 단계가 끝나야 200인지 확인
+def test_liveness_and_readiness():
+    # given
+    readiness.start([DATABASE_STEP, EUREKA_STEP])
+    readiness.mark_ready(DATABASE_STEP)
+
+    # when
+    live = client.get("/health/live")
+    notReady = client.get("/health/ready")
+    readiness.mark_ready(EUREKA_STEP)
+    ready = client.get("/health/ready")
+
+    # then
+    assert live.status_code == 200
+    assert notReady.status_code == 503
+    assert notReady.json()["steps"][EUREKA_STEP]["status"] == "PENDING"
+    assert ready.status_code == 200
+    assert ready.json()["ready"] is True
+
+
+# 시작 시간 - main을 import해도 시세 조회(pandas, yfinance), scipy, OpenTelemetry 모듈은 import되지 않는지 확인 (트레이싱을 켠 경우에도)
+def test_main_does_not_import_heavy_libraries():
+    # when
+    result = subprocess.run([sys.executable, "-c",
+                             "import sys, main; print(','.join(m for m in ('pandas', 'yfinance', 'scipy.stats', 'opentelemetry.sdk') "
+                             "if m in sys.modules))"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env={**os.environ, "OPENTELEMETRY_ENABLED": "true"})
+
+    # then
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == ""
@@ -0,0 +1,10 @@
+from enum import Enum
+
+class BatchJobStatus(Enum):
+    PENDING = "대기"
+    RUNNING = "실행 중"
+    COMPLETED = "완료"
+    FAILED = "실패"
+
+    def __str__(self):
+        return self.name
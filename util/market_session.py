@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, date
+from zoneinfo import ZoneInfo
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class MarketSession:
+    timezone: str
+    open: time
+    close: time
+
+    def now(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now(ZoneInfo("UTC"))).astimezone(ZoneInfo(self.timezone))
+
+    def today(self, now: Optional[datetime] = None) -> date:
+        return self.now(now).date()
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        local = self.now(now)
+        return local.weekday() < 5 and self.open <= local.time() < self.close
+
+    # 다음 장 시작 시각 (주말은 건너뛰며 공휴일은 고려하지 않음)
+    def next_open(self, now: Optional[datetime] = None) -> datetime:
+        local = self.now(now)
+        candidate = local.replace(hour=self.open.hour, minute=self.open.minute, second=0, microsecond=0)
+        if candidate <= local:
+            candidate += timedelta(days=1)
+        while candidate.weekday() >= 5:
+            candidate += timedelta(days=1)
+        return candidate
+
+    # 가장 최근에 장이 마감된 시각으로부터 지난 시간
+    def since_close(self, now: Optional[datetime] = None) -> timedelta:
+        local = self.now(now)
+        lastClose = local.replace(hour=self.close.hour, minute=self.close.minute, second=0, microsecond=0)
+        if lastClose > local:
+            lastClose -= timedelta(days=1)
+        while lastClose.weekday() >= 5:
+            lastClose -= timedelta(days=1)
+        return local - lastClose
+
+
+KOREA_SESSION = MarketSession("Asia/Seoul", time(9, 0), time(15, 30))
+US_SESSION = MarketSession("America/New_York", time(9, 30), time(16, 0))
+EURO_SESSION = MarketSession("Europe/Berlin", time(9, 0), time(17, 30))
+UK_SESSION = MarketSession("Europe/London", time(8, 0), time(16, 30))
+JAPAN_SESSION = MarketSession("Asia/Tokyo", time(9, 0), time(15, 0))
+HONG_KONG_SESSION = MarketSession("Asia/Hong_Kong", time(9, 30), time(16, 0))
+
+# ELS 상품에서 주로 사용하는 기초자산 티커별 거래소 정규장 시간
+MARKET_SESSIONS = {
+    "^KS200": KOREA_SESSION,
+    "^KS11": KOREA_SESSION,
+    "^GSPC": US_SESSION,
+    "^DJI": US_SESSION,
+    "^IXIC": US_SESSION,
+    "^NDX": US_SESSION,
+    "^STOXX50E": EURO_SESSION,
+    "^GDAXI": EURO_SESSION,
+    "^FTSE": UK_SESSION,
+    "^N225": JAPAN_SESSION,
+    "^HSI": HONG_KONG_SESSION,
+    "^HSCE": HONG_KONG_SESSION,
+}
+
+
+def get_market_session(tickerSymbol: str) -> Optional[MarketSession]:
+    if tickerSymbol in MARKET_SESSIONS:
+        return MARKET_SESSIONS[tickerSymbol]
+    # 한국 거래소 종목 (ex. 005930.KS)
+    if tickerSymbol.endswith((".KS", ".KQ")):
+        return KOREA_SESSION
+    return None
+
+
+# 기초자산이 속한 거래소 기준의 오늘 날짜 (거래소를 알 수 없는 티커는 UTC 기준)
+def exchange_today(tickerSymbol: str) -> date:
+    session = get_market_session(tickerSymbol)
+    return session.today() if session else datetime.now(ZoneInfo("UTC")).date()